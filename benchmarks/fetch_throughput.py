@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+价格抓取吞吐量基准测试
+在本地启动 StubPriceServer，用 AsyncPriceFetcher 并发抓取大量产品价格，
+统计每秒请求数、重试和回退次数。完全离线运行。
+
+用法: python benchmarks/fetch_throughput.py --products 5000 --concurrency 100
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.core.fetching import AsyncPriceFetcher, HTTPPriceSource, StubPriceServer
+
+
+def run_benchmark(products=5000, concurrency=100, rounds=3, latency=0.0,
+                  failure_rate=0.0, rate_limit=None):
+    """
+    运行抓取基准测试
+    :return: 每轮结果列表 [{'seconds', 'requests_per_second', 'fetched', 'stats'}]
+    """
+    names = [f"GPU-{i:06d}" for i in range(products)]
+    server = StubPriceServer(latency=latency, failure_rate=failure_rate, seed=42)
+    server.start_in_thread()
+
+    source = HTTPPriceSource(server.url, max_concurrency=concurrency, rate_limit=rate_limit)
+    fetcher = AsyncPriceFetcher(source, timeout=5.0, retries=2, backoff=0.01)
+    results = []
+    try:
+        for _ in range(rounds):
+            requests_before = fetcher.stats['requests']
+            start = time.perf_counter()
+            prices = fetcher.fetch_prices(names)
+            seconds = time.perf_counter() - start
+            requests = fetcher.stats['requests'] - requests_before
+            results.append({
+                'seconds': seconds,
+                'requests_per_second': requests / seconds,
+                'fetched': len(prices),
+                'stats': dict(fetcher.stats)
+            })
+    finally:
+        fetcher.close()
+        server.stop_thread()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="价格抓取吞吐量基准测试（本地桩服务器）")
+    parser.add_argument('--products', type=int, default=5000, help="每轮抓取的产品数")
+    parser.add_argument('--concurrency', type=int, default=100, help="单个价格源的最大并发数")
+    parser.add_argument('--rounds', type=int, default=3, help="抓取轮数（第2轮起复用连接池）")
+    parser.add_argument('--latency', type=float, default=0.0, help="桩服务器每个请求的延迟（秒）")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="桩服务器返回503的概率")
+    parser.add_argument('--rate-limit', type=float, default=None, help="每秒请求数上限")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.products, args.concurrency, args.rounds, args.latency,
+                            args.failure_rate, args.rate_limit)
+    for i, result in enumerate(results, 1):
+        stats = result['stats']
+        print(f"第{i}轮: {result['fetched']}/{args.products} 个价格, "
+              f"{result['seconds']:.2f}s, {result['requests_per_second']:,.0f} 请求/秒 "
+              f"(累计重试 {stats['retried']}, 回退 {stats['fallbacks']}, 失败 {stats['failed']})")
+
+
+if __name__ == "__main__":
+    main()
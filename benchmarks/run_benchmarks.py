@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+性能基准测试套件
+按参数化规模（10²~10⁷ 个价格点、10~10万款产品）测量 AI 引擎、工作流、
+数据生成脚本和站点构建的耗时与峰值内存，并与保存的基线比较，
+超过阈值即以非零状态退出，用于发现性能回退。
+基线需先在参考机器上用 --save 生成；没有基线或基线中缺少某个用例时同样以非零状态退出，
+避免回退检查在没有比较对象时悄悄通过。
+
+用法: python benchmarks/run_benchmarks.py                # 默认规模，与基线比较
+      python benchmarks/run_benchmarks.py --full         # 完整规模（10⁷ 点 / 10万产品）
+      python benchmarks/run_benchmarks.py --save         # 把本次结果写为新基线
+      python benchmarks/run_benchmarks.py --only engine  # 只运行名称包含 engine 的用例
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import convert_to_json
+from src.core.ai_engine import BaseAIEngine
+from src.core.history_store import JSONLinesHistoryStore
+from src.core.workflow import PriceMonitorWorkflow
+from src.data.generate_weekly_prices import generate_weekly_prices
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# 耗时或内存的变化量低于这些值时视为噪声，不判定为回退
+MIN_SECONDS_DELTA = 0.002
+MIN_BYTES_DELTA = 256 * 1024
+
+
+def _random_prices(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1000 * np.cumprod(1 + rng.uniform(-0.02, 0.02, n))
+
+
+def _write_catalogue(path, products, seed=0):
+    """写入与 cleaned_gpu_prices.csv 格式相同的合成产品目录"""
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(200, 2000, products).round(2)
+    lows = (prices * rng.uniform(0.8, 1.0, products)).round(2)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Product,Price,Historical_Low\n")
+        for i in range(products):
+            f.write(f"GPU {i:06d},\"${prices[i]:,.2f}\",{lows[i]}\n")
+
+
+def _write_history(store_path, points):
+    """写入 points 条记录的 JSON-lines 历史日志"""
+    start = datetime(2020, 1, 1)
+    prices = _random_prices(points)
+    with open(store_path, 'w', encoding='utf-8') as f:
+        for i in range(points):
+            timestamp = (start + timedelta(minutes=i)).isoformat()
+            f.write(f'{{"timestamp": "{timestamp}", "price": {prices[i]}}}\n')
+
+
+# 每个用例的 setup(规模, 临时目录) 返回被计时的无参函数；准备工作不计入耗时
+
+def setup_analyze_price_trend(size, workdir):
+    engine = BaseAIEngine()
+    prices = _random_prices(size)
+    return lambda: engine.analyze_price_trend(prices)
+
+
+def setup_detect_anomalies(size, workdir):
+    engine = BaseAIEngine()
+    prices = _random_prices(size)
+    return lambda: engine.detect_anomalies(prices)
+
+
+def setup_update_price_history(size, workdir):
+    data_dir = os.path.join(workdir, 'workflow')
+    shutil.rmtree(data_dir, ignore_errors=True)
+    workflow = PriceMonitorWorkflow(data_dir, max_records=size)
+    workflow.set_ai_engine(BaseAIEngine())
+    prices = _random_prices(size).tolist()
+    start = datetime(2020, 1, 1)
+    timestamps = [(start + timedelta(minutes=i)).isoformat() for i in range(size)]
+
+    def run():
+        for price, timestamp in zip(prices, timestamps):
+            workflow.update_price_history(price, timestamp)
+        workflow.close()
+    return run
+
+
+def setup_load_historical_data(size, workdir):
+    data_dir = os.path.join(workdir, 'history')
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.makedirs(data_dir)
+    store_path = os.path.join(data_dir, 'historical_prices.jsonl')
+    _write_history(store_path, size)
+    workflow = PriceMonitorWorkflow(
+        data_dir, history_store=JSONLinesHistoryStore(store_path, retention=size))
+    return workflow._load_historical_data
+
+
+def setup_generate_weekly_prices(size, workdir):
+    input_path = os.path.join(workdir, f'catalogue_{size}.csv')
+    if not os.path.exists(input_path):
+        _write_catalogue(input_path, size)
+    output_path = os.path.join(workdir, 'weekly_gpu_prices.csv')
+    return lambda: generate_weekly_prices(7, input_path=input_path, output_path=output_path)
+
+
+def setup_convert_to_json(size, workdir):
+    input_path = os.path.join(workdir, f'catalogue_{size}.csv')
+    if not os.path.exists(input_path):
+        _write_catalogue(input_path, size)
+    return lambda: convert_to_json.build_artifacts(convert_to_json.load_catalogue(input_path))
+
+
+# (用例名, setup, 规模单位, 默认规模, --full 规模)
+# 逐条写文件/逐条解析的工作流用例在完整模式下止于 10⁶，避免单个用例运行数分钟
+BENCHMARKS = [
+    ('engine.analyze_price_trend', setup_analyze_price_trend, 'points',
+     [10 ** 2, 10 ** 4, 10 ** 6], [10 ** k for k in range(2, 8)]),
+    ('engine.detect_anomalies', setup_detect_anomalies, 'points',
+     [10 ** 2, 10 ** 4, 10 ** 6], [10 ** k for k in range(2, 8)]),
+    ('workflow.update_price_history', setup_update_price_history, 'points',
+     [10 ** 2, 10 ** 3, 10 ** 4], [10 ** k for k in range(2, 7)]),
+    ('workflow.load_historical_data', setup_load_historical_data, 'points',
+     [10 ** 2, 10 ** 4, 10 ** 5], [10 ** k for k in range(2, 7)]),
+    ('data.generate_weekly_prices', setup_generate_weekly_prices, 'products',
+     [10, 1000], [10, 1000, 10 ** 4, 10 ** 5]),
+    ('site.convert_to_json', setup_convert_to_json, 'products',
+     [10, 1000], [10, 1000, 10 ** 4, 10 ** 5]),
+]
+
+
+def measure(setup, size, workdir, repeat):
+    """
+    测量一个用例在某个规模下的耗时和峰值内存
+    耗时取 repeat 次中的最小值；峰值内存单独运行一次，在 tracemalloc 下统计
+    （tracemalloc 本身有开销，不与计时混在一起）
+    :return: {'seconds': 最短耗时, 'peak_bytes': 峰值内存}
+    """
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            run = setup(size, workdir)
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+
+        run = setup(size, workdir)
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            baseline_bytes, _ = tracemalloc.get_traced_memory()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak - baseline_bytes}
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """
+    与基线比较，返回回退列表 [(用例, 指标, 基线值, 本次值)]
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        seconds, base_seconds = result['seconds'], previous['seconds']
+        if seconds > base_seconds * (1 + threshold) and seconds - base_seconds > MIN_SECONDS_DELTA:
+            regressions.append((key, 'seconds', base_seconds, seconds))
+        peak, base_peak = result['peak_bytes'], previous['peak_bytes']
+        if peak > base_peak * (1 + memory_threshold) and peak - base_peak > MIN_BYTES_DELTA:
+            regressions.append((key, 'peak_bytes', base_peak, peak))
+    return regressions
+
+
+def _format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def run_benchmarks(full=False, only=None, repeat=3):
+    """
+    运行基准测试
+    :param full: 使用完整规模
+    :param only: 只运行名称包含该字符串的用例
+    :param repeat: 每个规模的计时次数
+    :return: {'用例[规模]': {'seconds', 'peak_bytes'}}
+    """
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='gpu-bench-')
+    try:
+        for name, setup, unit, sizes, full_sizes in BENCHMARKS:
+            if only and only not in name:
+                continue
+            for size in (full_sizes if full else sizes):
+                key = f"{name}[{size}]"
+                result = measure(setup, size, workdir, repeat)
+                results[key] = result
+                print(f"{key:<45} {result['seconds'] * 1000:>12.3f} ms "
+                      f"{_format_bytes(result['peak_bytes']):>12}  ({size:,} {unit})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('results', {})
+    except FileNotFoundError:
+        return None
+
+
+def _save_baseline(path, results):
+    baseline = {
+        'created': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.platform(),
+        'results': results
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="价格监控系统性能基准测试")
+    parser.add_argument('--full', action='store_true', help="完整规模（10⁷ 点 / 10万产品），耗时较长")
+    parser.add_argument('--only', default=None, help="只运行名称包含该字符串的用例")
+    parser.add_argument('--repeat', type=int, default=3, help="每个规模的计时次数，取最小值")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument('--save', action='store_true', help="把本次结果写为新基线")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="耗时超过基线的比例阈值，默认 0.25（慢 25%%）")
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help="峰值内存超过基线的比例阈值，默认 0.25")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.full, args.only, args.repeat)
+
+    if args.save:
+        # 只更新本次运行过的用例，保留其余用例的旧基线
+        merged = _load_baseline(args.baseline) or {}
+        merged.update(results)
+        _save_baseline(args.baseline, merged)
+        print(f"\n基线已保存至: {args.baseline}")
+        return 0
+
+    baseline = _load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\n错误: 未找到基线文件 {args.baseline}，无法检查回退；请先在参考机器上用 --save 创建")
+        return 2
+    missing = [key for key in results if key not in baseline]
+    if missing:
+        print(f"\n错误: 基线中没有以下 {len(missing)} 个用例，无法检查回退；请用 --save 补充:")
+        for key in missing:
+            print(f"  {key}")
+        return 2
+
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+    if not regressions:
+        print(f"\n与基线相比没有超过阈值的回退（耗时 {args.threshold:.0%}，内存 {args.memory_threshold:.0%}）")
+        return 0
+
+    print(f"\n发现 {len(regressions)} 项性能回退:")
+    for key, metric, before, after in regressions:
+        if metric == 'seconds':
+            print(f"  {key}: 耗时 {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({after / before - 1:+.0%})")
+        else:
+            print(f"  {key}: 峰值内存 {_format_bytes(before)} -> {_format_bytes(after)} "
+                  f"({after / max(before, 1) - 1:+.0%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,93 +1,282 @@
 import pandas as pd
 import numpy as np
 import json
-from datetime import datetime, timedelta
+import gzip
+import hashlib
+import argparse
+import re
+from datetime import datetime, date, timedelta
 import os
 
-def convert_gpu_prices():
-    # 读取CSV文件
-    df = pd.read_csv('data/cleaned_gpu_prices.csv')
-    
-    # 转换数据格式
-    gpu_prices = []
-    for _, row in df.iterrows():
-        try:
-            price = float(str(row['Price']).replace('$', '').replace(',', '').strip())
-            historical_low = float(str(row['Historical_Low']).replace('$', '').replace(',', '').strip()) \
-                if pd.notna(row['Historical_Low']) and str(row['Historical_Low']).strip() != '' else price
-            
-            # 计算涨跌幅
-            change = ((price - historical_low) / historical_low) * 100
-            
-            gpu_prices.append({
-                'product': row['Product'],
-                'price': price,
-                'base_price': historical_low,
-                'change': round(change, 2)
-            })
-        except Exception as e:
-            print(f"处理 {row['Product']} 时出错: {e}")
-    
-    # 保存为JSON
-    with open('gpu-price-site/data/gpu_prices.json', 'w', encoding='utf-8') as f:
-        json.dump(gpu_prices, f, ensure_ascii=False, indent=2)
-    
+from src.data import price_parsing, simulation
+from src.data.price_parsing import is_missing, parse_prices
+from src.data.simulation import simulate_price_matrix
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：未安装时只生成 .gz
+    brotli = None
+
+# 所有路径都相对于仓库根目录
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOGUE_FILE = os.path.join(ROOT_DIR, 'data', 'cleaned_gpu_prices.csv')
+
+# 站点数据的所有副本目录：根目录站点、gpu-price-site 和 docs
+OUTPUT_DIRS = [
+    os.path.join(ROOT_DIR, 'data'),
+    os.path.join(ROOT_DIR, 'gpu-price-site', 'data'),
+    os.path.join(ROOT_DIR, 'docs', 'data'),
+]
+
+# 构建缓存：记录输入和输出的内容哈希，输入不变时直接跳过构建
+CACHE_FILE = os.path.join(ROOT_DIR, 'data', '.build_cache.json')
+
+# 构建逻辑有不兼容的变化时递增，使旧缓存失效
+BUILD_VERSION = 2
+
+# 按产品拆分的历史价格分片目录（相对于每个站点数据目录）
+HISTORY_DIR = 'history'
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_sha256(path):
+    try:
+        with open(path, 'rb') as f:
+            return _sha256(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def load_catalogue(path=CATALOGUE_FILE):
+    """
+    读取显卡价格CSV（整个构建只读取一次）
+    :return: DataFrame，包含 product / price / historical_low 及解析失败标记
+    """
+    df = pd.read_csv(path, dtype={'Price': str, 'Historical_Low': str})
+    price, price_valid = parse_prices(df['Price'])
+    historical_low, low_valid = parse_prices(df['Historical_Low'])
+    # 缺失的价格不算解析失败，只有非空但无法解析的值才标记为无效
+    invalid = (~price_valid & ~is_missing(df['Price'])) | (~low_valid & ~is_missing(df['Historical_Low']))
+    return pd.DataFrame({
+        'product': df['Product'],
+        'price': price,
+        'historical_low': historical_low,
+        'invalid': invalid
+    })
+
+
+def convert_gpu_prices(catalogue):
+    """生成 gpu_prices.json 的内容：当前价格、历史最低价和涨跌幅"""
+    for product in catalogue.loc[catalogue['invalid'], 'product']:
+        print(f"处理 {product} 时出错: 无法解析价格")
+    rows = catalogue[~catalogue['invalid']]
+
+    price = rows['price'].to_numpy()
+    # 没有历史最低价时以当前价格为基准
+    historical_low = rows['historical_low'].fillna(rows['price']).to_numpy()
+
+    # 计算涨跌幅
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (price - historical_low) / historical_low * 100
+
+    gpu_prices = [
+        {
+            'product': product,
+            'price': float(p),
+            'base_price': float(low),
+            'change': round(float(c), 2)
+        }
+        for product, p, low, c in zip(rows['product'], price, historical_low, change)
+    ]
+
     print(f"已转换 {len(gpu_prices)} 个显卡价格数据")
+    return gpu_prices
+
 
-def generate_price_history():
-    # 生成12月8日至14日的历史价格数据
-    gpu_data = pd.read_csv('data/cleaned_gpu_prices.csv')
+def generate_price_history(catalogue):
+    """生成 price_history.json 的内容：12月8日至14日的历史价格数据"""
     price_history = {}
-    
+
     # 设置随机种子以确保结果可重现
     np.random.seed(42)
-    
-    for _, row in gpu_data.iterrows():
-        product = row['Product']
-        try:
-            base_price = float(str(row['Price']).replace('$', '').replace(',', '').strip())
-            prices = []
-            
-            # 为12月8日至14日生成价格数据
-            # 12月8日（周一）到12月14日（周日）
-            current_price = base_price
-            
-            # 生成7天的价格数据
-            for day in range(7):
-                # 工作日和周末的价格波动不同
-                if day < 5:  # 周一到周五
-                    # 工作日价格波动较小：-2% 到 +3%
-                    change = 1 + (np.random.random() * 0.05 - 0.02)
-                else:  # 周末
-                    # 周末价格波动较大：-5% 到 +5%
-                    change = 1 + (np.random.random() * 0.1 - 0.05)
-                
-                # 确保价格不会低于历史最低价的90%
-                try:
-                    historical_low = float(str(row['Historical_Low']).replace('$', '').replace(',', '').strip())
-                    min_price = historical_low * 0.9
-                    current_price = max(min_price, round(current_price * change, 2))
-                except:
-                    current_price = round(current_price * change, 2)
-                
-                prices.append(current_price)
-            
-            price_history[product] = prices
-            
-        except Exception as e:
-            print(f"生成 {product} 历史价格时出错: {e}")
-    
-    # 保存为JSON
-    with open('gpu-price-site/data/price_history.json', 'w', encoding='utf-8') as f:
-        json.dump(price_history, f, ensure_ascii=False, indent=2)
-    
+
+    rows = catalogue[~catalogue['invalid']]
+
+    # 为12月8日（周一）至14日（周日）生成7天价格数据：
+    # 工作日波动 -2% ~ +3%，周末波动 -5% ~ +5%，每天取整到分且不低于历史最低价的90%
+    prices = simulate_price_matrix(
+        rows['price'].to_numpy(),
+        7,
+        start_date=date(2025, 12, 8),
+        drift=(-0.02, 0.03),
+        weekend_drift=(-0.05, 0.05),
+        floors=rows['historical_low'].to_numpy() * 0.9,
+        round_each_step=True
+    )
+
+    for product, product_prices in zip(rows['product'], prices):
+        if np.isnan(product_prices).all():
+            print(f"生成 {product} 历史价格时出错: 无效的价格")
+            continue
+        price_history[product] = product_prices.tolist()
+
     print(f"已生成 {len(price_history)} 个显卡的历史价格数据")
+    return price_history
+
+
+def _slugify(product):
+    """产品名转为文件名安全的短名，如 'GeForce RTX 4090' -> 'geforce-rtx-4090'"""
+    return re.sub(r'[^a-z0-9]+', '-', product.lower()).strip('-') or 'product'
+
+
+def _compressed_variants(name, content):
+    """生成预压缩副本，供支持 gzip_static/brotli_static 的服务器直接返回"""
+    variants = {name + '.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[name + '.br'] = brotli.compress(content, quality=11)
+    return variants
+
+
+def build_history_shards(price_history):
+    """
+    把历史价格拆成每个产品一个分片，并生成带内容哈希的清单
+    分片文件名包含内容哈希，内容不变时URL不变，可被浏览器长期缓存；
+    前端只需先读取很小的 manifest.json，再按需加载单个产品的分片。
+    :param price_history: {产品名: 价格列表}
+    :return: {相对路径: 序列化后的字节}
+    """
+    files = {}
+    products = {}
+    for product, prices in price_history.items():
+        content = json.dumps(prices, separators=(',', ':')).encode('utf-8')
+        digest = _sha256(content)
+        path = f"{HISTORY_DIR}/{_slugify(product)}.{digest[:12]}.json"
+        files[path] = content
+        files.update(_compressed_variants(path, content))
+        products[product] = {'file': path, 'sha256': digest, 'points': len(prices)}
+
+    manifest = json.dumps({
+        'version': BUILD_VERSION,
+        'products': products
+    }, ensure_ascii=False, indent=2).encode('utf-8')
+    manifest_path = f"{HISTORY_DIR}/manifest.json"
+    files[manifest_path] = manifest
+    files.update(_compressed_variants(manifest_path, manifest))
+    return files
+
+
+def build_artifacts(catalogue):
+    """
+    一次性生成所有站点数据文件的内容
+    :return: {相对路径: 序列化后的字节}
+    """
+    def dump(obj):
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    price_history = generate_price_history(catalogue)
+    artifacts = {
+        'gpu_prices.json': dump(convert_gpu_prices(catalogue)),
+        'price_history.json': dump(price_history),
+    }
+    artifacts.update(build_history_shards(price_history))
+    return artifacts
+
+
+def _remove_stale_shards(output_dir, artifacts):
+    """删除内容哈希已过期的旧分片，返回删除的文件列表"""
+    history_dir = os.path.join(output_dir, HISTORY_DIR)
+    if not os.path.isdir(history_dir):
+        return []
+    removed = []
+    for name in os.listdir(history_dir):
+        if f"{HISTORY_DIR}/{name}" not in artifacts:
+            path = os.path.join(history_dir, name)
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def _input_hashes():
+    """构建输入：源CSV以及决定输出内容的代码"""
+    inputs = [CATALOGUE_FILE, os.path.abspath(__file__), os.path.abspath(simulation.__file__),
+              os.path.abspath(price_parsing.__file__)]
+    return {os.path.relpath(path, ROOT_DIR): _file_sha256(path) for path in inputs}
+
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def build(force=False):
+    """
+    增量构建所有站点数据：输入未变化且输出完好时直接跳过；
+    否则读取CSV一次生成全部产物，只写入内容有变化的文件
+    :param force: 忽略缓存强制重新构建
+    :return: 实际写入的文件列表
+    """
+    inputs = _input_hashes()
+    cache = _load_cache()
+    outputs = cache.get('outputs', {})
+
+    up_to_date = (
+        not force
+        and cache.get('version') == BUILD_VERSION
+        and cache.get('inputs') == inputs
+        and outputs
+        and all(_file_sha256(os.path.join(ROOT_DIR, path)) == digest
+                for path, digest in outputs.items())
+    )
+    if up_to_date:
+        print("输入未变化，站点数据已是最新，跳过构建")
+        return []
+
+    artifacts = build_artifacts(load_catalogue())
+
+    written = []
+    removed = []
+    outputs = {}
+    for output_dir in OUTPUT_DIRS:
+        os.makedirs(os.path.join(output_dir, HISTORY_DIR), exist_ok=True)
+        for name, content in artifacts.items():
+            path = os.path.join(output_dir, *name.split('/'))
+            digest = _sha256(content)
+            outputs[os.path.relpath(path, ROOT_DIR)] = digest
+            if _file_sha256(path) == digest:
+                continue
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            written.append(path)
+        removed.extend(_remove_stale_shards(output_dir, artifacts))
+
+    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': BUILD_VERSION,
+            'inputs': inputs,
+            'outputs': outputs
+        }, f, indent=2, sort_keys=True)
+
+    for path in removed:
+        print(f"已删除过期分片: {os.path.relpath(path, ROOT_DIR)}")
+    if written:
+        for path in written:
+            print(f"已更新: {os.path.relpath(path, ROOT_DIR)}")
+    elif not removed:
+        print("站点数据内容无变化，未写入任何文件")
+    return written
+
 
 if __name__ == "__main__":
-    # 确保输出目录存在
-    os.makedirs('gpu-price-site/data', exist_ok=True)
-    os.makedirs('data', exist_ok=True)  # 确保数据目录存在
-    
-    # 转换数据
-    convert_gpu_prices()
-    generate_price_history()
+    parser = argparse.ArgumentParser(description="构建站点数据文件（gpu_prices.json / price_history.json / 历史价格分片）")
+    parser.add_argument('--force', action='store_true', help="忽略构建缓存，强制重新生成")
+    args = parser.parse_args()
+
+    build(force=args.force)
@@ -56,16 +56,51 @@ async function loadGPUPrices() {
     }
 }
 
+// 历史价格按产品分片：先读取很小的清单，再只下载所选显卡的分片
+// 分片文件名带内容哈希，已加载的分片缓存在内存中，重复点击不再请求
+let historyManifest = null;
+const historyCache = new Map();
+
+function loadHistoryManifest() {
+    if (!historyManifest) {
+        historyManifest = fetch('data/history/manifest.json', { cache: 'no-cache' })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('无法加载历史价格清单');
+                }
+                return response.json();
+            })
+            .catch(error => {
+                historyManifest = null;  // 下次调用时重试
+                throw error;
+            });
+    }
+    return historyManifest;
+}
+
+async function fetchHistoryShard(gpuName) {
+    const manifest = await loadHistoryManifest();
+    const entry = manifest.products[gpuName];
+    if (!entry) {
+        return [];
+    }
+    const response = await fetch('data/' + entry.file);
+    if (!response.ok) {
+        throw new Error('无法加载历史价格数据');
+    }
+    return await response.json();
+}
+
 // 获取显卡的7天价格数据
 async function getGPUPriceHistory(gpuName) {
+    if (!historyCache.has(gpuName)) {
+        // 缓存 Promise，同一显卡的并发请求只下载一次
+        historyCache.set(gpuName, fetchHistoryShard(gpuName));
+    }
     try {
-        const response = await fetch('data/price_history.json');
-        if (!response.ok) {
-            throw new Error('无法加载历史价格数据');
-        }
-        const data = await response.json();
-        return data[gpuName] || [];
+        return await historyCache.get(gpuName);
     } catch (error) {
+        historyCache.delete(gpuName);
         console.error('加载历史数据时出错:', error);
         return [];
     }
@@ -4,6 +4,9 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 
+from src.data.price_parsing import parse_prices
+from src.data.simulation import simulate_price_matrix
+
 def generate_weekly_prices():
     # 1. 读取显卡基础价格数据
     data_dir = os.path.join(os.path.dirname(__file__), "data")
@@ -18,43 +21,23 @@ def generate_weekly_prices():
     start_date = end_date - timedelta(days=6)  # 总共7天
     dates = [(end_date - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
     
-    # 4. 为每款显卡生成价格序列
-    all_data = []
-    
-    for _, gpu in gpu_data.iterrows():
-        product = gpu['Product']
-        try:
-            base_price = float(str(gpu['Price']).replace('$', '').replace(',', '').strip())
-        except:
-            base_price = 500  # 默认基础价格
-            
-        # 为每款显卡生成7天价格
-        prices = []
-        current_price = base_price
-        
-        for _ in range(7):
-            # 每日价格波动：-2% ~ +3%
-            daily_change = np.random.uniform(-0.02, 0.03)
-            current_price *= (1 + daily_change)
-            
-            # 确保价格合理
-            try:
-                historical_low = float(str(gpu['Historical_Low']).replace('$', '').replace(',', '').strip())
-                min_price = historical_low * 0.9
-                current_price = max(min_price, current_price)
-            except:
-                pass
-                
-            prices.append(round(current_price, 2))
-        
-        # 添加到结果集
-        for i, date in enumerate(dates):
-            all_data.append({
-                'date': date,
-                'product': product,
-                'price': prices[i],
-                'base_price': round(base_price, 2)
-            })
+    # 4. 解析基础价格和历史最低价（整列一次性处理）
+    base_prices, valid = parse_prices(gpu_data['Price'])
+    base_prices[~valid] = 500  # 默认基础价格
+    min_prices = parse_prices(gpu_data['Historical_Low'])[0] * 0.9
+
+    # 为所有显卡一次性生成7天价格：每日波动 -2% ~ +3%，不低于历史最低价的90%
+    prices = np.round(simulate_price_matrix(
+        base_prices, 7, drift=(-0.02, 0.03), floors=min_prices), 2)
+
+    # 添加到结果集
+    n_gpus = len(gpu_data)
+    all_data = {
+        'date': np.tile(dates, n_gpus),
+        'product': np.repeat(gpu_data['Product'].to_numpy(), 7),
+        'price': prices.reshape(-1),
+        'base_price': np.repeat(np.round(base_prices, 2), 7)
+    }
     
     # 5. 创建并保存DataFrame
     df = pd.DataFrame(all_data)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite 价格数据库工具
+把 weekly_gpu_prices.csv / historical_prices.json / price_history.json 导入带 (产品, 时间) 索引的
+SQLite 数据库，按产品和日期查询只需毫秒级，不必每次加载整个 JSON/CSV 文件；原有格式也可以从数据库导出。
+
+用法: python price_db.py import-weekly data/weekly_gpu_prices.csv
+      python price_db.py at "GeForce RTX 4090" 2025-12-10
+      python price_db.py movers 2025-12-08 --limit 5
+      python price_db.py similar "GeForce RTX 4080" --window 60
+      python price_db.py export-price-history data/price_history.json
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date, timedelta
+
+from src.core.comovement import CoMovementIndex
+from src.core.sqlite_store import DEFAULT_PRODUCT, SQLitePriceStore
+
+DEFAULT_DB = 'data/prices.db'
+
+
+def import_weekly(db, path):
+    """导入 weekly_gpu_prices.csv（date, product, price）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return db.insert((row['product'], row['date'], float(row['price']))
+                         for row in csv.DictReader(f) if row.get('price'))
+
+
+def import_history(db, path, product=DEFAULT_PRODUCT):
+    """导入 historical_prices.json（{'prices': [{'timestamp', 'price'}]}）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f).get('prices', [])
+    return db.insert((product, r['timestamp'], r['price']) for r in records)
+
+
+def import_price_history(db, path, start):
+    """导入 price_history.json（{产品: [每日价格]}），第一天为 start"""
+    with open(path, 'r', encoding='utf-8') as f:
+        history = json.load(f)
+    first = date.fromisoformat(start)
+    return db.insert((product, (first + timedelta(days=i)).isoformat(), price)
+                     for product, prices in history.items()
+                     for i, price in enumerate(prices) if price is not None)
+
+
+def build_comovement(db, window, start=None, end=None):
+    """用数据库中的每日收盘价构建涨跌联动索引（最近 window 天的日收益率相关性）"""
+    by_day = {}
+    for product, days in db.daily_closes(start, end).items():
+        for day, price in days:
+            by_day.setdefault(day, {})[product] = price
+    index = CoMovementIndex(window=window)
+    index.add_products(db.products)
+    for day in sorted(by_day):
+        index.update(by_day[day], refresh=False)
+    index.refresh()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 价格数据库：导入、查询和导出")
+    parser.add_argument('--db', default=DEFAULT_DB, help="数据库文件")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('import-weekly', help="导入 weekly_gpu_prices.csv")
+    p.add_argument('path')
+    p = commands.add_parser('import-history', help="导入 historical_prices.json")
+    p.add_argument('path')
+    p.add_argument('--product', default=DEFAULT_PRODUCT)
+    p = commands.add_parser('import-price-history', help="导入 price_history.json")
+    p.add_argument('path')
+    p.add_argument('--start', default='2025-12-08', help="第一天的日期")
+
+    commands.add_parser('latest', help="每个产品的最新价格")
+    p = commands.add_parser('at', help="某产品在某时间的价格")
+    p.add_argument('product')
+    p.add_argument('timestamp')
+    p = commands.add_parser('range', help="某产品在时间范围内的价格")
+    p.add_argument('product')
+    p.add_argument('start')
+    p.add_argument('end', nargs='?')
+    p = commands.add_parser('movers', help="时间范围内涨跌幅最大的产品")
+    p.add_argument('start')
+    p.add_argument('end', nargs='?')
+    p.add_argument('--limit', type=int, default=10)
+    p.add_argument('--up', action='store_true', help="按涨幅排序，默认按跌幅")
+    p = commands.add_parser('similar', help="与某产品涨跌最同步的产品（日收益率相关性）")
+    p.add_argument('product')
+    p.add_argument('--limit', type=int, default=10)
+    p.add_argument('--window', type=int, default=60, help="计算相关性的天数")
+    p.add_argument('--start')
+    p.add_argument('--end')
+
+    p = commands.add_parser('export-weekly', help="导出 weekly_gpu_prices.csv 格式（每日收盘价）")
+    p.add_argument('path')
+    p.add_argument('--start')
+    p.add_argument('--end')
+    p = commands.add_parser('export-price-history', help="导出 price_history.json 格式")
+    p.add_argument('path')
+    p.add_argument('--start')
+    p.add_argument('--end')
+    p = commands.add_parser('export-history', help="导出 historical_prices.json 格式")
+    p.add_argument('path')
+    p.add_argument('--product', default=DEFAULT_PRODUCT)
+    args = parser.parse_args()
+
+    db = SQLitePriceStore(args.db)
+    try:
+        if args.command == 'import-weekly':
+            print(f"已导入 {import_weekly(db, args.path)} 条价格")
+        elif args.command == 'import-history':
+            print(f"已导入 {import_history(db, args.path, args.product)} 条价格")
+        elif args.command == 'import-price-history':
+            print(f"已导入 {import_price_history(db, args.path, args.start)} 条价格")
+        elif args.command == 'latest':
+            for product, point in db.latest().items():
+                print(f"{product}: ${point['price']:,.2f}（{point['timestamp']}）")
+        elif args.command == 'at':
+            price = db.price_at(args.product, args.timestamp)
+            if price is None:
+                print(f"{args.product} 在 {args.timestamp} 之前没有价格数据")
+                return 1
+            print(f"{args.product} @ {args.timestamp}: ${price:,.2f}")
+        elif args.command == 'range':
+            for record in db.range(args.product, args.start, args.end):
+                print(f"{record['timestamp']}  ${record['price']:,.2f}")
+        elif args.command == 'movers':
+            direction = 'up' if args.up else 'down'
+            for mover in db.top_movers(args.start, args.end, args.limit, direction):
+                print(f"{mover['product']}: ${mover['start_price']:,.2f} -> "
+                      f"${mover['end_price']:,.2f}（{mover['change_percent']:+.2f}%）")
+        elif args.command == 'similar':
+            index = build_comovement(db, args.window, args.start, args.end)
+            similar = index.similar(args.product, args.limit)
+            if not similar:
+                print(f"{args.product} 没有足够的价格变动数据计算相关性")
+                return 1
+            for product, correlation in similar:
+                print(f"{product}: 相关系数 {correlation:+.3f}")
+        elif args.command == 'export-weekly':
+            db.export_daily_csv(args.path, args.start, args.end)
+            print(f"已导出至: {args.path}")
+        elif args.command == 'export-price-history':
+            db.export_price_history_json(args.path, args.start, args.end)
+            print(f"已导出至: {args.path}")
+        elif args.command == 'export-history':
+            db.export_history_json(args.path, args.product)
+            print(f"已导出至: {args.path}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
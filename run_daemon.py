@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+常驻守护进程模式
+进程启动一次，历史数据和分析状态常驻内存，按固定间隔反复运行监控流程，
+避免每个周期都重新启动解释器、导入 pandas/numpy 并重新加载全部历史数据。
+
+用法: python run_daemon.py --interval 30 --jitter 0.1
+      python run_daemon.py --multi --source-url http://127.0.0.1:8080
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from src.core.ai_engine import BaseAIEngine
+from src.core.alerts import AlertRuleEngine
+from src.core.fetching import AsyncPriceFetcher, HTTPPriceSource
+from src.core.forecasting import ForecastingAIEngine
+from src.core.history_store import JSONLinesHistoryStore
+from src.core.metrics import WorkflowMetrics
+from src.core.multi_workflow import MultiProductWorkflow
+from src.core.persistence import FSYNC_MODES, WriteBehindHistoryStore
+from src.core.scheduler import WorkflowDaemon
+from src.core.sqlite_store import SQLiteHistoryStore
+from src.core.workflow import PriceMonitorWorkflow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以常驻守护进程方式运行价格监控工作流")
+    parser.add_argument('--data-dir', default='data', help="历史数据目录")
+    parser.add_argument('--interval', type=float, default=60.0, help="两个周期开始之间的秒数")
+    parser.add_argument('--jitter', type=float, default=0.1, help="启动时间随机偏移，占间隔的比例")
+    parser.add_argument('--max-cycles', type=int, default=None, help="运行指定周期数后退出")
+    parser.add_argument('--multi', action='store_true', help="监控目录中的全部产品")
+    parser.add_argument('--source-url', default=None, help="从该 HTTP 接口抓取价格，默认使用模拟价格")
+    parser.add_argument('--product', default='GPU', help="单产品模式下抓取的产品名")
+    parser.add_argument('--quiet', action='store_true', help="不打印每个周期的报告")
+    parser.add_argument('--metrics-file', default=None,
+                        help="每个周期后导出各阶段耗时等指标（.json 为 JSON，其他为 Prometheus 文本格式）")
+    parser.add_argument('--db', default=None,
+                        help="使用该 SQLite 数据库保存历史价格（完整历史可用 price_db.py 查询）")
+    parser.add_argument('--flush-records', type=int, default=None,
+                        help="写后缓冲：累计这么多条价格后再批量写盘（默认每条立即写入）")
+    parser.add_argument('--flush-seconds', type=float, default=5.0,
+                        help="写后缓冲：最早一条缓冲价格等待的最长秒数")
+    parser.add_argument('--fsync', choices=FSYNC_MODES, default='flush',
+                        help="写后缓冲的 fsync 策略：never / flush（每批一次）/ always（每条）")
+    parser.add_argument('--forecast', action='store_true',
+                        help="在分析中加入 7 / 30 个周期后的价格预测及 95%% 预测区间")
+    parser.add_argument('--alert-rules', default=None,
+                        help="价格提醒规则 JSON 文件（AlertRuleEngine.save_rules 格式），每个价格到达时检查")
+    args = parser.parse_args()
+
+    metrics = WorkflowMetrics() if args.metrics_file else None
+    history_store = SQLiteHistoryStore(args.db) if args.db else None
+    if args.flush_records:
+        if history_store is None:
+            # 与工作流默认使用的 JSON Lines 文件相同
+            if args.multi:
+                history_store = JSONLinesHistoryStore(os.path.join(args.data_dir, 'product_prices.jsonl'))
+            else:
+                history_store = JSONLinesHistoryStore(
+                    os.path.join(args.data_dir, 'historical_prices.jsonl'),
+                    legacy_path=os.path.join(args.data_dir, 'historical_prices.json'))
+        # 多个采集进程共享同一数据目录时，通过数据文件旁的 .lock 文件互斥写入
+        history_store = WriteBehindHistoryStore(history_store, args.flush_records,
+                                                args.flush_seconds, args.fsync,
+                                                lock_path=os.path.join(args.data_dir, '.history.lock'),
+                                                metrics=metrics)
+
+    if args.multi:
+        workflow = MultiProductWorkflow(args.data_dir, history_store=history_store,
+                                        metrics=metrics)
+    else:
+        workflow = PriceMonitorWorkflow(args.data_dir, history_store=history_store,
+                                        metrics=metrics)
+    workflow.set_ai_engine(ForecastingAIEngine() if args.forecast else BaseAIEngine())
+    alert_engine = None
+    if args.alert_rules:
+        alert_engine = AlertRuleEngine()
+        print(f"已加载 {alert_engine.load_rules(args.alert_rules)} 条价格提醒规则")
+        workflow.set_alert_engine(alert_engine)
+
+    fetcher = None
+    if args.source_url:
+        fetcher = AsyncPriceFetcher(HTTPPriceSource(args.source_url), metrics=metrics)
+        if args.multi:
+            workflow.set_price_fetcher(fetcher)
+        else:
+            workflow.set_price_fetcher(fetcher, args.product)
+
+    daemon = WorkflowDaemon(workflow, args.interval, args.jitter, args.max_cycles,
+                            quiet=args.quiet, metrics_path=args.metrics_file)
+    print(f"守护进程已启动: {datetime.now().isoformat()}，间隔 {args.interval} 秒（Ctrl+C 停止）")
+    try:
+        stats = daemon.run()
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+
+    print(f"已停止: 共运行 {stats['cycles']} 个周期，"
+          f"{stats['failures']} 个未成功，跳过 {stats['skipped']} 个时间槽")
+    if 'mean' in stats:
+        print(f"周期耗时: 最近 {stats['last'] * 1000:.1f} ms，平均 {stats['mean'] * 1000:.1f} ms，"
+              f"P50 {stats['p50'] * 1000:.1f} ms，P95 {stats['p95'] * 1000:.1f} ms，"
+              f"最大 {stats['max'] * 1000:.1f} ms")
+    if alert_engine is not None:
+        alerts = alert_engine.stats()
+        print(f"价格提醒: 检查 {alerts['evaluated']} 次，触发 {alerts['fired']} 条，"
+              f"去重/冷却抑制 {alerts['suppressed']} 条")
+    if isinstance(history_store, WriteBehindHistoryStore):
+        flush = history_store.stats()
+        if flush['flushes']:
+            print(f"批量写盘: {flush['flushes']} 次，共 {flush['records_flushed']} 条，"
+                  f"平均每次 {flush['records_per_flush']:.1f} 条，"
+                  f"平均耗时 {flush['mean_flush_seconds'] * 1000:.2f} ms，"
+                  f"最大 {flush['max_flush_seconds'] * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
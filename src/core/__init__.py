@@ -2,7 +2,63 @@
 Core functionality for the Price Monitor Workflow system.
 """
 
-from .ai_engine import BaseAIEngine
+from .ai_engine import BaseAIEngine, IncrementalTrendAnalyzer
+from .alerts import AlertRule, AlertRuleEngine
+from .anomaly import IndexableSkiplist, StreamingAnomalyDetector
+from .cache import AnalysisCache
+from .columnar_store import MemmapColumnStore, MemmapHistoryStore
+from .comovement import CoMovementIndex
+from .fetching import (
+    AsyncPriceFetcher,
+    HTTPPriceSource,
+    PriceFetchError,
+    PriceSource,
+    StubPriceServer,
+)
+from .forecasting import ForecastingAIEngine, ForecastingTrendAnalyzer, HoltWintersState
+from .history_store import BaseHistoryStore, JSONHistoryStore, JSONLinesHistoryStore
+from .metrics import NullMetrics, WorkflowMetrics
+from .multi_workflow import MultiProductWorkflow, ProductSeries
+from .persistence import FileLock, WriteBehindHistoryStore
+from .ring_buffer import PriceRingBuffer
+from .rollup import RollupPyramid, RollupSeries
+from .scheduler import WorkflowDaemon
+from .sqlite_store import SQLiteHistoryStore, SQLitePriceStore
 from .workflow import PriceMonitorWorkflow
 
-__all__ = ['BaseAIEngine', 'PriceMonitorWorkflow']
+__all__ = [
+    'AlertRule',
+    'AlertRuleEngine',
+    'AnalysisCache',
+    'AsyncPriceFetcher',
+    'BaseAIEngine',
+    'BaseHistoryStore',
+    'CoMovementIndex',
+    'FileLock',
+    'ForecastingAIEngine',
+    'ForecastingTrendAnalyzer',
+    'HTTPPriceSource',
+    'HoltWintersState',
+    'IncrementalTrendAnalyzer',
+    'IndexableSkiplist',
+    'JSONHistoryStore',
+    'JSONLinesHistoryStore',
+    'MemmapColumnStore',
+    'MemmapHistoryStore',
+    'MultiProductWorkflow',
+    'NullMetrics',
+    'PriceFetchError',
+    'PriceMonitorWorkflow',
+    'PriceRingBuffer',
+    'PriceSource',
+    'ProductSeries',
+    'RollupPyramid',
+    'RollupSeries',
+    'SQLiteHistoryStore',
+    'SQLitePriceStore',
+    'StreamingAnomalyDetector',
+    'StubPriceServer',
+    'WorkflowDaemon',
+    'WorkflowMetrics',
+    'WriteBehindHistoryStore',
+]
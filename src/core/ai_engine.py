@@ -2,6 +2,196 @@
 AI Engine for Price Monitoring System
 Handles price analysis, trend detection, and anomaly detection.
 """
+from collections import deque
+
+import numpy as np
+
+from .anomaly import StreamingAnomalyDetector
+
+# Trend labels indexed by the codes returned from the batch methods
+TREND_LABELS = ('stable', 'increasing', 'decreasing')
+TREND_STABLE, TREND_INCREASING, TREND_DECREASING = range(3)
+
+# Number of trailing points used for the simple moving average
+SMA_WINDOW = 5
+
+# Smoothing factor of the exponentially weighted moving average
+EWMA_ALPHA = 0.3
+
+
+def _as_ragged(prices, offsets=None):
+    """Normalize batch input to a flat value array plus series offsets.
+
+    Args:
+        prices (array-like): 2-D array with one series per row, or a flat
+            array of concatenated series when offsets is given
+        offsets (array-like, optional): Start index of every series in
+            prices followed by the total length (CSR-style, length N+1)
+
+    Returns:
+        tuple: (values, offsets) as float64 and int64 arrays
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if offsets is None:
+        if prices.ndim != 2:
+            raise ValueError("prices must be 2-D when offsets is not given")
+        n_series, length = prices.shape
+        values = prices.reshape(-1)
+        offsets = np.arange(n_series + 1, dtype=np.int64) * length
+    else:
+        values = prices.reshape(-1)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets.ndim != 1 or len(offsets) == 0 or offsets[-1] != len(values):
+            raise ValueError("offsets must be 1-D and end at len(prices)")
+    return values, offsets
+
+
+def _classify_trend(last_price, prev_price):
+    """Classify the trend from the last two prices.
+
+    Returns:
+        tuple: (trend label, confidence)
+    """
+    if last_price > prev_price * 1.05:
+        return 'increasing', min(0.9, (last_price / prev_price - 1) * 10)
+    if last_price < prev_price * 0.95:
+        return 'decreasing', min(0.9, (1 - last_price / prev_price) * 10)
+    return 'stable', 0.5
+
+
+class IncrementalTrendAnalyzer:
+    """Stateful trend analyzer updated one price at a time.
+    
+    Keeps the SMA window with its running total, an EWMA and the last
+    change ratio so that each update costs O(1) instead of rescanning the
+    whole history. analyze() returns the same result as
+    BaseAIEngine.analyze_price_trend on the full series, up to floating
+    point rounding of the running total.
+    """
+    
+    # Settings that must match for saved state to be reused
+    CONFIG_KEYS = ('window_size', 'ewma_alpha')
+    
+    def __init__(self, window_size=SMA_WINDOW, ewma_alpha=EWMA_ALPHA):
+        """Initialize the analyzer.
+        
+        Args:
+            window_size (int): Number of trailing points in the SMA
+            ewma_alpha (float): Smoothing factor of the EWMA
+        """
+        self.window_size = window_size
+        self.ewma_alpha = ewma_alpha
+        self.window = deque(maxlen=max(window_size, 2))
+        self.count = 0
+        self.moving_average = None
+        self.ewma = None
+        self.last_change_ratio = None
+        self.last_timestamp = None
+        self._total = 0.0
+        
+    def update(self, price, timestamp=None):
+        """Add a new price to the running state.
+        
+        Args:
+            price (float): New price
+            timestamp (str, optional): Timestamp of the price, kept so the
+                state can be matched against the stored history
+        """
+        if self.window:
+            prev_price = self.window[-1]
+            self.last_change_ratio = price / prev_price if prev_price else None
+        if len(self.window) >= self.window_size:
+            # The oldest point of the SMA window leaves it
+            self._total -= self.window[-self.window_size]
+        self._total += price
+        self.window.append(price)
+        self.count += 1
+        self.last_timestamp = timestamp
+        
+        if self.ewma is None:
+            self.ewma = price
+        else:
+            self.ewma += self.ewma_alpha * (price - self.ewma)
+        
+        n = min(self.window_size, len(self.window))
+        if self.count % self.window_size == 0:
+            # Recompute the total exactly once per window to stop rounding drift
+            self._resync()
+        self.moving_average = self._total / n
+    
+    def _resync(self):
+        n = min(self.window_size, len(self.window))
+        self._total = float(sum(list(self.window)[len(self.window) - n:]))
+        
+    def analyze(self):
+        """
+        Analyze the current trend from the running state.
+        
+        Returns:
+            dict: Analysis results including trend and confidence
+        """
+        if self.count < 2:
+            return {
+                'trend': 'stable',
+                'confidence': 0.0,
+                'message': 'Insufficient data for analysis'
+            }
+        
+        trend, confidence = _classify_trend(self.window[-1], self.window[-2])
+        return {
+            'trend': trend,
+            'confidence': confidence,
+            'moving_average': self.moving_average,
+            'ewma': self.ewma,
+            'last_price': self.window[-1]
+        }
+    
+    def to_dict(self):
+        """Serialize the analyzer state.
+        
+        Returns:
+            dict: JSON-serializable state
+        """
+        return {
+            'window_size': self.window_size,
+            'ewma_alpha': self.ewma_alpha,
+            'window': list(self.window),
+            'count': self.count,
+            'moving_average': self.moving_average,
+            'total': self._total,
+            'ewma': self.ewma,
+            'last_change_ratio': self.last_change_ratio,
+            'last_timestamp': self.last_timestamp
+        }
+    
+    @classmethod
+    def from_dict(cls, state):
+        """Restore an analyzer from to_dict() output.
+        
+        Args:
+            state (dict): Serialized state
+            
+        Returns:
+            IncrementalTrendAnalyzer: Restored analyzer
+        """
+        analyzer = cls(state['window_size'], state['ewma_alpha'])
+        analyzer._restore(state)
+        return analyzer
+    
+    def _restore(self, state):
+        """Load the running state written by to_dict()."""
+        self.window.extend(state['window'])
+        self.count = state['count']
+        self.moving_average = state['moving_average']
+        self.ewma = state['ewma']
+        self.last_change_ratio = state['last_change_ratio']
+        self.last_timestamp = state.get('last_timestamp')
+        if 'total' in state:
+            self._total = state['total']
+        else:
+            # Saved before the running total was kept
+            self._resync()
+
 
 class BaseAIEngine:
     """Base class for AI-powered price analysis."""
@@ -28,7 +218,7 @@ class BaseAIEngine:
             self.initialize()
             
         # Simple moving average calculation as placeholder
-        if not historical_prices or len(historical_prices) < 2:
+        if historical_prices is None or len(historical_prices) < 2:
             return {
                 'trend': 'stable',
                 'confidence': 0.0,
@@ -36,29 +226,23 @@ class BaseAIEngine:
             }
             
         # Calculate simple moving average
-        window_size = min(5, len(historical_prices))
+        window_size = min(SMA_WINDOW, len(historical_prices))
         sma = sum(historical_prices[-window_size:]) / window_size
         
+        # Exponentially weighted moving average, seeded with the first price
+        ewma = historical_prices[0]
+        for price in historical_prices[1:]:
+            ewma += EWMA_ALPHA * (price - ewma)
+        
         # Determine trend
-        if len(historical_prices) >= 2:
-            if historical_prices[-1] > historical_prices[-2] * 1.05:
-                trend = 'increasing'
-                confidence = min(0.9, (historical_prices[-1] / historical_prices[-2] - 1) * 10)
-            elif historical_prices[-1] < historical_prices[-2] * 0.95:
-                trend = 'decreasing'
-                confidence = min(0.9, (1 - historical_prices[-1] / historical_prices[-2]) * 10)
-            else:
-                trend = 'stable'
-                confidence = 0.5
-        else:
-            trend = 'stable'
-            confidence = 0.0
+        trend, confidence = _classify_trend(historical_prices[-1], historical_prices[-2])
             
         return {
             'trend': trend,
             'confidence': confidence,
             'moving_average': sma,
-            'last_price': historical_prices[-1] if historical_prices else None
+            'ewma': float(ewma),
+            'last_price': historical_prices[-1]
         }
     
     def detect_anomalies(self, price_data, threshold=2.0):
@@ -72,12 +256,10 @@ class BaseAIEngine:
         Returns:
             list: List of indices where anomalies were detected
         """
-        if not price_data or len(price_data) < 3:
+        if price_data is None or len(price_data) < 3:
             return []
-            
-        import numpy as np
         
-        prices = np.array(price_data)
+        prices = np.asarray(price_data, dtype=np.float64)
         mean = np.mean(prices)
         std = np.std(prices)
         
@@ -89,6 +271,143 @@ class BaseAIEngine:
         
         return anomalies
     
+    def create_trend_analyzer(self):
+        """
+        Create an incremental analyzer equivalent to analyze_price_trend.
+        
+        Engines that override analyze_price_trend get None unless they
+        also provide a matching analyzer here.
+        
+        Returns:
+            IncrementalTrendAnalyzer: Fresh analyzer state, or None
+        """
+        if type(self).analyze_price_trend is not BaseAIEngine.analyze_price_trend:
+            return None
+        return IncrementalTrendAnalyzer(SMA_WINDOW)
+    
+    def create_anomaly_detector(self, window=50, method='zscore', threshold=None):
+        """
+        Create a streaming detector that flags anomalies as prices arrive.
+        
+        Args:
+            window (int): Number of recent prices the statistics cover
+            method (str): 'zscore' (rolling mean/std) or 'mad' (rolling
+                median/MAD, robust to spikes)
+            threshold (float, optional): Score threshold, method default if None
+            
+        Returns:
+            StreamingAnomalyDetector: Fresh detector state
+        """
+        return StreamingAnomalyDetector(window, threshold, method)
+    
+    def analyze_price_trend_batch(self, prices, offsets=None):
+        """
+        Analyze the price trends of many series in one vectorized pass.
+        
+        Results match analyze_price_trend applied to every series.
+        
+        Args:
+            prices (array-like): 2-D array with one series per row, or the
+                concatenated series when offsets is given
+            offsets (array-like, optional): CSR-style series offsets (N+1)
+            
+        Returns:
+            dict: Arrays of length N with 'trend' labels, 'trend_code',
+                'confidence', 'moving_average', 'ewma', 'last_price' and a
+                'sufficient' mask (False where a series has < 2 points;
+                moving_average, ewma and last_price are NaN there)
+        """
+        if not self.initialized:
+            self.initialize()
+            
+        values, offsets = _as_ragged(prices, offsets)
+        lengths = np.diff(offsets)
+        ends = offsets[1:]
+        sufficient = lengths >= 2
+        
+        # Simple moving average, summed left to right like the scalar path
+        window = np.minimum(SMA_WINDOW, lengths)
+        total = np.zeros(len(lengths))
+        last_index = max(len(values) - 1, 0)
+        for k in range(SMA_WINDOW):
+            take = k < window
+            idx = np.clip(ends - window + k, 0, last_index)
+            if len(values):
+                total = np.where(take, total + values[idx], total)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moving_average = np.where(sufficient, total / np.maximum(window, 1), np.nan)
+        
+        # EWMA, one vectorized step per time point across all series
+        starts = offsets[:-1]
+        ewma = np.full(len(lengths), np.nan)
+        if len(values):
+            ewma[lengths > 0] = values[starts[lengths > 0]]
+        for step in range(1, int(lengths.max()) if len(lengths) else 0):
+            active = np.flatnonzero(lengths > step)
+            ewma[active] += EWMA_ALPHA * (values[starts[active] + step] - ewma[active])
+        ewma[~sufficient] = np.nan
+        
+        # Trend from the last two points
+        last = np.full(len(lengths), np.nan)
+        prev = np.full(len(lengths), np.nan)
+        last[sufficient] = values[ends[sufficient] - 1]
+        prev[sufficient] = values[ends[sufficient] - 2]
+        
+        trend_code = np.full(len(lengths), TREND_STABLE, dtype=np.int8)
+        confidence = np.where(sufficient, 0.5, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            increasing = sufficient & (last > prev * 1.05)
+            decreasing = sufficient & ~increasing & (last < prev * 0.95)
+            ratio = last / prev
+            trend_code[increasing] = TREND_INCREASING
+            trend_code[decreasing] = TREND_DECREASING
+            confidence = np.where(increasing, np.minimum(0.9, (ratio - 1) * 10), confidence)
+            confidence = np.where(decreasing, np.minimum(0.9, (1 - ratio) * 10), confidence)
+        
+        return {
+            'trend': np.asarray(TREND_LABELS)[trend_code],
+            'trend_code': trend_code,
+            'confidence': confidence,
+            'moving_average': moving_average,
+            'ewma': ewma,
+            'last_price': last,
+            'sufficient': sufficient
+        }
+    
+    def detect_anomalies_batch(self, prices, offsets=None, threshold=2.0):
+        """
+        Detect price anomalies in many series at once.
+        
+        Results match detect_anomalies applied to every series. Series of
+        equal length are stacked and scored together, so a 2-D input is
+        handled in a single vectorized pass.
+        
+        Args:
+            prices (array-like): 2-D array with one series per row, or the
+                concatenated series when offsets is given
+            offsets (array-like, optional): CSR-style series offsets (N+1)
+            threshold (float): Z-score threshold for anomaly detection
+            
+        Returns:
+            numpy.ndarray: Boolean anomaly mask with the shape of prices
+        """
+        shape = np.shape(prices)
+        values, offsets = _as_ragged(prices, offsets)
+        lengths = np.diff(offsets)
+        mask = np.zeros(len(values), dtype=bool)
+        
+        for length in np.unique(lengths[lengths >= 3]):
+            starts = offsets[:-1][lengths == length]
+            idx = starts[:, None] + np.arange(length)
+            block = values[idx]
+            mean = np.mean(block, axis=1, keepdims=True)
+            std = np.std(block, axis=1, keepdims=True)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                z_scores = np.abs((block - mean) / std)
+            mask[idx] = (z_scores > threshold) & (std != 0)
+        
+        return mask.reshape(shape)
+    
     def generate_insights(self, analysis_results):
         """
         Generate human-readable insights from analysis results.
@@ -0,0 +1,431 @@
+"""
+Price Alert Rules
+Indexes user alert rules per product so that each incoming price only
+looks at the rules whose threshold it crossed, and rate-limits what fires.
+"""
+import json
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from .ring_buffer import from_epoch_us, to_epoch_us
+
+_SECOND_US = 1_000_000
+_DAY_US = 86400 * _SECOND_US
+
+# Supported rule kinds
+RULE_KINDS = ('below', 'above', 'drop', 'anomaly')
+
+
+class AlertRule:
+    """A single alert rule.
+
+    Kinds:
+
+    - 'below': the price falls to ``threshold`` or lower
+    - 'above': the price rises to ``threshold`` or higher
+    - 'drop': the price is at least ``threshold`` percent below the
+      product's average over the last ``days`` days
+    - 'anomaly': the workflow's anomaly detector flags the price
+    """
+
+    __slots__ = ('rule_id', 'product', 'kind', 'threshold', 'days', 'owner', 'cooldown')
+
+    def __init__(self, rule_id, product, kind, threshold=None, days=None, owner=None,
+                 cooldown=None):
+        self.rule_id = rule_id
+        self.product = product
+        self.kind = kind
+        self.threshold = threshold
+        self.days = days
+        self.owner = owner
+        self.cooldown = cooldown
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def describe(self, price, average=None):
+        """Human-readable alert message."""
+        if self.kind == 'below':
+            return f"{self.product} fell to ${price:,.2f} (alert at ${self.threshold:,.2f})"
+        if self.kind == 'above':
+            return f"{self.product} rose to ${price:,.2f} (alert at ${self.threshold:,.2f})"
+        if self.kind == 'drop':
+            change = (price / average - 1) * 100
+            return (f"{self.product} at ${price:,.2f} is {-change:.1f}% below its "
+                    f"{self.days}-day average of ${average:,.2f}")
+        return f"{self.product} price ${price:,.2f} flagged as anomalous"
+
+
+class _ThresholdIndex:
+    """Sorted thresholds with their rule ids for one product and rule family."""
+
+    __slots__ = ('keys', 'rules')
+
+    def __init__(self):
+        self.keys = []
+        self.rules = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, threshold, rule_id):
+        i = bisect_right(self.keys, threshold)
+        self.keys.insert(i, threshold)
+        self.rules.insert(i, rule_id)
+
+    def remove(self, threshold, rule_id):
+        i = bisect_left(self.keys, threshold)
+        while self.rules[i] != rule_id:
+            i += 1
+        del self.keys[i]
+        del self.rules[i]
+
+    def falling(self, previous, current):
+        """Rules with current <= threshold < previous, i.e. crossed downward."""
+        lo = bisect_left(self.keys, current)
+        hi = bisect_left(self.keys, previous) if previous is not None else len(self.keys)
+        return self.rules[lo:hi]
+
+    def rising(self, previous, current):
+        """Rules with previous < threshold <= current, i.e. crossed upward."""
+        lo = bisect_right(self.keys, previous) if previous is not None else 0
+        hi = bisect_right(self.keys, current)
+        return self.rules[lo:hi]
+
+
+class _DailyMean:
+    """Average price over a trailing window of calendar days, O(1) per price."""
+
+    __slots__ = ('days', 'buckets', 'total', 'count')
+
+    def __init__(self, days):
+        self.days = days
+        # (day number, sum, count), oldest first
+        self.buckets = deque()
+        self.total = 0.0
+        self.count = 0
+
+    def mean(self, day):
+        """Average over the days day - days + 1 .. day, or None without data."""
+        self._evict(day)
+        return self.total / self.count if self.count else None
+
+    def add(self, day, price):
+        self._evict(day)
+        if self.buckets and self.buckets[-1][0] == day:
+            _, total, count = self.buckets[-1]
+            self.buckets[-1] = (day, total + price, count + 1)
+        elif not self.buckets or self.buckets[-1][0] < day:
+            self.buckets.append((day, price, 1))
+        else:
+            # Late price for an earlier day still inside the window
+            return
+        self.total += price
+        self.count += 1
+
+    def _evict(self, day):
+        while self.buckets and self.buckets[0][0] <= day - self.days:
+            _, total, count = self.buckets.popleft()
+            self.total -= total
+            self.count -= count
+
+
+class _ProductRules:
+    """Every index and running value kept for one product."""
+
+    __slots__ = ('below', 'above', 'drop', 'anomaly', 'averages', 'last_price',
+                 'last_ratio', 'anomalous')
+
+    def __init__(self):
+        self.below = _ThresholdIndex()
+        self.above = _ThresholdIndex()
+        # days -> _ThresholdIndex of price / average ratios
+        self.drop = {}
+        self.anomaly = []
+        # days -> _DailyMean
+        self.averages = {}
+        self.last_price = None
+        self.last_ratio = {}
+        self.anomalous = False
+
+    def is_empty(self):
+        return not (self.below or self.above or self.drop or self.anomaly)
+
+
+class AlertRuleEngine:
+    """Evaluates alert rules against every incoming price.
+
+    Rules fire when their condition becomes true, i.e. when a price crosses
+    the threshold, not on every tick the condition holds. Per product the
+    thresholds live in sorted lists, so a price costs O(log R + fired)
+    however many rules exist: 'below' and 'above' rules are found by
+    bisecting between the previous and the current price, 'drop' rules by
+    bisecting the price-to-average ratio of each distinct averaging window.
+    Fired alerts are then deduplicated (one alert per owner, product and
+    kind per price, keeping the most extreme threshold) and rate-limited
+    (at most one alert per owner, product and kind per cooldown).
+    """
+
+    def __init__(self, cooldown=3600.0):
+        """Initialize the engine.
+
+        Args:
+            cooldown (float): Minimum seconds between two alerts for the
+                same owner, product and kind; rules can override it
+        """
+        self.cooldown = cooldown
+        self.rules = {}
+        self.products = {}
+        self._next_id = 1
+        # (owner, product, kind, days) -> epoch microseconds of the last alert
+        self._last_fired = {}
+        self.evaluated = 0
+        self.fired = 0
+        self.suppressed = 0
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add_rule(self, product, kind, threshold=None, days=None, owner=None, cooldown=None,
+                 rule_id=None):
+        """
+        Register an alert rule.
+
+        Args:
+            product (str): Product the rule watches
+            kind (str): 'below', 'above', 'drop' or 'anomaly'
+            threshold (float): Price for 'below'/'above', percent drop for 'drop'
+            days (int): Averaging window of a 'drop' rule in days
+            owner (str, optional): Who the alert is for
+            cooldown (float, optional): Rule-specific cooldown in seconds
+            rule_id (int, optional): Id to use, e.g. when loading saved
+                rules; must not be taken
+
+        Returns:
+            int: Rule id
+        """
+        if kind not in RULE_KINDS:
+            raise ValueError(f"kind must be one of {RULE_KINDS}")
+        if kind != 'anomaly' and threshold is None:
+            raise ValueError(f"'{kind}' rules need a threshold")
+        if kind == 'drop' and not days:
+            raise ValueError("'drop' rules need the number of days to average over")
+        if rule_id is None:
+            rule_id = self._next_id
+        elif rule_id in self.rules:
+            raise ValueError(f"Rule id {rule_id} is already taken")
+        self._next_id = max(self._next_id, rule_id + 1)
+
+        rule = AlertRule(rule_id, product, kind,
+                         float(threshold) if threshold is not None else None,
+                         int(days) if kind == 'drop' else None, owner, cooldown)
+        self.rules[rule.rule_id] = rule
+
+        state = self.products.get(product)
+        if state is None:
+            state = self.products[product] = _ProductRules()
+        if kind == 'below':
+            state.below.add(rule.threshold, rule.rule_id)
+        elif kind == 'above':
+            state.above.add(rule.threshold, rule.rule_id)
+        elif kind == 'drop':
+            index = state.drop.get(rule.days)
+            if index is None:
+                index = state.drop[rule.days] = _ThresholdIndex()
+                state.averages.setdefault(rule.days, _DailyMean(rule.days))
+            index.add(self._drop_ratio(rule), rule.rule_id)
+        else:
+            state.anomaly.append(rule.rule_id)
+        return rule.rule_id
+
+    @staticmethod
+    def _drop_ratio(rule):
+        return 1 - rule.threshold / 100
+
+    def remove_rule(self, rule_id):
+        """Remove a rule; unknown ids are ignored."""
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return
+        state = self.products[rule.product]
+        if rule.kind == 'below':
+            state.below.remove(rule.threshold, rule_id)
+        elif rule.kind == 'above':
+            state.above.remove(rule.threshold, rule_id)
+        elif rule.kind == 'drop':
+            index = state.drop[rule.days]
+            index.remove(self._drop_ratio(rule), rule_id)
+            if not index:
+                del state.drop[rule.days]
+                state.averages.pop(rule.days, None)
+                state.last_ratio.pop(rule.days, None)
+        else:
+            state.anomaly.remove(rule_id)
+        if state.is_empty():
+            del self.products[rule.product]
+
+    def watches_anomalies(self, product):
+        """bool: Whether any 'anomaly' rule watches the product."""
+        state = self.products.get(product)
+        return state is not None and bool(state.anomaly)
+
+    def observe_history(self, product, timestamps_us, prices):
+        """
+        Prime the running averages and last price of a product from its history.
+
+        Only prices inside the longest averaging window are replayed; no
+        alerts fire.
+
+        Args:
+            product (str): Product name
+            timestamps_us (array-like): Epoch microseconds, oldest first
+            prices (array-like): Matching prices
+        """
+        state = self.products.get(product)
+        if state is None or not len(prices):
+            return
+        timestamps_us = [int(t) for t in timestamps_us]
+        prices = [float(p) for p in prices]
+        last_day = timestamps_us[-1] // _DAY_US
+        longest = max(state.averages, default=0)
+        start = bisect_left(timestamps_us, (last_day - longest + 1) * _DAY_US)
+        for timestamp_us, price in zip(timestamps_us[start:], prices[start:]):
+            for average in state.averages.values():
+                average.add(timestamp_us // _DAY_US, price)
+        state.last_price = prices[-1]
+
+    def evaluate(self, product, price, timestamp=None, anomaly=False):
+        """
+        Evaluate a product's rules against its new price.
+
+        Args:
+            product (str): Product name
+            price (float): New price
+            timestamp: ISO timestamp or epoch microseconds of the price;
+                drives the averages and the cooldowns. Defaults to now.
+            anomaly (bool): Whether the price was flagged as anomalous
+
+        Returns:
+            list: Alert dicts with 'rule_id', 'owner', 'product', 'kind',
+                'threshold', 'price', 'timestamp' and 'message'
+        """
+        state = self.products.get(product)
+        if state is None or price is None:
+            return []
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        timestamp_us = to_epoch_us(timestamp) if isinstance(timestamp, str) else int(timestamp)
+        day = timestamp_us // _DAY_US
+        self.evaluated += 1
+
+        # (rule id, average) of every rule whose condition just became true
+        crossed = [(rule_id, None) for rule_id in state.below.falling(state.last_price, price)]
+        crossed.extend((rule_id, None) for rule_id in state.above.rising(state.last_price, price))
+        for days, index in state.drop.items():
+            average = state.averages[days].mean(day)
+            if average:
+                ratio = price / average
+                crossed.extend((rule_id, average) for rule_id in
+                               index.falling(state.last_ratio.get(days), ratio))
+                state.last_ratio[days] = ratio
+            state.averages[days].add(day, price)
+        if anomaly and not state.anomalous:
+            crossed.extend((rule_id, None) for rule_id in state.anomaly)
+        state.anomalous = bool(anomaly)
+        state.last_price = price
+
+        if not crossed:
+            return []
+        return self._fire(crossed, price, timestamp_us)
+
+    def _fire(self, crossed, price, timestamp_us):
+        # One alert per owner, product and kind: keep the most extreme rule
+        chosen = {}
+        for rule_id, average in crossed:
+            rule = self.rules[rule_id]
+            key = (rule.owner, rule.product, rule.kind, rule.days)
+            current = chosen.get(key)
+            if current is None or self._more_extreme(rule, self.rules[current[0]]):
+                chosen[key] = (rule_id, average)
+        self.suppressed += len(crossed) - len(chosen)
+
+        # Rate limit per owner, product and kind, so a less extreme rule
+        # cannot re-alert while the group is cooling down
+        for key, (rule_id, _) in list(chosen.items()):
+            rule = self.rules[rule_id]
+            last = self._last_fired.get(key)
+            cooldown = rule.cooldown if rule.cooldown is not None else self.cooldown
+            if last is not None and timestamp_us - last < cooldown * _SECOND_US:
+                del chosen[key]
+                self.suppressed += 1
+            else:
+                self._last_fired[key] = timestamp_us
+
+        alerts = []
+        timestamp = from_epoch_us(timestamp_us)
+        for rule_id, average in chosen.values():
+            rule = self.rules[rule_id]
+            alerts.append({
+                'rule_id': rule_id,
+                'owner': rule.owner,
+                'product': rule.product,
+                'kind': rule.kind,
+                'threshold': rule.threshold,
+                'price': price,
+                'timestamp': timestamp,
+                'message': rule.describe(price, average)
+            })
+        self.fired += len(alerts)
+        return alerts
+
+    @staticmethod
+    def _more_extreme(rule, other):
+        if rule.kind == 'below':
+            return rule.threshold < other.threshold
+        if rule.kind in ('above', 'drop'):
+            return rule.threshold > other.threshold
+        return False
+
+    def stats(self):
+        """Rule and alert counters.
+
+        Returns:
+            dict: Number of rules and products watched, prices evaluated,
+                alerts fired and alerts suppressed by dedupe or cooldown
+        """
+        return {
+            'rules': len(self.rules),
+            'products': len(self.products),
+            'evaluated': self.evaluated,
+            'fired': self.fired,
+            'suppressed': self.suppressed
+        }
+
+    def save_rules(self, path):
+        """Write every rule to a JSON file."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([rule.to_dict() for rule in self.rules.values()], f,
+                      ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+
+    def load_rules(self, path):
+        """
+        Add the rules of a JSON file written by save_rules().
+
+        Rules keep their ids when they are still free.
+
+        Returns:
+            int: Number of rules added
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+        for rule in rules:
+            rule = dict(rule)
+            if rule.get('rule_id') in self.rules:
+                del rule['rule_id']
+            self.add_rule(**rule)
+        return len(rules)
@@ -0,0 +1,335 @@
+"""
+Streaming Anomaly Detection
+Flags price anomalies as prices arrive, using sliding-window statistics
+instead of recomputing global statistics over the whole series.
+"""
+import math
+import random
+from collections import deque
+
+
+class _SkiplistNode:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, next_nodes, widths):
+        self.value = value
+        self.next = next_nodes
+        self.width = widths
+
+
+_NIL = _SkiplistNode(math.inf, [], [])
+
+
+class IndexableSkiplist:
+    """Sorted collection with O(log n) insert, remove and positional lookup.
+
+    Each link stores how many elements it skips, so the k-th smallest value
+    can be found by walking down the levels like a binary search.
+    """
+
+    def __init__(self, expected_size=100):
+        self.size = 0
+        self.maxlevels = int(1 + math.log(max(expected_size, 2), 2))
+        self.head = _SkiplistNode('HEAD', [_NIL] * self.maxlevels, [1] * self.maxlevels)
+        self._random = random.Random()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError('skiplist index out of range')
+        node = self.head
+        i += 1
+        for level in reversed(range(self.maxlevels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def rank(self, value):
+        """Number of stored values strictly less than value, in O(log n)."""
+        node = self.head
+        rank = 0
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                rank += node.width[level]
+                node = node.next[level]
+        return rank
+
+    def insert(self, value):
+        """Insert a value, keeping the collection sorted."""
+        chain = [None] * self.maxlevels
+        steps_at_level = [0] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        depth = min(self.maxlevels, 1 - int(math.log(1.0 - self._random.random(), 2.0)))
+        new_node = _SkiplistNode(value, [None] * depth, [None] * depth)
+        steps = 0
+        for level in range(depth):
+            prev_node = chain[level]
+            new_node.next[level] = prev_node.next[level]
+            prev_node.next[level] = new_node
+            new_node.width[level] = prev_node.width[level] - steps
+            prev_node.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(depth, self.maxlevels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        """Remove one occurrence of a value.
+
+        Raises:
+            KeyError: If the value is not present
+        """
+        chain = [None] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        if value != chain[0].next[0].value:
+            raise KeyError(value)
+
+        depth = len(chain[0].next[0].next)
+        for level in range(depth):
+            prev_node = chain[level]
+            prev_node.width[level] += prev_node.next[level].width[level] - 1
+            prev_node.next[level] = prev_node.next[level].next[level]
+        for level in range(depth, self.maxlevels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+
+class StreamingAnomalyDetector:
+    """Sliding-window anomaly detector for a single price series.
+
+    Every new price is scored against the statistics of the previous
+    ``window`` prices before it enters the window, so an old spike stops
+    influencing the score once it slides out.
+
+    Methods:
+        'zscore': rolling mean/std maintained Welford-style, O(1) per point
+        'mad': rolling median and median absolute deviation on an indexable
+            skiplist; window maintenance and the median are O(log w) per
+            point, the MAD selection O(log^2 w) (a bisection over ranks,
+            each an O(log w) skiplist lookup)
+    """
+
+    METHODS = ('zscore', 'mad')
+
+    # Settings that must match for saved state to be reused
+    CONFIG_KEYS = ('window', 'threshold', 'method', 'min_points')
+
+    # Scales the MAD so that it estimates the standard deviation of normal data
+    MAD_SCALE = 0.6745
+
+    def __init__(self, window=50, threshold=None, method='zscore', min_points=3):
+        """Initialize the detector.
+
+        Args:
+            window (int): Number of recent prices the statistics cover
+            threshold (float, optional): Score above which a price is flagged.
+                Defaults to 2.0 for 'zscore' (as detect_anomalies) and 3.5
+                for 'mad'.
+            method (str): 'zscore' or 'mad'
+            min_points (int): Prices required in the window before scoring
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown anomaly detection method: {method}")
+        if window < 2:
+            raise ValueError("window must hold at least 2 prices")
+        self.window = window
+        self.method = method
+        self.threshold = threshold if threshold is not None else \
+            (2.0 if method == 'zscore' else 3.5)
+        self.min_points = min_points
+        self.values = deque()
+        self.count = 0
+        self.last_score = None
+        self.last_timestamp = None
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._sorted = IndexableSkiplist(window) if method == 'mad' else None
+
+    def __len__(self):
+        return len(self.values)
+
+    def _add(self, price):
+        self.values.append(price)
+        if self._sorted is not None:
+            self._sorted.insert(price)
+            return
+        n = len(self.values)
+        delta = price - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (price - self._mean)
+
+    def _remove_oldest(self):
+        price = self.values.popleft()
+        if self._sorted is not None:
+            self._sorted.remove(price)
+            return
+        n = len(self.values)
+        if n == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        delta = price - self._mean
+        self._mean -= delta / n
+        self._m2 = max(0.0, self._m2 - delta * (price - self._mean))
+
+    def _resync(self):
+        """Recompute the running moments exactly to stop rounding drift.
+
+        Called once every ``window`` updates, so it stays O(1) amortized.
+        """
+        n = len(self.values)
+        self._mean = sum(self.values) / n if n else 0.0
+        self._m2 = sum((v - self._mean) ** 2 for v in self.values)
+
+    def _median(self):
+        n = len(self._sorted)
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
+
+    def _kth_deviation(self, k, median, split):
+        """k-th smallest |x - median| over the window (0-based).
+
+        Values left of ``split`` give deviations that grow towards the start
+        of the sorted window, values right of it grow towards the end, so the
+        deviations form two sorted sequences that are merged by bisection.
+        """
+        s = self._sorted
+        n_left, n_right = split, len(s) - split
+
+        def left(i):
+            return median - s[split - 1 - i]
+
+        def right(j):
+            return s[split + j] - median
+
+        lo, hi = max(0, k + 1 - n_right), min(k + 1, n_left)
+        while lo < hi:
+            i = (lo + hi) // 2
+            if left(i) < right(k - i):
+                lo = i + 1
+            else:
+                hi = i
+        i = lo
+        candidates = []
+        if i > 0:
+            candidates.append(left(i - 1))
+        if k + 1 - i > 0:
+            candidates.append(right(k - i))
+        return max(candidates)
+
+    def _mad(self, median):
+        s = self._sorted
+        n = len(s)
+        # Number of window values below the median
+        split = s.rank(median)
+        mid = n // 2
+        if n % 2:
+            return self._kth_deviation(mid, median, split)
+        return (self._kth_deviation(mid - 1, median, split) +
+                self._kth_deviation(mid, median, split)) / 2
+
+    def score(self, price):
+        """Score a price against the current window without adding it.
+
+        Args:
+            price (float): Price to score
+
+        Returns:
+            float: Absolute (robust) z-score, or None while the window holds
+                fewer than min_points prices or has zero dispersion
+        """
+        n = len(self.values)
+        if n < self.min_points:
+            return None
+
+        if self._sorted is None:
+            std = math.sqrt(self._m2 / n)
+            # Treat rounding residue left by removals as zero dispersion
+            if std <= 1e-8 * abs(self._mean):
+                return None
+            return abs(price - self._mean) / std
+
+        median = self._median()
+        mad = self._mad(median)
+        if mad == 0:
+            return None
+        return self.MAD_SCALE * abs(price - median) / mad
+
+    def update(self, price, timestamp=None):
+        """Score a new price and slide it into the window.
+
+        Args:
+            price (float): New price
+            timestamp (str, optional): Timestamp of the price, kept so the
+                state can be matched against the stored history
+
+        Returns:
+            bool: True if the price is an anomaly
+        """
+        self.last_score = self.score(price)
+        self._add(price)
+        if len(self.values) > self.window:
+            self._remove_oldest()
+        self.count += 1
+        self.last_timestamp = timestamp
+        if self._sorted is None and self.count % self.window == 0:
+            self._resync()
+        return self.last_score is not None and self.last_score > self.threshold
+
+    @property
+    def is_anomaly(self):
+        """bool: Whether the most recent price was flagged."""
+        return self.last_score is not None and self.last_score > self.threshold
+
+    def to_dict(self):
+        """Serialize the detector state.
+
+        Returns:
+            dict: JSON-serializable state
+        """
+        return {
+            'window': self.window,
+            'threshold': self.threshold,
+            'method': self.method,
+            'min_points': self.min_points,
+            'values': list(self.values),
+            'count': self.count,
+            'last_score': self.last_score,
+            'last_timestamp': self.last_timestamp
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore a detector from to_dict() output.
+
+        Args:
+            state (dict): Serialized state
+
+        Returns:
+            StreamingAnomalyDetector: Restored detector
+        """
+        detector = cls(state['window'], state['threshold'], state['method'],
+                       state['min_points'])
+        for price in state['values']:
+            detector._add(price)
+        detector.count = state['count']
+        detector.last_score = state['last_score']
+        detector.last_timestamp = state.get('last_timestamp')
+        return detector
@@ -0,0 +1,136 @@
+"""
+Analysis Cache
+Memoizes analysis results and reports per price series. Entries are keyed
+by series identity plus the series' history version, so new data makes old
+entries unreachable without explicit invalidation.
+"""
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+
+def estimate_size(value):
+    """Rough deep size of a cached value in bytes.
+
+    Args:
+        value: dict, list, tuple, str, number, None or NumPy array
+
+    Returns:
+        int: Estimated size
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class AnalysisCache:
+    """LRU cache bounded by entry count and estimated memory.
+
+    Keys are (series, version, operation, *args) tuples. Lookups and
+    inserts are O(1); the least recently used entries are evicted once
+    either bound is exceeded.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries, 0 disables caching
+            max_bytes (int): Maximum estimated size of all cached values
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return a cached value and mark it as recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        """Cache a value, evicting least recently used entries as needed."""
+        if self.max_entries <= 0:
+            return
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.nbytes -= evicted_size
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and caching it on a miss.
+
+        Args:
+            key (tuple): Cache key
+            compute (callable): Called without arguments on a miss
+
+        Returns:
+            The cached or freshly computed value
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def invalidate(self, series=None):
+        """Drop cached entries.
+
+        Args:
+            series (optional): Only drop entries of this series. Defaults to
+                dropping everything.
+        """
+        if series is None:
+            self._entries.clear()
+            self.nbytes = 0
+            return
+        for key in [k for k in self._entries if k[0] == series]:
+            self.nbytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        """Cache statistics.
+
+        Returns:
+            dict: Entries, estimated bytes, hits, misses, evictions and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None
+        }
@@ -0,0 +1,349 @@
+"""
+Memory-Mapped Columnar Price Store
+Keeps long per-product tick histories in two flat binary columns (int64
+epoch-microsecond timestamps and float64 prices) plus a small offset index,
+so opening a multi-year history maps the files instead of parsing them and
+time-range queries return zero-copy np.memmap views.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from .history_store import BaseHistoryStore
+from .ring_buffer import from_epoch_us, to_epoch_us
+
+DEFAULT_PRODUCT = 'default'
+
+
+def _as_epoch_us(timestamps):
+    """Convert ISO strings or epoch microseconds to an int64 array."""
+    timestamps = np.atleast_1d(np.asarray(timestamps))
+    if timestamps.dtype.kind in 'iu':
+        return timestamps.astype(np.int64, copy=False)
+    return np.fromiter((to_epoch_us(str(t)) for t in timestamps), dtype=np.int64,
+                       count=len(timestamps))
+
+
+class MemmapColumnStore:
+    """Columnar on-disk price store backed by np.memmap.
+
+    Every product owns a contiguous extent of slots in the shared
+    ``timestamps.i8`` and ``prices.f8`` column files. Appends write into the
+    free slots of the extent in place; a full extent is moved to the end of
+    the file with double the capacity, so appends never rewrite the file and
+    cost O(1) amortized. ``index.json`` maps each product to its extent
+    offset, capacity and length and is replaced atomically after the column
+    data is flushed, so a crash never exposes partially written points.
+    Moved extents leave dead slots behind until compact() repacks the files.
+
+    Timestamps must be non-decreasing per product, which lets range queries
+    use binary search.
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, directory, initial_capacity=1024, readonly=False):
+        """Open or create a store.
+
+        Args:
+            directory (str): Directory holding the column and index files
+            initial_capacity (int): Slots reserved for a new product
+            readonly (bool): Map the columns read-only
+        """
+        self.directory = Path(directory)
+        self.initial_capacity = max(1, initial_capacity)
+        self.readonly = readonly
+        if not readonly:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / 'index.json'
+        self.timestamps_path = self.directory / 'timestamps.i8'
+        self.prices_path = self.directory / 'prices.f8'
+        self.extents = {}
+        self.slots = 0
+        self._timestamps = None
+        self._prices = None
+        self._load_index()
+        self._map()
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.slots = index['slots']
+        self.extents = {product: list(extent) for product, extent in index['products'].items()}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': self.INDEX_VERSION,
+                'slots': self.slots,
+                # product -> [offset, capacity, length]
+                'products': self.extents
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _map(self):
+        if self.slots == 0:
+            self._timestamps = np.empty(0, dtype=np.int64)
+            self._prices = np.empty(0, dtype=np.float64)
+            return
+        mode = 'r' if self.readonly else 'r+'
+        self._timestamps = np.memmap(self.timestamps_path, dtype=np.int64, mode=mode,
+                                     shape=(self.slots,))
+        self._prices = np.memmap(self.prices_path, dtype=np.float64, mode=mode,
+                                 shape=(self.slots,))
+
+    def _resize_files(self, slots):
+        for path, itemsize in ((self.timestamps_path, 8), (self.prices_path, 8)):
+            with open(path, 'ab') as f:
+                f.truncate(slots * itemsize)
+        self.slots = slots
+        self._map()
+
+    def flush(self):
+        """Flush column data to disk and publish it through the index."""
+        if self.readonly:
+            return
+        if isinstance(self._timestamps, np.memmap):
+            self._timestamps.flush()
+            self._prices.flush()
+        self._save_index()
+
+    def close(self):
+        """Flush and release the memory maps."""
+        self.flush()
+        self._timestamps = self._prices = None
+
+    @property
+    def products(self):
+        """list: Stored product names."""
+        return list(self.extents)
+
+    def __len__(self):
+        return sum(extent[2] for extent in self.extents.values())
+
+    def count(self, product=DEFAULT_PRODUCT):
+        """Number of points stored for a product."""
+        extent = self.extents.get(product)
+        return extent[2] if extent else 0
+
+    def series(self, product=DEFAULT_PRODUCT):
+        """Zero-copy views of a product's full history.
+
+        Returns:
+            tuple: (int64 epoch-microsecond timestamps, float64 prices)
+        """
+        extent = self.extents.get(product)
+        if extent is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        offset, _, length = extent
+        return (self._timestamps[offset:offset + length],
+                self._prices[offset:offset + length])
+
+    def range(self, product=DEFAULT_PRODUCT, start=None, end=None):
+        """Zero-copy views of the points with start <= timestamp < end.
+
+        Args:
+            product (str): Product name
+            start: ISO timestamp or epoch microseconds, None for the beginning
+            end: ISO timestamp or epoch microseconds, None for the end
+
+        Returns:
+            tuple: (timestamps, prices) views, found by binary search
+        """
+        timestamps, prices = self.series(product)
+        lo = 0 if start is None else int(np.searchsorted(
+            timestamps, _as_epoch_us(start)[0], side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(
+            timestamps, _as_epoch_us(end)[0], side='left'))
+        return timestamps[lo:hi], prices[lo:hi]
+
+    def tail(self, product=DEFAULT_PRODUCT, n=None):
+        """Zero-copy views of the most recent n points (all when n is None)."""
+        timestamps, prices = self.series(product)
+        if n is None:
+            return timestamps, prices
+        start = max(0, len(timestamps) - n)
+        return timestamps[start:], prices[start:]
+
+    def _reserve(self, product, needed):
+        """Make room for ``needed`` more points, moving the extent if full."""
+        extent = self.extents.get(product)
+        if extent is not None and extent[2] + needed <= extent[1]:
+            return extent
+
+        length = extent[2] if extent else 0
+        capacity = max(self.initial_capacity, extent[1] * 2 if extent else 0)
+        while capacity < length + needed:
+            capacity *= 2
+        offset = self.slots
+        self._resize_files(self.slots + capacity)
+        if extent is not None and length:
+            old = extent[0]
+            self._timestamps[offset:offset + length] = self._timestamps[old:old + length]
+            self._prices[offset:offset + length] = self._prices[old:old + length]
+        extent = self.extents[product] = [offset, capacity, length]
+        return extent
+
+    def append(self, timestamps, prices, product=DEFAULT_PRODUCT, flush=True):
+        """Append points to a product's history.
+
+        Args:
+            timestamps: ISO strings or epoch microseconds, non-decreasing
+            prices: Prices matching the timestamps
+            product (str): Product name
+            flush (bool): Publish the points immediately. Pass False when
+                appending many batches and call flush() once at the end.
+
+        Raises:
+            ValueError: If timestamps go backwards
+        """
+        if self.readonly:
+            raise ValueError("store is opened read-only")
+        timestamps = _as_epoch_us(timestamps)
+        prices = np.atleast_1d(np.asarray(prices, dtype=np.float64))
+        if len(timestamps) != len(prices):
+            raise ValueError("timestamps and prices must have the same length")
+        if not len(timestamps):
+            return
+        last = self.series(product)[0][-1:]
+        if np.any(np.diff(timestamps) < 0) or (len(last) and timestamps[0] < last[0]):
+            raise ValueError(f"timestamps for {product} must be non-decreasing")
+
+        offset, _, length = self._reserve(product, len(timestamps))
+        start = offset + length
+        self._timestamps[start:start + len(timestamps)] = timestamps
+        self._prices[start:start + len(prices)] = prices
+        self.extents[product][2] = length + len(timestamps)
+        if flush:
+            self.flush()
+
+    def append_records(self, records, flush=True):
+        """Append {'timestamp', 'price'[, 'product']} records.
+
+        Records are grouped per product, so each product costs one
+        vectorized write.
+        """
+        grouped = {}
+        for record in records:
+            grouped.setdefault(record.get('product', DEFAULT_PRODUCT), []).append(record)
+        for product, group in grouped.items():
+            self.append([r['timestamp'] for r in group], [r['price'] for r in group],
+                        product, flush=False)
+        if flush:
+            self.flush()
+
+    def truncate_front(self, product, keep):
+        """Drop all but the most recent ``keep`` points of a product.
+
+        Only the index changes; the freed slots are reclaimed by compact().
+        """
+        extent = self.extents.get(product)
+        if extent is None or extent[2] <= keep:
+            return
+        drop = extent[2] - keep
+        extent[0] += drop
+        extent[1] -= drop
+        extent[2] = keep
+
+    def wasted_slots(self):
+        """Slots no longer referenced by any extent."""
+        return self.slots - sum(extent[1] for extent in self.extents.values())
+
+    def compact(self, slack=0.25):
+        """Rewrite the columns so every extent is tightly packed.
+
+        Args:
+            slack (float): Spare capacity left per product, as a fraction of
+                its length, so the next appends do not move it again
+        """
+        if self.readonly:
+            raise ValueError("store is opened read-only")
+        plan = {}
+        slots = 0
+        for product, (_, _, length) in self.extents.items():
+            capacity = max(length + int(length * slack), 1)
+            plan[product] = [slots, capacity, length]
+            slots += capacity
+
+        tmp_timestamps = self.timestamps_path.with_name(self.timestamps_path.name + '.tmp')
+        tmp_prices = self.prices_path.with_name(self.prices_path.name + '.tmp')
+        if slots:
+            timestamps = np.memmap(tmp_timestamps, dtype=np.int64, mode='w+', shape=(slots,))
+            prices = np.memmap(tmp_prices, dtype=np.float64, mode='w+', shape=(slots,))
+            for product, (offset, _, length) in plan.items():
+                old = self.extents[product][0]
+                timestamps[offset:offset + length] = self._timestamps[old:old + length]
+                prices[offset:offset + length] = self._prices[old:old + length]
+            timestamps.flush()
+            prices.flush()
+            del timestamps, prices
+        else:
+            open(tmp_timestamps, 'wb').close()
+            open(tmp_prices, 'wb').close()
+
+        self._timestamps = self._prices = None
+        os.replace(tmp_timestamps, self.timestamps_path)
+        os.replace(tmp_prices, self.prices_path)
+        self.extents = plan
+        self.slots = slots
+        self._save_index()
+        self._map()
+
+
+class MemmapHistoryStore(BaseHistoryStore):
+    """BaseHistoryStore adapter over a MemmapColumnStore.
+
+    Lets the workflows persist to the columnar format. load() only converts
+    the retained tail of each series to records, so opening a long history
+    stays fast; the full history remains available as memmap views through
+    ``columns``.
+    """
+
+    def __init__(self, directory, retention=1000, initial_capacity=1024):
+        """Initialize the store.
+
+        Args:
+            directory (str): Directory of the column store
+            retention (int, optional): Records returned by load() per
+                product. None returns everything. Older points stay on disk.
+        """
+        super().__init__(retention)
+        self.columns = MemmapColumnStore(directory, initial_capacity)
+        self.state_path = self.columns.directory / 'state.json'
+
+    def load(self):
+        records = []
+        for product in self.columns.products:
+            timestamps, prices = self.columns.tail(product, self.retention)
+            tagged = product != DEFAULT_PRODUCT
+            for ts, price in zip(timestamps.tolist(), prices.tolist()):
+                record = {'timestamp': from_epoch_us(ts), 'price': price}
+                if tagged:
+                    record['product'] = product
+                records.append(record)
+        if len(self.columns.products) > 1:
+            records.sort(key=lambda r: r['timestamp'])
+        return records
+
+    def append(self, records):
+        records = list(records)
+        if not records:
+            return
+        self.columns.append_records(records)
+        self.bytes_written += 16 * len(records)
+
+    def rewrite(self, records):
+        records = self.apply_retention(records)
+        for product in self.columns.products:
+            self.columns.truncate_front(product, 0)
+        self.columns.append_records(records, flush=False)
+        self.columns.compact()
+        self.bytes_written += 16 * len(records)
+
+    def close(self):
+        self.columns.close()
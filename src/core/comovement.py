@@ -0,0 +1,277 @@
+"""
+Co-Movement Index
+Rolling correlations of daily log returns across every product, kept up to
+date one day at a time, with a top-k "moves together" neighbour list per
+product.
+"""
+import numpy as np
+
+# Correlation is undefined for series that did not move inside the window
+_NO_CORRELATION = -np.inf
+
+
+class CoMovementIndex:
+    """Rolling return correlations and nearest co-movers of many products.
+
+    The last ``window`` daily returns of all N products are kept in a
+    (window, N) ring together with running per-product sums, so a new day
+    costs O(N) for the statistics. While N is at most ``dense_limit`` the
+    N x N cross-product matrix is kept as well and updated with two rank-1
+    updates per day, which makes correlation_matrix() and correlation()
+    free of any scan over the window; it takes 8 * N^2 bytes (8 MB at the
+    default limit). The neighbour lists are rebuilt at the end of every
+    update() / extend() with blocked matrix products of the standardized
+    returns (``block_size`` products at a time), so similar() is a lookup
+    and memory stays at O(block_size * N) even for tens of thousands of
+    products.
+    """
+
+    def __init__(self, window=60, k=10, block_size=256, dense_limit=1024):
+        """Initialize the index.
+
+        Args:
+            window (int): Number of daily returns the correlations cover
+            k (int): Neighbours kept per product
+            block_size (int): Products per matrix product when rebuilding
+                the neighbour lists
+            dense_limit (int): Largest product count for which the full
+                cross-product matrix is maintained incrementally; 0
+                disables it
+        """
+        self.window = window
+        self.k = k
+        self.block_size = block_size
+        self.dense_limit = dense_limit
+        self.products = []
+        self._index = {}
+        self._returns = np.zeros((window, 0))
+        self._head = 0
+        self._filled = 0
+        self._last = np.zeros(0)
+        self._sum = np.zeros(0)
+        self._sumsq = np.zeros(0)
+        self._cross = np.zeros((0, 0)) if dense_limit > 0 else None
+        # Running sums are rebuilt from the ring once per window to stop drift
+        self._updates_since_rebuild = 0
+        self._neighbors = None
+        self._neighbor_corr = None
+
+    def __len__(self):
+        return len(self.products)
+
+    @property
+    def observations(self):
+        """int: Returns currently inside the window."""
+        return self._filled
+
+    def add_products(self, products):
+        """Register products; their returns count as zero until prices arrive."""
+        new = [p for p in dict.fromkeys(products) if p not in self._index]
+        if not new:
+            return
+        for product in new:
+            self._index[product] = len(self.products)
+            self.products.append(product)
+        count = len(new)
+        self._returns = np.concatenate((self._returns, np.zeros((self.window, count))), axis=1)
+        self._last = np.concatenate((self._last, np.full(count, np.nan)))
+        self._sum = np.concatenate((self._sum, np.zeros(count)))
+        self._sumsq = np.concatenate((self._sumsq, np.zeros(count)))
+        if self._cross is not None:
+            if len(self.products) > self.dense_limit:
+                self._cross = None
+            else:
+                self._cross = np.pad(self._cross, ((0, count), (0, count)))
+        self._neighbors = None
+
+    def update(self, prices, refresh=True):
+        """Add one day of prices.
+
+        Args:
+            prices (dict or array-like): Product -> closing price, or prices
+                aligned with self.products. Products without a price (or
+                with NaN) keep their last price, i.e. a zero return.
+            refresh (bool): Rebuild the neighbour lists afterwards. Pass
+                False when adding several days and call refresh() once at
+                the end.
+        """
+        if isinstance(prices, dict):
+            self.add_products(prices)
+            day = np.full(len(self.products), np.nan)
+            for product, price in prices.items():
+                if price is not None:
+                    day[self._index[product]] = price
+        else:
+            day = np.asarray(prices, dtype=np.float64).reshape(-1)
+            if len(day) != len(self.products):
+                raise ValueError("prices must be aligned with the registered products")
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moved = (day > 0) & (self._last > 0)
+            returns = np.where(moved, np.log(day / self._last), 0.0)
+        had_prices = bool((self._last > 0).any())
+        self._last = np.where(np.isfinite(day) & (day > 0), day, self._last)
+        if not had_prices:
+            # The first day only sets the reference prices
+            return
+
+        if self._filled == self.window:
+            old = self._returns[self._head].copy()
+            self._sum -= old
+            self._sumsq -= old * old
+            if self._cross is not None:
+                self._cross -= np.outer(old, old)
+        self._returns[self._head] = returns
+        self._sum += returns
+        self._sumsq += returns * returns
+        if self._cross is not None:
+            self._cross += np.outer(returns, returns)
+        self._head = (self._head + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+
+        self._updates_since_rebuild += 1
+        if self._updates_since_rebuild >= self.window:
+            self._rebuild()
+        self._neighbors = None
+        if refresh:
+            self.refresh()
+
+    def extend(self, prices, products=None):
+        """Add many days of prices.
+
+        Args:
+            prices (array-like): (days, N) closing prices, oldest first
+            products (list, optional): Column names; defaults to the
+                registered products
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if products is not None:
+            self.add_products(products)
+            columns = np.fromiter((self._index[p] for p in products), dtype=np.int64,
+                                  count=len(products))
+        for row in prices:
+            if products is not None:
+                day = np.full(len(self.products), np.nan)
+                day[columns] = row
+                row = day
+            self.update(row, refresh=False)
+        self.refresh()
+
+    def _rebuild(self):
+        """Recompute the running sums exactly from the ring."""
+        returns = self._returns[:self._filled]
+        self._sum = returns.sum(axis=0)
+        self._sumsq = np.einsum('ij,ij->j', returns, returns)
+        if self._cross is not None:
+            self._cross = returns.T @ returns
+        self._updates_since_rebuild = 0
+
+    def _moments(self):
+        n = self._filled
+        mean = self._sum / n
+        std = np.sqrt(np.maximum(self._sumsq / n - mean * mean, 0.0))
+        # Columns that barely moved are treated as flat
+        std[std < 1e-12] = 0.0
+        return mean, std
+
+    def _standardized(self, dtype=np.float64):
+        """(window, N) returns scaled so that column dot products are correlations."""
+        mean, std = self._moments()
+        moving = std > 0
+        scale = np.divide(1.0, std * np.sqrt(self._filled), out=np.zeros_like(std), where=moving)
+        return ((self._returns[:self._filled] - mean) * scale).astype(dtype, copy=False), moving
+
+    def correlation_matrix(self):
+        """Correlation matrix of the returns in the window.
+
+        Returns:
+            numpy.ndarray: (N, N) correlations in self.products order; NaN
+                for products without price changes in the window
+        """
+        n = self._filled
+        if n < 2:
+            return np.full((len(self), len(self)), np.nan)
+        mean, std = self._moments()
+        if self._cross is not None:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = (self._cross / n - np.outer(mean, mean)) / np.outer(std, std)
+        else:
+            z, _ = self._standardized()
+            corr = np.empty((len(self), len(self)))
+            for lo in range(0, len(self), self.block_size):
+                corr[lo:lo + self.block_size] = z[:, lo:lo + self.block_size].T @ z
+        moving = std > 0
+        corr[~moving] = np.nan
+        corr[:, ~moving] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def correlation(self, a, b):
+        """Correlation of two products' returns, or None when undefined."""
+        i, j = self._index[a], self._index[b]
+        if self._filled < 2:
+            return None
+        mean, std = self._moments()
+        if std[i] == 0 or std[j] == 0:
+            return None
+        if self._cross is not None:
+            corr = (self._cross[i, j] / self._filled - mean[i] * mean[j]) / (std[i] * std[j])
+        else:
+            returns = self._returns[:self._filled]
+            corr = np.mean((returns[:, i] - mean[i]) * (returns[:, j] - mean[j])) / (std[i] * std[j])
+        return float(np.clip(corr, -1.0, 1.0))
+
+    def refresh(self):
+        """Rebuild every product's neighbour list with blocked matrix products."""
+        n_products = len(self)
+        k = min(self.k, max(n_products - 1, 0))
+        self._neighbors = np.zeros((n_products, k), dtype=np.int64)
+        self._neighbor_corr = np.full((n_products, k), _NO_CORRELATION)
+        if self._filled < 2 or k == 0:
+            return
+        # Single precision halves the matrix product cost and is ample for ranking
+        z, moving = self._standardized(np.float32)
+        for lo in range(0, n_products, self.block_size):
+            hi = min(lo + self.block_size, n_products)
+            corr = z[:, lo:hi].T @ z
+            corr[np.arange(hi - lo), np.arange(lo, hi)] = _NO_CORRELATION
+            top = np.argpartition(corr, -k, axis=1)[:, -k:]
+            top_corr = np.take_along_axis(corr, top, axis=1).astype(np.float64)
+            # Flat products have all-zero columns; drop them after the selection
+            top_corr[~moving[top]] = _NO_CORRELATION
+            top_corr[~moving[lo:hi]] = _NO_CORRELATION
+            order = np.argsort(-top_corr, axis=1, kind='stable')
+            self._neighbors[lo:hi] = np.take_along_axis(top, order, axis=1)
+            self._neighbor_corr[lo:hi] = np.minimum(np.take_along_axis(top_corr, order, axis=1), 1.0)
+
+    def similar(self, product, k=None):
+        """Products whose returns correlate most with a product's.
+
+        Args:
+            product (str): Product name
+            k (int, optional): Number of neighbours, default self.k. Asking
+                for more than self.k scans that product's row directly.
+
+        Returns:
+            list: (product, correlation) tuples, most correlated first
+        """
+        k = self.k if k is None else k
+        i = self._index.get(product)
+        if i is None:
+            return []
+        if k > self.k:
+            if self._filled < 2:
+                return []
+            z, moving = self._standardized()
+            corr = z[:, i] @ z
+            corr[~moving] = _NO_CORRELATION
+            corr[i] = _NO_CORRELATION
+            if not moving[i]:
+                return []
+            order = np.argsort(-corr, kind='stable')[:k]
+            rows, values = order, np.minimum(corr[order], 1.0)
+        else:
+            if self._neighbors is None:
+                self.refresh()
+            rows, values = self._neighbors[i, :k], self._neighbor_corr[i, :k]
+        return [(self.products[j], float(c)) for j, c in zip(rows, values)
+                if c != _NO_CORRELATION]
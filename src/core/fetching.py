@@ -0,0 +1,431 @@
+"""
+Asynchronous Price Fetching
+Fetches prices for many products concurrently from pluggable sources, with
+pooled keep-alive connections, per-source concurrency and rate limits,
+timeouts, retries with backoff and fallback to the last known price.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, quote, urlsplit
+
+from .metrics import NullMetrics
+
+
+class PriceFetchError(Exception):
+    """Raised when a source cannot provide a price."""
+
+
+class RateLimiter:
+    """Token bucket limiting how many requests start per second."""
+
+    def __init__(self, rate, burst=None):
+        """Initialize the limiter.
+
+        Args:
+            rate (float): Sustained requests per second
+            burst (int, optional): Bucket size. Defaults to max(1, rate).
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a request may start."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HTTPConnectionPool:
+    """Pool of keep-alive HTTP/1.1 connections to a single host."""
+
+    def __init__(self, host, port, max_connections=10):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self._idle = []
+        self._open = 0
+        self._available = None
+
+    async def _acquire(self):
+        if self._available is None:
+            self._available = asyncio.Semaphore(self.max_connections)
+        await self._available.acquire()
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            self._open -= 1
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except BaseException:
+            self._available.release()
+            raise
+        self._open += 1
+        return reader, writer
+
+    def _release(self, connection, reusable):
+        reader, writer = connection
+        if reusable:
+            self._idle.append(connection)
+        else:
+            writer.close()
+            self._open -= 1
+        self._available.release()
+
+    async def request(self, method, target):
+        """Send a request and read the response.
+
+        Args:
+            method (str): HTTP method
+            target (str): Request path including the query string
+
+        Returns:
+            tuple: (status code, headers dict, body bytes)
+        """
+        connection = await self._acquire()
+        reader, writer = connection
+        reusable = False
+        try:
+            writer.write(
+                f"{method} {target} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Connection: keep-alive\r\n\r\n".encode('ascii')
+            )
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed by server")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            reusable = headers.get('connection', '').lower() != 'close'
+            return status, headers, body
+        finally:
+            self._release(connection, reusable)
+
+    async def close(self):
+        """Close every idle connection."""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            self._open -= 1
+
+
+class PriceSource:
+    """Base class for price sources used by AsyncPriceFetcher."""
+
+    name = 'base'
+
+    def __init__(self, max_concurrency=10, rate_limit=None):
+        """Initialize the source limits.
+
+        Args:
+            max_concurrency (int): Requests in flight at the same time
+            rate_limit (float, optional): Requests per second, None for unlimited
+        """
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self._slots = None
+
+    async def __aenter__(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        await self._slots.acquire()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._slots.release()
+
+    async def fetch_price(self, product):
+        """Fetch the current price of one product.
+
+        Args:
+            product (str): Product name
+
+        Returns:
+            float: Current price
+
+        Raises:
+            PriceFetchError: If the source has no price for the product
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Release pooled resources."""
+        pass
+
+
+class HTTPPriceSource(PriceSource):
+    """Source that reads prices from a JSON HTTP endpoint.
+
+    The endpoint is expected to answer GET {path}?product=<name> with a JSON
+    object holding a 'price' field.
+    """
+
+    name = 'http'
+
+    def __init__(self, base_url, path='/price', max_concurrency=20, rate_limit=None):
+        super().__init__(max_concurrency, rate_limit)
+        url = urlsplit(base_url)
+        if url.scheme != 'http':
+            raise ValueError("only plain http:// endpoints are supported")
+        self.path = (url.path.rstrip('/') + path) or '/'
+        self.pool = HTTPConnectionPool(url.hostname, url.port or 80, max_concurrency)
+
+    async def fetch_price(self, product):
+        status, _, body = await self.pool.request(
+            'GET', f"{self.path}?product={quote(product)}")
+        if status != 200:
+            raise PriceFetchError(f"HTTP {status} for {product}")
+        try:
+            return float(json.loads(body)['price'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise PriceFetchError(f"Malformed response for {product}: {e}")
+
+    async def close(self):
+        await self.pool.close()
+
+
+class AsyncPriceFetcher:
+    """Fetch prices for many products concurrently from one source."""
+
+    def __init__(self, source, timeout=5.0, retries=2, backoff=0.1, metrics=None):
+        """Initialize the fetcher.
+
+        Args:
+            source (PriceSource): Where prices come from
+            timeout (float): Seconds allowed per attempt
+            retries (int): Extra attempts after a failure
+            backoff (float): Base delay in seconds, doubled on every retry
+            metrics (WorkflowMetrics, optional): Receives the latency of
+                every request and the fallback/failure counts
+        """
+        self.source = source
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.last_known = {}
+        self.stats = {'requests': 0, 'succeeded': 0, 'retried': 0,
+                      'fallbacks': 0, 'failed': 0}
+        self._loop = None
+
+    def remember(self, product, price):
+        """Record a known price to fall back on when fetching fails."""
+        self.last_known[product] = price
+
+    async def fetch_one(self, product):
+        """Fetch one product, retrying and falling back to the last known price.
+
+        Args:
+            product (str): Product name
+
+        Returns:
+            float: Current price, the last known price, or None
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats['retried'] += 1
+                delay = self.backoff * (2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            self.stats['requests'] += 1
+            start = time.perf_counter()
+            try:
+                async with self.source:
+                    price = await asyncio.wait_for(
+                        self.source.fetch_price(product), self.timeout)
+            except (PriceFetchError, OSError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError, ValueError, IndexError):
+                self.metrics.observe('price_fetch_seconds', time.perf_counter() - start,
+                                     source=self.source.name, result='error')
+                continue
+            self.metrics.observe('price_fetch_seconds', time.perf_counter() - start,
+                                 source=self.source.name, result='ok')
+            self.stats['succeeded'] += 1
+            self.last_known[product] = price
+            return price
+
+        if product in self.last_known:
+            self.stats['fallbacks'] += 1
+            self.metrics.inc('price_fetch_fallbacks_total', source=self.source.name)
+            return self.last_known[product]
+        self.stats['failed'] += 1
+        self.metrics.inc('price_fetch_failures_total', source=self.source.name)
+        return None
+
+    async def fetch_many(self, products):
+        """Fetch every product concurrently.
+
+        Args:
+            products (iterable): Product names
+
+        Returns:
+            dict: Mapping of product name to price; products without any
+                price are left out
+        """
+        products = list(products)
+        prices = await asyncio.gather(*(self.fetch_one(p) for p in products))
+        return {p: price for p, price in zip(products, prices) if price is not None}
+
+    def fetch_prices(self, products):
+        """Synchronous wrapper around fetch_many.
+
+        Runs on a private event loop that is kept between calls, so pooled
+        connections are reused from one monitoring cycle to the next. Must
+        not be called from inside a running event loop; await fetch_many
+        there instead.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(self.fetch_many(products))
+
+    def close(self):
+        """Close the source and the private event loop."""
+        if self._loop is None or self._loop.is_closed():
+            asyncio.run(self.source.close())
+            return
+        self._loop.run_until_complete(self.source.close())
+        self._loop.close()
+
+
+class StubPriceServer:
+    """Local HTTP server serving random-walk prices, for offline use.
+
+    Answers GET /price?product=<name> with {"product": ..., "price": ...}
+    over keep-alive connections. Latency and failure rate are configurable
+    so retries and timeouts can be exercised.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, base_prices=None, default_price=500.0,
+                 latency=0.0, failure_rate=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.prices = dict(base_prices or {})
+        self.default_price = default_price
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._server = None
+        self._handlers = set()
+        self._thread = None
+        self._loop = None
+
+    @property
+    def url(self):
+        """str: Base URL of the running server."""
+        return f"http://{self.host}:{self.port}"
+
+    def _next_price(self, product):
+        price = self.prices.get(product, self.default_price)
+        price = round(price * (1 + self._random.uniform(-0.05, 0.05)), 2)
+        self.prices[product] = price
+        return price
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.requests += 1
+
+                target = request_line.split()[1].decode('ascii')
+                url = urlsplit(target)
+                product = parse_qs(url.query).get('product', [''])[0]
+
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if url.path != '/price' or not product:
+                    status, body = '404 Not Found', b'{"error": "not found"}'
+                elif self._random.random() < self.failure_rate:
+                    status, body = '503 Service Unavailable', b'{"error": "unavailable"}'
+                else:
+                    status = '200 OK'
+                    body = json.dumps({
+                        'product': product,
+                        'price': self._next_price(product)
+                    }).encode('utf-8')
+
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode('ascii') + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(task)
+
+    async def start(self):
+        """Start serving on the current event loop."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop serving."""
+        if self._server is not None:
+            self._server.close()
+            # Drop keep-alive connections that clients left open
+            handlers = list(self._handlers)
+            for handler in handlers:
+                handler.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def start_in_thread(self):
+        """Start serving on a background thread with its own event loop.
+
+        Returns:
+            StubPriceServer: self, once the server is accepting connections
+        """
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='stub-price-server', daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        """Stop a server started with start_in_thread."""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,431 @@
+"""
+Price Forecasting
+Holt linear and Holt-Winters (additive) exponential smoothing fitted for
+many price series at once, with O(1) incremental updates per new price and
+prediction intervals.
+
+The models use the error-correction form of exponential smoothing:
+
+    e       = y - (level + trend + season[t mod m])
+    level  += trend + alpha * e
+    trend  += beta * e
+    season[t mod m] += gamma * e
+
+so the h-step forecast variance has a closed form (Hyndman et al.,
+"Forecasting with Exponential Smoothing", class 1 models).
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+from .ai_engine import EWMA_ALPHA, SMA_WINDOW, BaseAIEngine, IncrementalTrendAnalyzer, _as_ragged
+
+# Steps ahead forecast by default (days for daily series)
+DEFAULT_HORIZONS = (7, 30)
+
+
+class HoltWintersState:
+    """Smoothing state of N price series held as NumPy arrays.
+
+    Every update touches each series once, so a new price costs O(1) per
+    series and a batch of prices is a handful of vectorized operations.
+    Without a season length the model is Holt's linear trend method.
+    """
+
+    # Settings that must match for saved state to be reused
+    CONFIG_KEYS = ('alpha', 'beta', 'gamma', 'season_length')
+
+    def __init__(self, n_series=0, alpha=0.5, beta=0.05, gamma=0.1, season_length=None):
+        """Initialize the state.
+
+        Args:
+            n_series (int): Number of series
+            alpha (float): Level smoothing factor
+            beta (float): Trend smoothing factor (error-correction form,
+                at most alpha)
+            gamma (float): Seasonal smoothing factor, ignored without a
+                season length
+            season_length (int, optional): Season length in steps, e.g. 7
+                for a weekly pattern in daily prices. None disables
+                seasonality.
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.season_length = season_length if season_length and season_length > 1 else None
+        self.gamma = gamma if self.season_length else 0.0
+        self.level = np.zeros(n_series)
+        self.trend = np.zeros(n_series)
+        self.season = np.zeros((n_series, self.season_length or 1))
+        self.count = np.zeros(n_series, dtype=np.int64)
+        # Sum of squared one-step errors once the trend is initialized
+        self.sse = np.zeros(n_series)
+
+    def __len__(self):
+        return len(self.level)
+
+    def add_series(self, count=1):
+        """Append fresh series.
+
+        Returns:
+            int: Index of the first new series
+        """
+        first = len(self)
+        self.level = np.concatenate((self.level, np.zeros(count)))
+        self.trend = np.concatenate((self.trend, np.zeros(count)))
+        self.season = np.concatenate((self.season, np.zeros((count, self.season.shape[1]))))
+        self.count = np.concatenate((self.count, np.zeros(count, dtype=np.int64)))
+        self.sse = np.concatenate((self.sse, np.zeros(count)))
+        return first
+
+    def update(self, prices, index=None):
+        """Add one new price to each of the given series.
+
+        Args:
+            prices (array-like): New prices; NaN entries are skipped
+            index (array-like, optional): Series the prices belong to.
+                Defaults to every series in order.
+        """
+        prices = np.asarray(prices, dtype=np.float64).reshape(-1)
+        if index is None:
+            index = np.arange(len(self))
+        else:
+            index = np.asarray(index, dtype=np.int64).reshape(-1)
+        valid = np.isfinite(prices)
+        if not valid.all():
+            prices, index = prices[valid], index[valid]
+        if not len(index):
+            return
+
+        count = self.count[index]
+        second = count == 1
+        rest = count >= 2
+
+        level = self.level[index]
+        trend = self.trend[index]
+        slot = count % self.season.shape[1]
+        season = self.season[index, slot]
+
+        error = prices - (level + trend + season)
+        new_level = np.where(rest, level + trend + self.alpha * error, prices)
+        # The first two prices set the level and the initial trend
+        new_trend = np.where(rest, trend + self.beta * error,
+                             np.where(second, prices - level, 0.0))
+        self.level[index] = new_level
+        self.trend[index] = new_trend
+        if self.gamma:
+            self.season[index, slot] = np.where(rest, season + self.gamma * error, season)
+        self.sse[index] += np.where(rest, error * error, 0.0)
+        self.count[index] = count + 1
+
+    def extend(self, prices, offsets=None):
+        """Replay whole series through the model in one vectorized pass.
+
+        Args:
+            prices (array-like): 2-D array with one row per series, or the
+                concatenated series when offsets is given (one series per
+                state series, in order)
+            offsets (array-like, optional): CSR-style series offsets (N+1)
+        """
+        values, offsets = _as_ragged(prices, offsets)
+        lengths = np.diff(offsets)
+        if len(lengths) != len(self):
+            raise ValueError("prices must hold one series per state series")
+        starts = offsets[:-1]
+        for step in range(int(lengths.max()) if len(lengths) else 0):
+            active = np.flatnonzero(lengths > step)
+            self.update(values[starts[active] + step], active)
+
+    def variance_factors(self, horizons):
+        """Ratio of the h-step to the one-step forecast variance.
+
+        Args:
+            horizons (array-like): Steps ahead
+
+        Returns:
+            numpy.ndarray: One factor per horizon
+        """
+        h = np.asarray(horizons, dtype=np.float64)
+        a, b = self.alpha, self.beta
+        factor = 1 + (h - 1) * (a * a + a * b * h + b * b * h * (2 * h - 1) / 6)
+        if self.season_length:
+            m, g = self.season_length, self.gamma
+            k = np.floor((h - 1) / m)
+            factor += g * k * (2 * a + g + b * m * (k + 1))
+        return factor
+
+    def forecast(self, horizons=DEFAULT_HORIZONS, interval=0.95, index=None):
+        """Point forecasts and prediction intervals.
+
+        Args:
+            horizons (iterable): Steps ahead to forecast
+            interval (float): Coverage of the prediction interval
+            index (array-like, optional): Series to forecast, default all
+
+        Returns:
+            dict: 'horizons' plus (N, H) arrays 'forecast', 'lower' and
+                'upper', and the per-series one-step error 'sigma'.
+                Forecasts are NaN for series with fewer than 2 prices and
+                intervals are NaN until a one-step error has been seen.
+        """
+        horizons = np.asarray(horizons, dtype=np.int64).reshape(-1)
+        if index is None:
+            index = slice(None)
+        count = self.count[index]
+        m = self.season.shape[1]
+        slots = (count[:, None] + horizons[None, :] - 1) % m
+        season = np.take_along_axis(self.season[index], slots, axis=1)
+        point = self.level[index][:, None] + horizons[None, :] * self.trend[index][:, None] + season
+        point[count < 2] = np.nan
+
+        residuals = count - 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sigma = np.where(residuals > 0, np.sqrt(self.sse[index] / residuals), np.nan)
+        z = NormalDist().inv_cdf(0.5 + interval / 2)
+        spread = z * sigma[:, None] * np.sqrt(self.variance_factors(horizons))[None, :]
+        return {
+            'horizons': horizons,
+            'forecast': point,
+            # Prices cannot go negative
+            'lower': np.maximum(point - spread, 0.0),
+            'upper': point + spread,
+            'sigma': sigma
+        }
+
+    def to_dict(self):
+        """Serialize the state.
+
+        Returns:
+            dict: JSON-serializable state
+        """
+        return {
+            'alpha': self.alpha,
+            'beta': self.beta,
+            'gamma': self.gamma,
+            'season_length': self.season_length,
+            'level': self.level.tolist(),
+            'trend': self.trend.tolist(),
+            'season': self.season.tolist(),
+            'count': self.count.tolist(),
+            'sse': self.sse.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Restore a state from to_dict() output.
+
+        Args:
+            state (dict): Serialized state
+
+        Returns:
+            HoltWintersState: Restored state
+        """
+        restored = cls(0, state['alpha'], state['beta'], state['gamma'], state['season_length'])
+        restored.level = np.asarray(state['level'], dtype=np.float64)
+        restored.trend = np.asarray(state['trend'], dtype=np.float64)
+        restored.season = np.asarray(state['season'], dtype=np.float64) \
+            .reshape(len(restored.level), restored.season_length or 1)
+        restored.count = np.asarray(state['count'], dtype=np.int64)
+        restored.sse = np.asarray(state['sse'], dtype=np.float64)
+        return restored
+
+
+def _forecast_fields(result, row=0):
+    """Flatten one series of a forecast() result into analysis fields.
+
+    Tuples keep the analysis hashable for the workflow's report cache.
+    """
+    return {
+        'forecast_horizons': tuple(int(h) for h in result['horizons']),
+        'forecast': tuple(float(v) for v in result['forecast'][row]),
+        'forecast_lower': tuple(float(v) for v in result['lower'][row]),
+        'forecast_upper': tuple(float(v) for v in result['upper'][row])
+    }
+
+
+class ForecastingTrendAnalyzer(IncrementalTrendAnalyzer):
+    """IncrementalTrendAnalyzer that also keeps a Holt/Holt-Winters state.
+
+    analyze() returns the same result as
+    ForecastingAIEngine.analyze_price_trend on the full series.
+    """
+
+    CONFIG_KEYS = IncrementalTrendAnalyzer.CONFIG_KEYS + (
+        'horizons', 'interval') + HoltWintersState.CONFIG_KEYS
+
+    def __init__(self, window_size=SMA_WINDOW, ewma_alpha=EWMA_ALPHA, horizons=DEFAULT_HORIZONS,
+                 interval=0.95, alpha=0.5, beta=0.05, gamma=0.1, season_length=None):
+        """Initialize the analyzer.
+
+        Args:
+            window_size (int): Number of trailing points in the SMA
+            ewma_alpha (float): Smoothing factor of the EWMA
+            horizons (iterable): Steps ahead to forecast
+            interval (float): Coverage of the prediction intervals
+            alpha, beta, gamma, season_length: See HoltWintersState
+        """
+        super().__init__(window_size, ewma_alpha)
+        self.horizons = [int(h) for h in horizons]
+        self.interval = interval
+        self.model = HoltWintersState(1, alpha, beta, gamma, season_length)
+
+    def update(self, price, timestamp=None):
+        super().update(price, timestamp)
+        self.model.update([price])
+
+    def analyze(self):
+        analysis = super().analyze()
+        if self.count >= 2:
+            analysis.update(_forecast_fields(self.model.forecast(self.horizons, self.interval)))
+        return analysis
+
+    def to_dict(self):
+        state = super().to_dict()
+        state.update({key: value for key, value in self.model.to_dict().items()
+                      if key in HoltWintersState.CONFIG_KEYS})
+        state['horizons'] = self.horizons
+        state['interval'] = self.interval
+        state['model'] = self.model.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        analyzer = cls(state['window_size'], state['ewma_alpha'], state['horizons'],
+                       state['interval'], state['alpha'], state['beta'], state['gamma'],
+                       state['season_length'])
+        analyzer._restore(state)
+        analyzer.model = HoltWintersState.from_dict(state['model'])
+        return analyzer
+
+
+class ForecastingAIEngine(BaseAIEngine):
+    """AI engine that adds short-horizon price forecasts to the trend analysis.
+
+    Every analysis carries 'forecast_horizons' and the matching
+    'forecast', 'forecast_lower' and 'forecast_upper' values; batch
+    analyses carry them as (N, H) arrays. Models for many products are
+    fitted together, one vectorized step per time point.
+    """
+
+    def __init__(self, horizons=DEFAULT_HORIZONS, interval=0.95, alpha=0.5, beta=0.05,
+                 gamma=0.1, season_length=None):
+        """Initialize the engine.
+
+        Args:
+            horizons (iterable): Steps ahead to forecast (days for daily prices)
+            interval (float): Coverage of the prediction intervals
+            alpha (float): Level smoothing factor
+            beta (float): Trend smoothing factor (error-correction form)
+            gamma (float): Seasonal smoothing factor
+            season_length (int, optional): Season length in steps, e.g. 7
+                for weekly seasonality in daily prices
+        """
+        super().__init__()
+        self.horizons = tuple(int(h) for h in horizons)
+        self.interval = interval
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.season_length = season_length
+
+    def create_forecast_state(self, n_series=0):
+        """
+        Create an empty smoothing state for incremental forecasting.
+
+        Args:
+            n_series (int): Number of series
+
+        Returns:
+            HoltWintersState: Fresh state with the engine's settings
+        """
+        return HoltWintersState(n_series, self.alpha, self.beta, self.gamma, self.season_length)
+
+    def forecast(self, historical_prices):
+        """
+        Forecast a single price series.
+
+        Args:
+            historical_prices (list): Historical prices, oldest first
+
+        Returns:
+            dict: 'forecast_horizons', 'forecast', 'forecast_lower' and
+                'forecast_upper', or an empty dict with fewer than 2 prices
+        """
+        if historical_prices is None or len(historical_prices) < 2:
+            return {}
+        state = self.create_forecast_state(1)
+        state.extend(np.asarray(historical_prices, dtype=np.float64)[None, :])
+        return _forecast_fields(state.forecast(self.horizons, self.interval))
+
+    def forecast_batch(self, prices, offsets=None):
+        """
+        Forecast many series in one vectorized pass.
+
+        Args:
+            prices (array-like): 2-D array with one series per row, or the
+                concatenated series when offsets is given
+            offsets (array-like, optional): CSR-style series offsets (N+1)
+
+        Returns:
+            dict: See HoltWintersState.forecast
+        """
+        values, offsets = _as_ragged(prices, offsets)
+        state = self.create_forecast_state(len(offsets) - 1)
+        state.extend(values, offsets)
+        return state.forecast(self.horizons, self.interval)
+
+    def analyze_price_trend(self, historical_prices):
+        analysis = super().analyze_price_trend(historical_prices)
+        analysis.update(self.forecast(historical_prices))
+        return analysis
+
+    def create_trend_analyzer(self):
+        return ForecastingTrendAnalyzer(SMA_WINDOW, horizons=self.horizons,
+                                        interval=self.interval, alpha=self.alpha,
+                                        beta=self.beta, gamma=self.gamma,
+                                        season_length=self.season_length)
+
+    def analyze_price_trend_batch(self, prices, offsets=None, state=None):
+        """
+        Analyze and forecast many series in one vectorized pass.
+
+        Args:
+            prices (array-like): 2-D array with one series per row, or the
+                concatenated series when offsets is given
+            offsets (array-like, optional): CSR-style series offsets (N+1)
+            state (HoltWintersState, optional): Up-to-date state of the same
+                series, kept incrementally by the caller; forecasts are
+                read from it instead of refitting
+
+        Returns:
+            dict: BaseAIEngine.analyze_price_trend_batch results plus
+                'forecast_horizons' and (N, H) arrays 'forecast',
+                'forecast_lower' and 'forecast_upper'
+        """
+        values, offsets = _as_ragged(prices, offsets)
+        analysis = super().analyze_price_trend_batch(values, offsets)
+        if state is not None:
+            forecast = state.forecast(self.horizons, self.interval)
+        else:
+            forecast = self.forecast_batch(values, offsets)
+        analysis['forecast_horizons'] = forecast['horizons']
+        analysis['forecast'] = forecast['forecast']
+        analysis['forecast_lower'] = forecast['lower']
+        analysis['forecast_upper'] = forecast['upper']
+        return analysis
+
+    def generate_insights(self, analysis_results):
+        insights = super().generate_insights(analysis_results)
+        if not analysis_results or 'forecast' not in analysis_results:
+            return insights
+
+        lines = [insights]
+        coverage = f"{self.interval * 100:.0f}%"
+        for horizon, point, lower, upper in zip(analysis_results['forecast_horizons'],
+                                                analysis_results['forecast'],
+                                                analysis_results['forecast_lower'],
+                                                analysis_results['forecast_upper']):
+            line = f"{horizon}-step forecast: ${point:.2f}"
+            if np.isfinite(lower):
+                line += f" ({coverage} interval ${lower:.2f} - ${upper:.2f})"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,247 @@
+"""
+History storage backends for the Price Monitor Workflow.
+Handles persistence of price records so that new ticks can be appended
+without rewriting the whole history file.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+class BaseHistoryStore:
+    """Base class for price history persistence backends."""
+
+    def __init__(self, retention=1000):
+        """Initialize the store.
+
+        Args:
+            retention (int, optional): Maximum number of records to keep.
+                None keeps every record.
+        """
+        self.retention = retention
+        self.state_path = None
+        # Total bytes written by append/rewrite, for instrumentation
+        self.bytes_written = 0
+
+    def load(self):
+        """Load persisted records.
+
+        Returns:
+            list: Records as dicts with 'timestamp' and 'price' keys
+        """
+        raise NotImplementedError
+
+    def append(self, records):
+        """Persist new records after the existing ones.
+
+        Args:
+            records (list): Records to append
+        """
+        raise NotImplementedError
+
+    def rewrite(self, records):
+        """Replace the persisted history with the given records.
+
+        Args:
+            records (list): Complete set of records to keep
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the store."""
+        pass
+
+    def load_state(self):
+        """Load the analysis state saved alongside the history.
+
+        Returns:
+            dict: Saved state, or None if there is none
+        """
+        if self.state_path is None or not self.state_path.exists():
+            return None
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def save_state(self, state):
+        """Save analysis state alongside the history.
+
+        Args:
+            state (dict): JSON-serializable state
+        """
+        if self.state_path is None:
+            return
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def apply_retention(self, records):
+        """Trim records to the configured retention.
+
+        Records carrying a 'product' key are trimmed per product, so a
+        multi-product history keeps the most recent records of every series.
+
+        Args:
+            records (list): Records in chronological order
+
+        Returns:
+            list: The most recent records allowed by the retention policy
+        """
+        records = list(records)
+        if self.retention is None or len(records) <= self.retention:
+            return records
+        if 'product' not in records[-1]:
+            return records[-self.retention:]
+
+        kept = []
+        counts = {}
+        for record in reversed(records):
+            product = record.get('product')
+            count = counts.get(product, 0)
+            if count < self.retention:
+                counts[product] = count + 1
+                kept.append(record)
+        kept.reverse()
+        return kept
+
+
+class JSONHistoryStore(BaseHistoryStore):
+    """Legacy single-document JSON store.
+
+    Every append rewrites the whole file, so it is only suitable for short
+    histories. Kept for compatibility with existing historical_prices.json files.
+    """
+
+    def __init__(self, path, retention=1000):
+        super().__init__(retention)
+        self.path = Path(path)
+        self.state_path = self.path.with_name(self.path.name + '.state.json')
+        self._records = []
+
+    def load(self):
+        if not self.path.exists():
+            self._records = []
+            return []
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        self._records = self.apply_retention(data.get('prices', []))
+        return list(self._records)
+
+    def append(self, records):
+        self._records.extend(records)
+        self.rewrite(self._records)
+
+    def rewrite(self, records):
+        self._records = self.apply_retention(records)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'last_updated': datetime.now().isoformat(),
+                'prices': self._records
+            }, f, indent=2)
+            self.bytes_written += f.tell()
+        os.replace(tmp_path, self.path)
+
+
+class JSONLinesHistoryStore(BaseHistoryStore):
+    """Append-only JSON-lines store with periodic compaction.
+
+    Each record is written as one line, so appends cost O(1) regardless of
+    history length. Once the log holds more than ``compact_ratio`` times the
+    retained size, it is compacted down to the retained records, which keeps
+    the amortized cost per append constant.
+    """
+
+    def __init__(self, path, retention=1000, compact_ratio=2.0, legacy_path=None):
+        """Initialize the store.
+
+        Args:
+            path (str): Path of the .jsonl log file
+            retention (int, optional): Maximum number of records to keep.
+                None keeps every record and disables compaction.
+            compact_ratio (float): Compact once the log grows past
+                compact_ratio times the retained size
+            legacy_path (str, optional): JSON file in the old format to import
+                when the log does not exist yet
+        """
+        super().__init__(retention)
+        self.path = Path(path)
+        self.state_path = self.path.with_name(self.path.name + '.state.json')
+        self.compact_ratio = compact_ratio
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._log_records = 0
+        self._compacted_records = 0
+
+    def _read_log(self):
+        """Read the log, keeping only the records allowed by the retention."""
+        records = []
+        total = 0
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A crash mid-append can leave a partial last line
+                    continue
+                total += 1
+        return self.apply_retention(records), total
+
+    def load(self):
+        if not self.path.exists():
+            if self.legacy_path and self.legacy_path.exists():
+                legacy = JSONHistoryStore(self.legacy_path, self.retention)
+                records = legacy.load()
+                self.rewrite(records)
+                return records
+            self._log_records = 0
+            self._compacted_records = 0
+            return []
+
+        records, self._log_records = self._read_log()
+        self._compacted_records = len(records)
+        if self._needs_compaction():
+            self.rewrite(records)
+        return records
+
+    def append(self, records):
+        if not records:
+            return
+        data = ''.join(json.dumps(r) + '\n' for r in records)
+        with open(self.path, 'a') as f:
+            f.write(data)
+        self.bytes_written += len(data)
+        self._log_records += len(records)
+
+        if self._needs_compaction():
+            self.compact()
+
+    def rewrite(self, records):
+        records = self.apply_retention(records)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        data = ''.join(json.dumps(r) + '\n' for r in records)
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        self.bytes_written += len(data)
+        self._log_records = len(records)
+        self._compacted_records = len(records)
+
+    def compact(self):
+        """Rewrite the log so that it only holds the retained records."""
+        if not self.path.exists():
+            return
+        records, _ = self._read_log()
+        self.rewrite(records)
+
+    def _needs_compaction(self):
+        if self.retention is None:
+            return False
+        live = max(self.retention, self._compacted_records)
+        return self._log_records > max(live * self.compact_ratio, live + 1)
@@ -0,0 +1,278 @@
+"""
+Workflow Metrics
+Timing spans, counters, gauges and histograms for the monitoring workflow,
+exportable as a Prometheus text file or JSON. A NullMetrics instance stands
+in when instrumentation is disabled so the workflow pays almost nothing.
+"""
+import json
+import os
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds for stage and fetch latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds in bytes for save size histograms
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum, min and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        """Record one value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        """Serialize the histogram with cumulative bucket counts."""
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        cumulative['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'buckets': cumulative
+        }
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'labels', 'start')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        for hook in self.metrics._start_hooks:
+            hook.span_started(self.name, self.labels)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        labels = dict(self.labels, stage=self.name)
+        self.metrics.observe('workflow_stage_seconds', seconds, **labels)
+        if exc_type is not None:
+            self.metrics.inc('workflow_stage_errors_total', **labels)
+        for hook in self.metrics._finish_hooks:
+            hook.span_finished(self.name, self.labels, seconds)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """Metrics sink that records nothing, used when instrumentation is off."""
+
+    enabled = False
+
+    def span(self, name, **labels):
+        return _NULL_SPAN
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def set_gauge(self, name, value, **labels):
+        pass
+
+    def observe(self, name, value, buckets=None, **labels):
+        pass
+
+    def add_hook(self, hook):
+        pass
+
+    def to_dict(self):
+        return {'counters': [], 'gauges': [], 'histograms': []}
+
+
+class WorkflowMetrics(NullMetrics):
+    """In-process metrics registry.
+
+    Metrics are identified by a name plus optional keyword labels. Spans
+    record their duration in the 'workflow_stage_seconds' histogram with a
+    'stage' label and notify any attached hooks.
+
+    Hooks are objects with optional span_started(name, labels) and
+    span_finished(name, labels, seconds) methods, e.g. to drive cProfile or
+    an external tracer around specific stages.
+    """
+
+    enabled = True
+
+    # Histogram buckets used for metrics first observed without explicit buckets
+    DEFAULT_BUCKETS = {
+        'history_save_bytes': SIZE_BUCKETS,
+    }
+
+    def __init__(self, namespace='price_monitor'):
+        """Initialize the registry.
+
+        Args:
+            namespace (str): Prefix added to every exported metric name
+        """
+        self.namespace = namespace
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._start_hooks = []
+        self._finish_hooks = []
+
+    def span(self, name, **labels):
+        """Time a block of code as a named stage.
+
+        Args:
+            name (str): Stage name, e.g. 'fetch'
+
+        Returns:
+            Context manager
+        """
+        return _Span(self, name, labels)
+
+    def inc(self, name, value=1, **labels):
+        """Increase a counter."""
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to the current value."""
+        self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, buckets=None, **labels):
+        """Record a value in a histogram.
+
+        Args:
+            name (str): Histogram name
+            value (float): Observed value
+            buckets (tuple, optional): Bucket upper bounds, used when the
+                histogram is created. Defaults to latency buckets.
+        """
+        key = _key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(
+                buckets or self.DEFAULT_BUCKETS.get(name, LATENCY_BUCKETS))
+        histogram.observe(value)
+
+    def add_hook(self, hook):
+        """Attach a span hook (see class docstring)."""
+        if hasattr(hook, 'span_started'):
+            self._start_hooks.append(hook)
+        if hasattr(hook, 'span_finished'):
+            self._finish_hooks.append(hook)
+
+    def reset(self):
+        """Drop every recorded value, keeping the hooks."""
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+    def _name(self, name):
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def to_dict(self):
+        """Serialize every metric.
+
+        Returns:
+            dict: {'counters', 'gauges', 'histograms'}, each a list of
+                {'name', 'labels', ...} entries
+        """
+        def entries(metrics, value):
+            return [dict(name=self._name(name), labels=dict(labels), **value(metric))
+                    for (name, labels), metric in sorted(metrics.items())]
+
+        return {
+            'counters': entries(self.counters, lambda v: {'value': v}),
+            'gauges': entries(self.gauges, lambda v: {'value': v}),
+            'histograms': entries(self.histograms, lambda h: h.to_dict())
+        }
+
+    def to_prometheus(self):
+        """Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        for metrics, kind in ((self.counters, 'counter'), (self.gauges, 'gauge')):
+            declared = set()
+            for (name, labels), value in sorted(metrics.items()):
+                full_name = self._name(name)
+                if full_name not in declared:
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    declared.add(full_name)
+                lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+        declared = set()
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            full_name = self._name(name)
+            if full_name not in declared:
+                lines.append(f"# TYPE {full_name} histogram")
+                declared.add(full_name)
+            for bound, count in histogram.to_dict()['buckets'].items():
+                lines.append(f"{full_name}_bucket{_format_labels(labels, ('le', bound))} {count}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write_atomic(path, text):
+        # Collectors must never read a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def write_prometheus(self, path):
+        """Write the metrics to a .prom file, e.g. for node_exporter's textfile collector."""
+        self._write_atomic(path, self.to_prometheus())
+
+    def write_json(self, path):
+        """Write the metrics to a JSON file."""
+        self._write_atomic(path, json.dumps(self.to_dict(), indent=2))
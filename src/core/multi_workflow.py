@@ -0,0 +1,528 @@
+"""
+Multi-Product Price Monitoring Workflow
+Tracks and analyzes one price series per product of the catalogue in a single run.
+"""
+import csv
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from ..data.price_parsing import parse_prices
+from .comovement import CoMovementIndex
+from .history_store import JSONLinesHistoryStore
+from .metrics import NullMetrics
+from .ring_buffer import PriceRingBuffer, to_epoch_us
+from .rollup import RollupPyramid, bucket_starts
+
+
+class ProductSeries:
+    """Compact price series for a single product.
+
+    Points live in a PriceRingBuffer that starts small and grows up to the
+    retention, which keeps the per-product overhead small.
+    """
+
+    __slots__ = ('product', 'base_price', 'history')
+
+    def __init__(self, product, base_price=None, retention=None):
+        self.product = product
+        self.base_price = base_price
+        self.history = PriceRingBuffer(retention, initial_size=4)
+
+    def __len__(self):
+        return len(self.history)
+
+    def append(self, timestamp_us, price):
+        """Append a point, dropping the oldest one beyond the retention."""
+        self.history.append(timestamp_us, price)
+
+    @property
+    def prices(self):
+        """numpy.ndarray: Zero-copy view of the prices, oldest first."""
+        return self.history.prices()
+
+    @property
+    def timestamps(self):
+        """numpy.ndarray: Zero-copy view of the epoch-microsecond timestamps."""
+        return self.history.timestamps()
+
+    @property
+    def last_price(self):
+        return float(self.history.prices(1)[0]) if len(self.history) else None
+
+
+class MultiProductWorkflow:
+    """Workflow that monitors every product of the catalogue in one pass."""
+
+    def __init__(self, data_dir='data', catalogue_file=None, history_store=None,
+                 max_records=1000, metrics=None):
+        """Initialize the multi-product workflow.
+
+        Args:
+            data_dir (str): Directory to store data files
+            catalogue_file (str, optional): CSV with Product, Price and
+                Historical_Low columns. Defaults to data_dir/cleaned_gpu_prices.csv
+            history_store (BaseHistoryStore, optional): Persistence backend
+                shared by all products. Defaults to an append-only JSON-lines
+                log in data_dir.
+            max_records (int, optional): Number of records to retain per
+                product when using the default store. None keeps everything.
+            metrics (WorkflowMetrics, optional): Instrumentation sink for
+                stage timings and counters. Disabled when None.
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.catalogue_file = Path(catalogue_file) if catalogue_file \
+            else self.data_dir / 'cleaned_gpu_prices.csv'
+        self.ai_engine = None
+        self.price_fetcher = None
+        self.alert_engine = None
+        # Alerts fired by the most recent prices
+        self.last_alerts = []
+        # Streaming anomaly detectors of the products watched by 'anomaly' rules
+        self.anomaly_detectors = {}
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.series = {}
+        # Minute/hour/day/week OHLC aggregates per product for range queries
+        self.rollups = RollupPyramid()
+        # Forecasting state of every product (row i is the i-th series), kept
+        # up to date tick by tick when the engine supports it
+        self.forecast_state = None
+        self._forecast_rows = {}
+        # Rolling daily-return correlations across products, fed one
+        # completed day at a time from the day rollups
+        self.comovement = CoMovementIndex()
+        self._comovement_until = None
+        if history_store is None:
+            history_store = JSONLinesHistoryStore(
+                self.data_dir / 'product_prices.jsonl',
+                retention=max_records
+            )
+        self.history_store = history_store
+        self.load_catalogue()
+        self._load_historical_data()
+
+    def set_ai_engine(self, ai_engine):
+        """Set the AI engine used to analyze every product.
+
+        Args:
+            ai_engine: Instance of BaseAIEngine or similar
+        """
+        self.ai_engine = ai_engine
+        if hasattr(ai_engine, 'initialize'):
+            ai_engine.initialize()
+        self._init_forecast_state()
+        self.anomaly_detectors = {}
+
+    def _init_forecast_state(self):
+        """Fit the engine's forecasting models on the loaded histories."""
+        self.forecast_state = None
+        self._forecast_rows = {}
+        if not hasattr(self.ai_engine, 'create_forecast_state'):
+            return
+        products = list(self.series)
+        values, offsets = self._concatenated_prices(products)
+        state = self.ai_engine.create_forecast_state(len(products))
+        state.extend(values, offsets)
+        self.forecast_state = state
+        self._forecast_rows = {product: i for i, product in enumerate(products)}
+
+    def set_alert_engine(self, alert_engine):
+        """Evaluate alert rules against every new price.
+
+        The engine's running averages are primed from the loaded histories.
+        Products watched by 'anomaly' rules get a streaming anomaly detector
+        from the AI engine, created on their next price.
+
+        Args:
+            alert_engine (AlertRuleEngine): Engine holding the rules
+        """
+        self.alert_engine = alert_engine
+        self.anomaly_detectors = {}
+        for product, series in self.series.items():
+            alert_engine.observe_history(product, series.timestamps, series.prices)
+
+    def _is_anomaly(self, product, price, timestamp):
+        """Run a product's new price through its anomaly detector.
+
+        Detectors only exist for products watched by 'anomaly' rules; a new
+        one is primed with the product's earlier prices.
+
+        Returns:
+            bool: Whether the price is flagged
+        """
+        if not self.alert_engine.watches_anomalies(product):
+            # Drop the detector so a later rule does not see a stale window
+            self.anomaly_detectors.pop(product, None)
+            return False
+        detector = self.anomaly_detectors.get(product)
+        if detector is None:
+            if not hasattr(self.ai_engine, 'create_anomaly_detector'):
+                return False
+            detector = self.ai_engine.create_anomaly_detector()
+            # The new price is already in the series
+            earlier = self.series[product].prices[:-1]
+            for value in earlier[-detector.window:].tolist():
+                detector.update(value)
+            self.anomaly_detectors[product] = detector
+        return detector.update(price, timestamp)
+
+    def set_price_fetcher(self, fetcher):
+        """Fetch prices through an AsyncPriceFetcher instead of the placeholder.
+
+        The fetcher is primed with the last stored price of every product so
+        it can fall back to it when a fetch fails.
+
+        Args:
+            fetcher (AsyncPriceFetcher): Fetcher to use
+        """
+        self.price_fetcher = fetcher
+        for product, series in self.series.items():
+            if series.last_price is not None:
+                fetcher.remember(product, series.last_price)
+
+    def close(self):
+        """Release the history store."""
+        self.history_store.close()
+
+    @property
+    def products(self):
+        """list: Tracked product names in catalogue order."""
+        return list(self.series)
+
+    def load_catalogue(self):
+        """Register every product listed in the catalogue file.
+
+        Prices are parsed column-wise; a product without a valid Price falls
+        back to its Historical_Low, and to None when neither parses.
+        """
+        if not self.catalogue_file.exists():
+            print(f"Catalogue file not found: {self.catalogue_file}")
+            return
+
+        with open(self.catalogue_file, 'r', encoding='utf-8') as f:
+            rows = [row for row in csv.DictReader(f) if (row.get('Product') or '').strip()]
+        if not rows:
+            return
+        prices, has_price = parse_prices([row.get('Price') for row in rows])
+        lows, has_low = parse_prices([row.get('Historical_Low') for row in rows])
+        base_prices = np.where(has_price, prices, lows)
+        valid = has_price | has_low
+        for row, base_price, ok in zip(rows, base_prices.tolist(), valid.tolist()):
+            self._get_series(row['Product'].strip()).base_price = base_price if ok else None
+
+    def _get_series(self, product):
+        series = self.series.get(product)
+        if series is None:
+            series = self.series[product] = ProductSeries(
+                product, retention=self.history_store.retention)
+            if self.forecast_state is not None:
+                self._forecast_rows[product] = self.forecast_state.add_series()
+        return series
+
+    def _load_historical_data(self):
+        """Load the stored price history of every product."""
+        try:
+            records = self.history_store.load()
+        except Exception as e:
+            print(f"Error loading historical data: {e}")
+            return
+
+        for record in records:
+            product = record.get('product')
+            if product is None:
+                continue
+            self._get_series(product).append(to_epoch_us(record['timestamp']),
+                                             record['price'])
+        latest = None
+        for product, series in self.series.items():
+            self.rollups.extend(product, series.timestamps, series.prices)
+            if len(series):
+                latest = max(latest or 0, int(series.timestamps[-1]))
+        if latest is not None:
+            self._feed_comovement(int(bucket_starts(latest, 'day')))
+        if records:
+            print(f"Loaded {len(records)} historical price records "
+                  f"for {len(self.series)} products.")
+
+    def fetch_current_prices(self):
+        """Fetch the current price of every product.
+
+        Returns:
+            dict: Mapping of product name to current price
+        """
+        if self.price_fetcher is not None:
+            return self.price_fetcher.fetch_prices(self.series)
+
+        # This is a placeholder implementation
+        # In a real application, this would fetch from an API or database
+        prices = {}
+        for product, series in self.series.items():
+            last_price = series.last_price
+            if last_price is None:
+                last_price = series.base_price
+            if last_price is None:
+                continue
+            prices[product] = round(last_price * (1 + random.uniform(-0.05, 0.05)), 2)
+        return prices
+
+    def update_price_histories(self, prices, timestamp=None):
+        """Append the new prices of all products to their histories.
+
+        Args:
+            prices (dict): Mapping of product name to current price
+            timestamp (str, optional): ISO format timestamp. Defaults to current time.
+        """
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        epoch_us = to_epoch_us(timestamp)
+
+        records = []
+        alerts = []
+        for product, price in prices.items():
+            self._get_series(product).append(epoch_us, price)
+            self.rollups.update(product, epoch_us, price)
+            if self.alert_engine is not None:
+                alerts.extend(self.alert_engine.evaluate(
+                    product, price, epoch_us,
+                    anomaly=self._is_anomaly(product, price, timestamp)))
+            records.append({
+                'product': product,
+                'timestamp': timestamp,
+                'price': price
+            })
+        self.last_alerts = alerts
+        if self.forecast_state is not None and prices:
+            rows = [self._forecast_rows[product] for product in prices]
+            self.forecast_state.update(list(prices.values()), rows)
+        # The first price of a new day completes the previous one
+        day = int(bucket_starts(epoch_us, 'day'))
+        if self._comovement_until is None or day > self._comovement_until:
+            self._feed_comovement(day)
+
+        metrics = self.metrics
+        if not metrics.enabled:
+            try:
+                self.history_store.append(records)
+            except Exception as e:
+                print(f"Error saving historical data: {e}")
+            return
+
+        bytes_before = getattr(self.history_store, 'bytes_written', 0)
+        start = time.perf_counter()
+        try:
+            self.history_store.append(records)
+        except Exception as e:
+            metrics.inc('history_save_errors_total')
+            print(f"Error saving historical data: {e}")
+        metrics.observe('history_save_seconds', time.perf_counter() - start)
+        saved = getattr(self.history_store, 'bytes_written', 0) - bytes_before
+        metrics.observe('history_save_bytes', saved)
+        metrics.inc('history_saved_bytes_total', saved)
+        metrics.inc('history_records_appended_total', len(records))
+        if alerts:
+            metrics.inc('alerts_fired_total', len(alerts))
+        metrics.set_gauge('history_records', sum(len(s) for s in self.series.values()))
+        metrics.set_gauge('products', len(self.series))
+
+    def query_history(self, product, start=None, end=None, resolution='day'):
+        """OHLC aggregates of one product's price history for a time range.
+
+        Args:
+            product (str): Product name
+            start (str, optional): ISO timestamp of the first bucket
+            end (str, optional): ISO timestamp where the range ends (exclusive)
+            resolution: 'minute', 'hour', 'day', 'week' or a bucket width in
+                seconds; served from the coarsest rollup that is this fine
+
+        Returns:
+            dict: 'level' plus bucket arrays 'start' (epoch microseconds),
+                'open', 'high', 'low', 'close', 'mean' and 'count'
+        """
+        return self.rollups.query(product, start, end, resolution)
+
+    def _feed_comovement(self, until_us):
+        """Add the daily closes of every day that ended before until_us to the co-movement index."""
+        closes = {}
+        for product in self.series:
+            days = self.rollups.query(product, self._comovement_until, until_us, 'day')
+            for start, close in zip(days['start'].tolist(), days['close'].tolist()):
+                closes.setdefault(start, {})[product] = close
+        for start in sorted(closes):
+            self.comovement.update(closes[start], refresh=False)
+        if closes:
+            self.comovement.refresh()
+        self._comovement_until = until_us
+
+    def similar_products(self, product, k=10):
+        """Products whose daily price moves correlate most with a product's.
+
+        Args:
+            product (str): Product name
+            k (int): Number of products to return
+
+        Returns:
+            list: (product, correlation) tuples over the index's rolling
+                window of daily returns, most correlated first
+        """
+        return self.comovement.similar(product, k)
+
+    def analyze_product(self, product):
+        """Analyze the price trend of a single product.
+
+        Args:
+            product (str): Product name
+
+        Returns:
+            dict: Analysis results
+        """
+        if not self.ai_engine:
+            return {'error': 'AI engine not initialized'}
+
+        series = self.series.get(product)
+        if series is None or len(series) < 2:
+            return {'error': 'Insufficient data for analysis'}
+
+        analysis = self.ai_engine.analyze_price_trend(series.prices)
+        analysis['data_points'] = len(series)
+        return analysis
+
+    def analyze_all(self):
+        """Analyze the price trend of every product.
+
+        Returns:
+            dict: Mapping of product name to analysis results
+        """
+        analyzed_at = datetime.now().isoformat()
+        if hasattr(self.ai_engine, 'analyze_price_trend_batch'):
+            results = self._analyze_all_batch()
+        else:
+            results = {product: self.analyze_product(product) for product in self.series}
+        for analysis in results.values():
+            analysis['last_updated'] = analyzed_at
+        return results
+
+    def _concatenated_prices(self, products):
+        """Concatenated price series of the products plus CSR-style offsets."""
+        lengths = np.fromiter((len(self.series[p]) for p in products),
+                              dtype=np.int64, count=len(products))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        values = np.concatenate(
+            [self.series[p].prices for p in products]
+        ) if products else np.empty(0)
+        return values, offsets
+
+    def _analyze_all_batch(self):
+        """Analyze every product with one call to the engine's batch API."""
+        products = list(self.series)
+        values, offsets = self._concatenated_prices(products)
+        lengths = np.diff(offsets)
+        if self.forecast_state is not None:
+            # Forecasts come from the incrementally updated state, no refit
+            batch = self.ai_engine.analyze_price_trend_batch(values, offsets,
+                                                             state=self.forecast_state)
+        else:
+            batch = self.ai_engine.analyze_price_trend_batch(values, offsets)
+
+        results = {}
+        for i, product in enumerate(products):
+            if not batch['sufficient'][i]:
+                results[product] = {'error': 'Insufficient data for analysis'}
+                continue
+            results[product] = {
+                'trend': str(batch['trend'][i]),
+                'confidence': float(batch['confidence'][i]),
+                'moving_average': float(batch['moving_average'][i]),
+                'ewma': float(batch['ewma'][i]),
+                'last_price': float(batch['last_price'][i]),
+                'data_points': int(lengths[i])
+            }
+            if 'forecast' in batch:
+                results[product].update({
+                    'forecast_horizons': tuple(int(h) for h in batch['forecast_horizons']),
+                    'forecast': tuple(batch['forecast'][i].tolist()),
+                    'forecast_lower': tuple(batch['forecast_lower'][i].tolist()),
+                    'forecast_upper': tuple(batch['forecast_upper'][i].tolist())
+                })
+        return results
+
+    def generate_summary(self, analyses):
+        """Generate a catalogue-level report from per-product analyses.
+
+        Args:
+            analyses (dict): Results from analyze_all()
+
+        Returns:
+            str: Formatted report
+        """
+        counts = {}
+        for analysis in analyses.values():
+            trend = analysis.get('trend', 'error' if 'error' in analysis else 'unknown')
+            counts[trend] = counts.get(trend, 0) + 1
+
+        report = [
+            "=== Multi-Product Price Monitoring Report ===",
+            f"Generated at: {datetime.now().isoformat()}",
+            f"Products analyzed: {len(analyses)}",
+            "",
+            "Trend Summary:"
+        ]
+        report.extend(f"- {trend.capitalize()}: {count}"
+                      for trend, count in sorted(counts.items()))
+        return "\n".join(report)
+
+    def run_full_workflow(self):
+        """Run the complete monitoring workflow for every product.
+
+        Each stage is timed as a span on self.metrics.
+
+        Returns:
+            dict: Results of the workflow execution, keyed by product
+        """
+        metrics = self.metrics
+        with metrics.span('cycle'):
+            result = self._run_stages(metrics)
+        metrics.inc('workflow_cycles_total', success=str(result['success']).lower())
+        return result
+
+    def _run_stages(self, metrics):
+        print("Starting multi-product price monitoring workflow...")
+
+        # 1. Fetch current prices
+        with metrics.span('fetch'):
+            current_prices = self.fetch_current_prices()
+        print(f"Fetched prices for {len(current_prices)} products")
+        if metrics.enabled:
+            metrics.inc('prices_fetched_total', len(current_prices))
+            metrics.set_gauge('products_without_price', len(self.series) - len(current_prices))
+
+        # 2. Update price histories
+        with metrics.span('update_history'):
+            self.update_price_histories(current_prices)
+        for alert in self.last_alerts:
+            print(f"ALERT: {alert['message']}")
+
+        # 3. Analyze every product
+        with metrics.span('analyze'):
+            analyses = self.analyze_all()
+        with metrics.span('report'):
+            report = self.generate_summary(analyses)
+        print("\n" + report)
+
+        products = {}
+        for product, analysis in analyses.items():
+            products[product] = {
+                'success': 'error' not in analysis,
+                'current_price': current_prices.get(product),
+                'analysis': analysis
+            }
+
+        return {
+            'success': any(r['success'] for r in products.values()),
+            'products': products,
+            'report': report,
+            'alerts': self.last_alerts
+        }
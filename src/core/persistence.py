@@ -0,0 +1,326 @@
+"""
+Write-Behind Persistence
+Buffers appended price records in memory and hands them to the underlying
+history store in batches (group commit), serialized across processes with
+an advisory file lock so several collectors can share one data directory.
+"""
+import contextlib
+import os
+import threading
+import time
+from pathlib import Path
+
+from .history_store import BaseHistoryStore
+from .metrics import NullMetrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to msvcrt byte-range locks
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+FSYNC_MODES = ('never', 'flush', 'always')
+
+
+def fsync_path(path, directory=False):
+    """Force a file's (or directory's) data to stable storage.
+
+    Args:
+        path (str): File or directory path
+        directory (bool): Sync a directory entry, e.g. after a rename.
+            Ignored on platforms that cannot open directories.
+    """
+    if directory and os.name == 'nt':
+        return
+    flags = os.O_RDONLY if directory else os.O_RDWR
+    try:
+        fd = os.open(path, flags)
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    """Advisory inter-process lock on a lock file.
+
+    Uses flock() where available (shared and exclusive modes) and msvcrt
+    locking on Windows (exclusive only). Threads of one process are
+    serialized by an in-process lock held from acquire() to release(), so
+    they never share or overwrite the lock file descriptor. The lock is not
+    reentrant.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd = None
+        self._thread_lock = threading.Lock()
+
+    def acquire(self, shared=False):
+        """Block until the lock is held.
+
+        Args:
+            shared (bool): Take a shared (reader) lock instead of an
+                exclusive one, where the platform supports it
+        """
+        self._thread_lock.acquire()
+        fd = None
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10 s; keep waiting
+                        continue
+        except BaseException:
+            if fd is not None:
+                os.close(fd)
+            self._thread_lock.release()
+            raise
+        self._fd = fd
+
+    def release(self):
+        """Release the lock."""
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class WriteBehindHistoryStore(BaseHistoryStore):
+    """Buffering wrapper around another BaseHistoryStore.
+
+    append() only queues records in memory. The queue is written to the
+    wrapped store in one batch once it holds ``max_pending`` records or its
+    oldest record is ``max_delay`` seconds old; a background thread enforces
+    the delay even when no further records arrive. Every write to the
+    wrapped store happens under an exclusive lock on ``lock_path``, as does
+    load() because the wrapped store may compact or import while loading;
+    state reads take a shared lock. Processes sharing a data directory
+    therefore never interleave a flush with another process's compaction
+    or rewrite.
+
+    Records still queued when the process dies are lost; close() flushes
+    them. fsync modes:
+
+    - 'never': leave write-back to the operating system
+    - 'flush': fsync once per flush (group commit)
+    - 'always': write and fsync every append immediately (no buffering)
+    """
+
+    def __init__(self, store, max_pending=100, max_delay=5.0, fsync='flush',
+                 lock_path=None, metrics=None, background=True):
+        """Initialize the wrapper.
+
+        Args:
+            store (BaseHistoryStore): Store the batches are written to
+            max_pending (int): Flush once this many records are queued
+            max_delay (float, optional): Flush once the oldest queued record
+                is this many seconds old. None flushes on size only.
+            fsync (str): 'never', 'flush' or 'always'
+            lock_path (str, optional): Lock file shared by all processes
+                writing the same history. Defaults to the wrapped store's
+                path with a .lock suffix; None disables locking when the
+                store has no path.
+            metrics (WorkflowMetrics, optional): Receives flush latency and
+                batch size observations
+            background (bool): Run a thread that enforces max_delay
+        """
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {FSYNC_MODES}")
+        super().__init__(store.retention)
+        self.store = store
+        self.max_pending = max(1, max_pending)
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.state_path = store.state_path
+        self.path = getattr(store, 'path', None)
+        if lock_path is None and self.path is not None:
+            lock_path = Path(self.path).with_name(Path(self.path).name + '.lock')
+        self.lock = FileLock(lock_path) if lock_path is not None else None
+
+        self.flushes = 0
+        self.records_flushed = 0
+        self.flush_errors = 0
+        self.flush_seconds_total = 0.0
+        self.last_flush_seconds = None
+        self.max_flush_seconds = 0.0
+        self._pending = []
+        self._oldest = None
+        self._mutex = threading.RLock()
+        self._closed = threading.Event()
+        self._thread = None
+        if background and max_delay is not None:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True,
+                                            name='history-write-behind')
+            self._thread.start()
+
+    @property
+    def bytes_written(self):
+        return self.store.bytes_written
+
+    @bytes_written.setter
+    def bytes_written(self, value):
+        # Set by BaseHistoryStore.__init__; the wrapped store does the counting
+        pass
+
+    @property
+    def pending(self):
+        """int: Records queued but not yet written."""
+        return len(self._pending)
+
+    @contextlib.contextmanager
+    def _locked(self, shared=False):
+        if self.lock is None:
+            yield
+            return
+        self.lock.acquire(shared)
+        try:
+            yield
+        finally:
+            self.lock.release()
+
+    def _flush_loop(self):
+        while not self._closed.wait(max(self.max_delay / 2, 0.01)):
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.max_delay:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error flushing price history: {e}")
+
+    def load(self):
+        with self._mutex:
+            # Exclusive: loading may compact or import into the wrapped store
+            with self._locked():
+                records = self.store.load()
+            if self._pending:
+                records = self.apply_retention(list(records) + self._pending)
+            return records
+
+    def append(self, records):
+        records = list(records)
+        if not records:
+            return
+        with self._mutex:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(records)
+            if self.fsync == 'always' or len(self._pending) >= self.max_pending or (
+                    self.max_delay is not None
+                    and time.monotonic() - self._oldest >= self.max_delay):
+                self.flush()
+
+    def flush(self):
+        """Write every queued record to the wrapped store in one batch.
+
+        Returns:
+            int: Number of records written
+        """
+        with self._mutex:
+            if not self._pending:
+                return 0
+            batch = self._pending
+            start = time.perf_counter()
+            try:
+                with self._locked():
+                    self.store.append(batch)
+                    if self.fsync != 'never' and self.path is not None:
+                        fsync_path(self.path)
+            except Exception:
+                self.flush_errors += 1
+                self.metrics.inc('history_flush_errors_total')
+                raise
+            # Only drop the queue once the batch is safely handed over
+            self._pending = []
+            self._oldest = None
+            self._record_flush(len(batch), time.perf_counter() - start)
+            return len(batch)
+
+    def _record_flush(self, count, seconds):
+        self.flushes += 1
+        self.records_flushed += count
+        self.flush_seconds_total += seconds
+        self.last_flush_seconds = seconds
+        self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+        if self.metrics.enabled:
+            self.metrics.observe('history_flush_seconds', seconds)
+            self.metrics.observe('history_flush_records', count)
+            self.metrics.inc('history_flushes_total')
+
+    def rewrite(self, records):
+        with self._mutex:
+            # The rewrite supersedes anything still queued
+            self._pending = []
+            self._oldest = None
+            with self._locked():
+                self.store.rewrite(records)
+                if self.fsync != 'never' and self.path is not None:
+                    fsync_path(self.path)
+                    fsync_path(Path(self.path).parent, directory=True)
+
+    def load_state(self):
+        with self._mutex:
+            with self._locked(shared=True):
+                return self.store.load_state()
+
+    def save_state(self, state):
+        with self._mutex:
+            with self._locked():
+                self.store.save_state(state)
+
+    def close(self):
+        """Flush queued records, stop the background thread and close the store."""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        finally:
+            self.store.close()
+
+    def stats(self):
+        """Flush statistics.
+
+        Returns:
+            dict: Flush count, records written, mean records per flush,
+                queued records, errors and last/mean/max flush latency
+        """
+        return {
+            'flushes': self.flushes,
+            'records_flushed': self.records_flushed,
+            'records_per_flush': self.records_flushed / self.flushes if self.flushes else None,
+            'pending': len(self._pending),
+            'errors': self.flush_errors,
+            'last_flush_seconds': self.last_flush_seconds,
+            'mean_flush_seconds': self.flush_seconds_total / self.flushes if self.flushes else None,
+            'max_flush_seconds': self.max_flush_seconds if self.flushes else None,
+        }
@@ -0,0 +1,195 @@
+"""
+Array-backed ring buffer for in-memory price history.
+Stores timestamps and prices in contiguous NumPy arrays instead of one dict
+per record.
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(timestamp):
+    """Convert an ISO format timestamp to integer epoch microseconds.
+
+    Naive timestamps are taken as-is (no local time zone conversion) so that
+    they round-trip exactly through from_epoch_us.
+
+    Args:
+        timestamp (str): ISO format timestamp
+
+    Returns:
+        int: Microseconds since 1970-01-01
+    """
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(epoch_us):
+    """Convert integer epoch microseconds back to an ISO format timestamp.
+
+    Args:
+        epoch_us (int): Microseconds since 1970-01-01
+
+    Returns:
+        str: ISO format timestamp
+    """
+    return (_EPOCH + timedelta(microseconds=int(epoch_us))).isoformat()
+
+
+class PriceRingBuffer:
+    """Fixed-capacity ring buffer of (timestamp, price) points.
+
+    Timestamps are int64 epoch microseconds and prices float64. Every point
+    is written twice, at slot i and at slot i + size, so the most recent
+    points always form one contiguous block and can be returned as zero-copy
+    NumPy views. Storage starts small and doubles until it reaches the
+    capacity, after which the oldest points are overwritten.
+
+    Indexing and iteration yield {'timestamp': iso_string, 'price': float}
+    records, so the buffer can stand in for the old list of dicts.
+    """
+
+    def __init__(self, capacity=1000, initial_size=16):
+        """Initialize the buffer.
+
+        Args:
+            capacity (int, optional): Maximum number of points kept. None
+                grows without bound.
+            initial_size (int): Number of slots allocated up front
+        """
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        size = max(1, initial_size)
+        if capacity is not None:
+            size = min(size, capacity)
+        self._allocate(size)
+        self._head = 0
+        self._len = 0
+
+    @classmethod
+    def from_records(cls, records, capacity=1000):
+        """Build a buffer from {'timestamp', 'price'} records.
+
+        Args:
+            records (iterable): Records in chronological order
+            capacity (int, optional): Maximum number of points kept
+
+        Returns:
+            PriceRingBuffer: Filled buffer
+        """
+        records = list(records)
+        if capacity is not None:
+            records = records[-capacity:]
+        buffer = cls(capacity, initial_size=max(len(records), 16))
+        for record in records:
+            buffer.append_record(record)
+        return buffer
+
+    def _allocate(self, size):
+        self._size = size
+        self._timestamps = np.empty(2 * size, dtype=np.int64)
+        self._prices = np.empty(2 * size, dtype=np.float64)
+
+    def _grow(self):
+        new_size = self._size * 2
+        if self.capacity is not None:
+            new_size = min(new_size, self.capacity)
+        timestamps = self.timestamps().copy()
+        prices = self.prices().copy()
+        self._allocate(new_size)
+        n = len(prices)
+        self._timestamps[:n] = timestamps
+        self._timestamps[new_size:new_size + n] = timestamps
+        self._prices[:n] = prices
+        self._prices[new_size:new_size + n] = prices
+        self._head = n % new_size
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def nbytes(self):
+        """int: Bytes allocated for timestamps and prices."""
+        return self._timestamps.nbytes + self._prices.nbytes
+
+    def append(self, timestamp_us, price):
+        """Append a point, overwriting the oldest one when full.
+
+        Args:
+            timestamp_us (int): Epoch microseconds
+            price (float): Price
+        """
+        if self._len == self._size and (self.capacity is None or self._size < self.capacity):
+            self._grow()
+        head = self._head
+        mirror = head + self._size
+        self._timestamps[head] = self._timestamps[mirror] = timestamp_us
+        self._prices[head] = self._prices[mirror] = price
+        self._head = (head + 1) % self._size
+        if self._len < self._size:
+            self._len += 1
+
+    def append_record(self, record):
+        """Append a {'timestamp': iso_string, 'price': float} record."""
+        self.append(to_epoch_us(record['timestamp']), record['price'])
+
+    def _window(self, n):
+        if n is None or n > self._len:
+            n = self._len
+        end = self._head + self._size
+        return end - n, end
+
+    def prices(self, n=None):
+        """Zero-copy view of the most recent prices, oldest first.
+
+        Args:
+            n (int, optional): Number of points. Defaults to all.
+
+        Returns:
+            numpy.ndarray: float64 view into the buffer
+        """
+        start, end = self._window(n)
+        return self._prices[start:end]
+
+    def timestamps(self, n=None):
+        """Zero-copy view of the most recent epoch-microsecond timestamps.
+
+        Args:
+            n (int, optional): Number of points. Defaults to all.
+
+        Returns:
+            numpy.ndarray: int64 view into the buffer
+        """
+        start, end = self._window(n)
+        return self._timestamps[start:end]
+
+    def _record(self, slot):
+        return {
+            'timestamp': from_epoch_us(self._timestamps[slot]),
+            'price': float(self._prices[slot])
+        }
+
+    def __getitem__(self, index):
+        start, _ = self._window(None)
+        if isinstance(index, slice):
+            return [self._record(start + i) for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('ring buffer index out of range')
+        return self._record(start + index)
+
+    def __iter__(self):
+        start, end = self._window(None)
+        for slot in range(start, end):
+            yield self._record(slot)
+
+    def to_records(self):
+        """Return the buffered points as a list of record dicts."""
+        return list(self)
@@ -0,0 +1,362 @@
+"""
+Multi-Resolution Rollups
+Maintains minute, hour, day and week OHLC/mean/count aggregates per series
+as prices arrive, so long-range queries and charts read a handful of
+buckets instead of scanning the raw ticks.
+"""
+import numpy as np
+
+from .ring_buffer import to_epoch_us
+
+_SECOND_US = 1_000_000
+
+# Rollup levels from finest to coarsest: name -> bucket width in seconds
+LEVELS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+}
+
+# Weeks start on Monday; 1970-01-05 was the first Monday after the epoch
+_LEVEL_OFFSETS_US = {'week': 4 * 86400 * _SECOND_US}
+
+# Buckets kept per level; None keeps everything
+DEFAULT_RETENTION = {
+    'minute': 7 * 1440,
+    'hour': 90 * 24,
+    'day': 10 * 366,
+    'week': None,
+}
+
+# Bucket columns: int64 times and float64 values, stored row-major per level
+_TIME_FIELDS = ('start', 'first_ts', 'last_ts')
+_VALUE_FIELDS = ('open', 'high', 'low', 'close', 'sum', 'count')
+_START, _FIRST_TS, _LAST_TS = range(3)
+_OPEN, _HIGH, _LOW, _CLOSE, _SUM, _COUNT = range(6)
+
+
+def bucket_starts(timestamps_us, level):
+    """Start of the bucket each timestamp falls into.
+
+    Args:
+        timestamps_us (numpy.ndarray): Epoch microseconds
+        level (str): Level name from LEVELS
+
+    Returns:
+        numpy.ndarray: int64 bucket start times
+    """
+    width = LEVELS[level] * _SECOND_US
+    offset = _LEVEL_OFFSETS_US.get(level, 0)
+    timestamps_us = np.asarray(timestamps_us, dtype=np.int64)
+    return timestamps_us - (timestamps_us - offset) % width
+
+
+def aggregate(timestamps_us, prices, level):
+    """Aggregate points into OHLC buckets in one vectorized pass.
+
+    Args:
+        timestamps_us (numpy.ndarray): Non-decreasing epoch microseconds, shape (D,)
+        prices (numpy.ndarray): Prices of shape (D,) or (N, D); each row
+            is a separate series sharing the timestamps
+        level (str): Level name from LEVELS
+
+    Returns:
+        dict: 'start' (B,) plus 'open', 'high', 'low', 'close', 'sum' and
+            'mean' of shape (..., B) and 'count' (B,)
+    """
+    timestamps_us = np.asarray(timestamps_us, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(timestamps_us) == 0:
+        empty = np.empty(prices.shape[:-1] + (0,))
+        return {'start': np.empty(0, dtype=np.int64), 'open': empty, 'high': empty,
+                'low': empty, 'close': empty, 'sum': empty, 'mean': empty,
+                'count': np.empty(0, dtype=np.int64),
+                'first_ts': np.empty(0, dtype=np.int64), 'last_ts': np.empty(0, dtype=np.int64)}
+
+    starts = bucket_starts(timestamps_us, level)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], len(starts)] - 1
+    total = np.add.reduceat(prices, first, axis=-1)
+    count = last - first + 1
+    return {
+        'start': starts[first],
+        'open': prices[..., first],
+        'high': np.maximum.reduceat(prices, first, axis=-1),
+        'low': np.minimum.reduceat(prices, first, axis=-1),
+        'close': prices[..., last],
+        'sum': total,
+        'mean': total / count,
+        'count': count,
+        'first_ts': timestamps_us[first],
+        'last_ts': timestamps_us[last],
+    }
+
+
+class RollupSeries:
+    """OHLC buckets of one series at one resolution.
+
+    Buckets are rows of two growable arrays (int64 times, float64 values)
+    in chronological order. Updating the newest bucket or opening a new one
+    is O(1); a point older than the newest bucket is merged by binary search.
+    """
+
+    def __init__(self, level, retention=None, initial_size=4):
+        """Initialize the series.
+
+        Args:
+            level (str): Level name from LEVELS
+            retention (int, optional): Maximum number of buckets kept
+            initial_size (int): Buckets allocated up front
+        """
+        self.level = level
+        self.retention = retention
+        self._width = LEVELS[level] * _SECOND_US
+        self._offset = _LEVEL_OFFSETS_US.get(level, 0)
+        self._lo = 0
+        self._hi = 0
+        self._times = np.empty((max(1, initial_size), len(_TIME_FIELDS)), dtype=np.int64)
+        self._values = np.empty((max(1, initial_size), len(_VALUE_FIELDS)))
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def _reserve(self, extra):
+        """Ensure room for ``extra`` buckets after the newest one."""
+        size = len(self._times)
+        if self._hi + extra <= size:
+            return
+        n = len(self)
+        new_size = max(size, 4)
+        while new_size < n + extra or new_size < 2 * n:
+            new_size *= 2
+        times = np.empty((new_size, len(_TIME_FIELDS)), dtype=np.int64)
+        values = np.empty((new_size, len(_VALUE_FIELDS)))
+        times[:n] = self._times[self._lo:self._hi]
+        values[:n] = self._values[self._lo:self._hi]
+        self._times, self._values = times, values
+        self._lo, self._hi = 0, n
+
+    def _trim(self):
+        if self.retention is not None and len(self) > self.retention:
+            self._lo = self._hi - self.retention
+
+    def update(self, timestamp_us, price):
+        """Add one point.
+
+        Args:
+            timestamp_us (int): Epoch microseconds
+            price (float): Price
+        """
+        timestamp_us = int(timestamp_us)
+        start = timestamp_us - (timestamp_us - self._offset) % self._width
+        times, values = self._times, self._values
+        if self._hi > self._lo and start <= times[self._hi - 1, _START]:
+            i = self._hi - 1
+            if start != times[i, _START]:
+                i = self._lo + int(np.searchsorted(times[self._lo:self._hi, _START], start))
+                if i == self._hi or times[i, _START] != start:
+                    self._insert(i, start, timestamp_us, price)
+                    return
+            row = values[i]
+            if price > row[_HIGH]:
+                row[_HIGH] = price
+            if price < row[_LOW]:
+                row[_LOW] = price
+            if timestamp_us >= times[i, _LAST_TS]:
+                row[_CLOSE] = price
+                times[i, _LAST_TS] = timestamp_us
+            if timestamp_us < times[i, _FIRST_TS]:
+                row[_OPEN] = price
+                times[i, _FIRST_TS] = timestamp_us
+            row[_SUM] += price
+            row[_COUNT] += 1
+            return
+
+        self._reserve(1)
+        i = self._hi
+        self._times[i] = (start, timestamp_us, timestamp_us)
+        self._values[i] = (price, price, price, price, price, 1)
+        self._hi += 1
+        self._trim()
+
+    def _insert(self, i, start, timestamp_us, price):
+        """Insert a new bucket before row i (late, out-of-order point)."""
+        offset = i - self._lo
+        self._reserve(1)
+        i = self._lo + offset
+        self._times[i + 1:self._hi + 1] = self._times[i:self._hi].copy()
+        self._values[i + 1:self._hi + 1] = self._values[i:self._hi].copy()
+        self._times[i] = (start, timestamp_us, timestamp_us)
+        self._values[i] = (price, price, price, price, price, 1)
+        self._hi += 1
+        self._trim()
+
+    def extend(self, timestamps_us, prices):
+        """Add many points at once.
+
+        Batches that start at or after the newest point are aggregated in
+        one vectorized pass, continuing the newest bucket if they start in
+        it; unordered batches and batches reaching back before the newest
+        point fall back to per-point updates.
+
+        Args:
+            timestamps_us (numpy.ndarray): Non-decreasing epoch microseconds
+            prices (numpy.ndarray): Prices
+        """
+        timestamps_us = np.asarray(timestamps_us, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(timestamps_us) == 0:
+            return
+        ordered = len(timestamps_us) < 2 or bool(np.all(np.diff(timestamps_us) >= 0))
+        newest = self._times[self._hi - 1, _START] if len(self) else None
+        # Merging into the newest bucket assumes the batch comes after its close
+        late = len(self) and timestamps_us[0] < self._times[self._hi - 1, _LAST_TS]
+        if not ordered or late:
+            for ts, price in zip(timestamps_us.tolist(), prices.tolist()):
+                self.update(ts, price)
+            return
+
+        buckets = aggregate(timestamps_us, prices, self.level)
+        skip = 0
+        if newest is not None and buckets['start'][0] == newest:
+            # The batch continues the newest bucket
+            row = self._values[self._hi - 1]
+            row[_HIGH] = max(row[_HIGH], buckets['high'][0])
+            row[_LOW] = min(row[_LOW], buckets['low'][0])
+            row[_CLOSE] = buckets['close'][0]
+            row[_SUM] += buckets['sum'][0]
+            row[_COUNT] += buckets['count'][0]
+            self._times[self._hi - 1, _LAST_TS] = buckets['last_ts'][0]
+            skip = 1
+
+        n = len(buckets['start']) - skip
+        if n <= 0:
+            return
+        self._reserve(n)
+        rows = slice(self._hi, self._hi + n)
+        for column, name in enumerate(_TIME_FIELDS):
+            self._times[rows, column] = buckets[name][skip:]
+        for column, name in enumerate(_VALUE_FIELDS):
+            self._values[rows, column] = buckets[name][skip:]
+        self._hi += n
+        self._trim()
+
+    def query(self, start_us=None, end_us=None):
+        """Buckets whose start lies in [start_us, end_us).
+
+        Returns:
+            dict: Column arrays 'start', 'open', 'high', 'low', 'close',
+                'mean' and 'count'
+        """
+        starts = self._times[self._lo:self._hi, _START]
+        lo = 0 if start_us is None else int(np.searchsorted(
+            starts, bucket_starts(np.int64(start_us), self.level)))
+        hi = len(starts) if end_us is None else int(np.searchsorted(starts, end_us))
+        values = self._values[self._lo + lo:self._lo + hi]
+        count = values[:, _COUNT].astype(np.int64)
+        return {
+            'start': starts[lo:hi].copy(),
+            'open': values[:, _OPEN].copy(),
+            'high': values[:, _HIGH].copy(),
+            'low': values[:, _LOW].copy(),
+            'close': values[:, _CLOSE].copy(),
+            'mean': values[:, _SUM] / values[:, _COUNT],
+            'count': count,
+        }
+
+
+def _as_us(value):
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    return to_epoch_us(value)
+
+
+class RollupPyramid:
+    """Minute, hour, day and week rollups for many series.
+
+    Every point updates each level directly, so all levels stay exact and
+    each update costs a constant number of O(1) bucket updates.
+    """
+
+    def __init__(self, levels=None, retention=None):
+        """Initialize the pyramid.
+
+        Args:
+            levels (iterable, optional): Level names to maintain, finest
+                first. Defaults to all of LEVELS.
+            retention (dict, optional): Buckets kept per level. Defaults to
+                DEFAULT_RETENTION.
+        """
+        self.levels = tuple(levels) if levels is not None else tuple(LEVELS)
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.series = {}
+
+    def _levels_of(self, key):
+        levels = self.series.get(key)
+        if levels is None:
+            levels = self.series[key] = {
+                level: RollupSeries(level, self.retention.get(level)) for level in self.levels}
+        return levels
+
+    def update(self, key, timestamp, price):
+        """Add one point to every level of a series.
+
+        Args:
+            key: Series identity, e.g. the product name
+            timestamp: ISO timestamp or epoch microseconds
+            price (float): Price
+        """
+        timestamp_us = _as_us(timestamp)
+        for rollup in self._levels_of(key).values():
+            rollup.update(timestamp_us, price)
+
+    def extend(self, key, timestamps_us, prices):
+        """Add many points to every level of a series (vectorized)."""
+        for rollup in self._levels_of(key).values():
+            rollup.extend(timestamps_us, prices)
+
+    def clear(self, key=None):
+        """Drop one series, or every series when key is None."""
+        if key is None:
+            self.series.clear()
+        else:
+            self.series.pop(key, None)
+
+    def choose_level(self, resolution):
+        """Coarsest maintained level whose buckets are no wider than the resolution.
+
+        Args:
+            resolution: Level name or bucket width in seconds
+
+        Returns:
+            str: Level name; the finest level if none is fine enough
+        """
+        width = LEVELS[resolution] if isinstance(resolution, str) else resolution
+        chosen = self.levels[0]
+        for level in self.levels:
+            if LEVELS[level] <= width:
+                chosen = level
+        return chosen
+
+    def query(self, key, start=None, end=None, resolution='day'):
+        """OHLC buckets of a series for a time range.
+
+        Args:
+            key: Series identity
+            start: ISO timestamp or epoch microseconds, None for the beginning
+            end: ISO timestamp or epoch microseconds (exclusive), None for the end
+            resolution: Level name or bucket width in seconds; served from
+                the coarsest level that is at least this fine
+
+        Returns:
+            dict: 'level' plus the bucket columns of RollupSeries.query()
+        """
+        level = self.choose_level(resolution)
+        levels = self.series.get(key)
+        if levels is None:
+            result = RollupSeries(level).query()
+        else:
+            result = levels[level].query(_as_us(start), _as_us(end))
+        result['level'] = level
+        return result
@@ -0,0 +1,191 @@
+"""
+Workflow Daemon
+Keeps a monitoring workflow resident in memory and runs its cycles on a
+fixed interval, so each cycle only pays for the new data point instead of a
+cold interpreter start and a full history reload.
+"""
+import contextlib
+import io
+import random
+import signal
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class WorkflowDaemon:
+    """Run a workflow's run_full_workflow() repeatedly without overlap.
+
+    Cycles are scheduled on a fixed grid (start + k * interval) shifted by a
+    random jitter, so timing does not drift with cycle duration. A cycle
+    that overruns its slot makes the daemon skip the missed slots instead
+    of running cycles back to back. SIGINT and SIGTERM stop the loop after
+    the current cycle, and the workflow's state is flushed on the way out.
+    """
+
+    def __init__(self, workflow, interval=60.0, jitter=0.1, max_cycles=None,
+                 quiet=False, latency_window=1000, metrics_path=None):
+        """Initialize the daemon.
+
+        Args:
+            workflow: PriceMonitorWorkflow, MultiProductWorkflow or any
+                object with run_full_workflow() and optionally close()
+            interval (float): Seconds between cycle starts
+            jitter (float): Random offset applied to every start, as a
+                fraction of the interval (0.1 = up to +/-10%)
+            max_cycles (int, optional): Stop after this many cycles
+            quiet (bool): Suppress the workflow's per-cycle console output
+            latency_window (int): Number of recent cycle latencies kept
+            metrics_path (str, optional): File the workflow's metrics are
+                exported to after every cycle; JSON for a .json suffix,
+                Prometheus text format otherwise
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0 <= jitter < 1:
+            raise ValueError("jitter must be in [0, 1)")
+        self.workflow = workflow
+        self.interval = interval
+        self.jitter = jitter
+        self.max_cycles = max_cycles
+        self.quiet = quiet
+        self.metrics_path = metrics_path
+        self.cycles = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_result = None
+        self.latencies = deque(maxlen=latency_window)
+        self._stop = threading.Event()
+        self._random = random.Random()
+
+    def stop(self, *_):
+        """Ask the loop to stop after the current cycle. Safe from any thread."""
+        self._stop.set()
+
+    @property
+    def running(self):
+        """bool: Whether the loop has not been asked to stop."""
+        return not self._stop.is_set()
+
+    def run_cycle(self):
+        """Run one workflow cycle and record its latency.
+
+        Returns:
+            float: Cycle duration in seconds
+        """
+        start = time.perf_counter()
+        try:
+            if self.quiet:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.last_result = self.workflow.run_full_workflow()
+            else:
+                self.last_result = self.workflow.run_full_workflow()
+            if not self.last_result or not self.last_result.get('success', False):
+                self.failures += 1
+        except Exception as e:
+            print(f"Error in monitoring cycle: {e}")
+            self.last_result = None
+            self.failures += 1
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        self.cycles += 1
+        if self.metrics_path:
+            self.export_metrics(self.metrics_path)
+        return latency
+
+    def export_metrics(self, path):
+        """Write the workflow's metrics to a JSON or Prometheus text file."""
+        metrics = getattr(self.workflow, 'metrics', None)
+        if metrics is None or not metrics.enabled:
+            return
+        try:
+            if str(path).endswith('.json'):
+                metrics.write_json(path)
+            else:
+                metrics.write_prometheus(path)
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+
+    def _next_start(self, origin, now):
+        slot = int((now - origin) // self.interval) + 1
+        offset = self._random.uniform(-self.jitter, self.jitter) * self.interval
+        return origin + slot * self.interval + offset
+
+    def run(self):
+        """Run cycles until stopped, then flush the workflow.
+
+        Returns:
+            dict: Final latency statistics, see stats()
+        """
+        handlers = self._install_signal_handlers()
+        origin = time.monotonic()
+        try:
+            while self.running:
+                cycle_start = time.monotonic()
+                latency = self.run_cycle()
+                if not self.quiet:
+                    print(f"Cycle {self.cycles} finished in {latency * 1000:.1f} ms")
+                if self.max_cycles is not None and self.cycles >= self.max_cycles:
+                    break
+
+                now = time.monotonic()
+                next_start = self._next_start(origin, now)
+                # Slots that started while the cycle was still running are skipped
+                self.skipped += max(0, int((now - cycle_start) // self.interval))
+                self._stop.wait(max(0.0, next_start - now))
+        finally:
+            self._restore_signal_handlers(handlers)
+            self.shutdown()
+        return self.stats()
+
+    def shutdown(self):
+        """Flush the workflow's state and release its resources."""
+        close = getattr(self.workflow, 'close', None)
+        if close is None:
+            return
+        try:
+            close()
+        except Exception as e:
+            print(f"Error flushing workflow state: {e}")
+
+    def _install_signal_handlers(self):
+        # Signal handlers can only be set from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        handlers = {}
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            handlers[signum] = signal.signal(signum, self.stop)
+        return handlers
+
+    @staticmethod
+    def _restore_signal_handlers(handlers):
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    def stats(self):
+        """Per-cycle latency statistics over the recent window.
+
+        Returns:
+            dict: Cycle, failure and skipped-slot counts plus last, mean,
+                p50, p95 and max latency in seconds
+        """
+        stats = {
+            'cycles': self.cycles,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'interval': self.interval
+        }
+        if self.latencies:
+            latencies = np.fromiter(self.latencies, dtype=np.float64)
+            p50, p95 = np.percentile(latencies, [50, 95])
+            stats.update({
+                'last': float(latencies[-1]),
+                'mean': float(latencies.mean()),
+                'p50': float(p50),
+                'p95': float(p95),
+                'max': float(latencies.max())
+            })
+        return stats
+
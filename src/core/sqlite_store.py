@@ -0,0 +1,401 @@
+"""
+SQLite Price Store
+Keeps the full price history of every product in an embedded SQLite
+database indexed on (product, timestamp), so point, range, latest and
+top-mover lookups cost milliseconds regardless of history length, and the
+JSON/CSV artifacts can be exported from it.
+"""
+import csv
+import json
+import numbers
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from .history_store import BaseHistoryStore
+from .ring_buffer import from_epoch_us, to_epoch_us
+
+DEFAULT_PRODUCT = 'default'
+
+_DAY_US = 86400 * 1_000_000
+
+# Upper bound for open-ended time ranges
+_MAX_US = 2 ** 62
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    product TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prices_product_ts ON prices (product, ts);
+CREATE TABLE IF NOT EXISTS products (
+    product TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _as_us(timestamp):
+    """ISO timestamp or epoch microseconds to epoch microseconds."""
+    if timestamp is None:
+        return None
+    # Includes NumPy integers, e.g. values from PriceRingBuffer.timestamps()
+    if isinstance(timestamp, numbers.Integral):
+        return int(timestamp)
+    return to_epoch_us(str(timestamp))
+
+
+class SQLitePriceStore:
+    """Indexed price history of many products in one SQLite file.
+
+    Timestamps are stored as integer epoch microseconds. The database runs
+    in WAL mode, so readers never block the writer, and every batch of
+    inserts is one transaction. The connection may be used from any
+    thread (e.g. a write-behind flush thread) but not from two at once;
+    callers sharing a store across threads serialize their calls.
+    """
+
+    def __init__(self, path, batch_size=10000):
+        """Open or create a database.
+
+        Args:
+            path (str): Database file, or ':memory:'
+            batch_size (int): Rows per executemany() call when inserting
+        """
+        self.path = path if path == ':memory:' else Path(path)
+        if self.path != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        # WAL with synchronous=NORMAL is durable across application crashes
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+        # Product list for per-product index seeks, rebuilt for older files
+        with self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO products SELECT DISTINCT product FROM prices '
+                              'WHERE NOT EXISTS (SELECT 1 FROM products)')
+
+    def close(self):
+        """Close the connection."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM prices').fetchone()[0]
+
+    @property
+    def products(self):
+        """list: Stored product names, sorted."""
+        return [row[0] for row in self.conn.execute('SELECT product FROM products ORDER BY product')]
+
+    def insert(self, rows):
+        """Insert (product, timestamp, price) rows in one transaction.
+
+        Args:
+            rows (iterable): Tuples with an ISO timestamp or epoch microseconds
+
+        Returns:
+            int: Number of rows inserted
+        """
+        with self.conn:
+            return self._insert_batches(rows)
+
+    def _insert_batches(self, rows):
+        count = 0
+        batch = []
+        for product, timestamp, price in rows:
+            batch.append((product, _as_us(timestamp), float(price)))
+            if len(batch) >= self.batch_size:
+                count += self._insert_batch(batch)
+                batch = []
+        if batch:
+            count += self._insert_batch(batch)
+        return count
+
+    def _insert_batch(self, batch):
+        self.conn.executemany('INSERT INTO prices VALUES (?, ?, ?)', batch)
+        self.conn.executemany('INSERT OR IGNORE INTO products VALUES (?)',
+                              [(product,) for product in {row[0] for row in batch}])
+        return len(batch)
+
+    def replace(self, rows):
+        """Atomically replace every stored row with the given rows.
+
+        Returns:
+            int: Number of rows inserted
+        """
+        with self.conn:
+            self.conn.execute('DELETE FROM prices')
+            self.conn.execute('DELETE FROM products')
+            return self._insert_batches(rows)
+
+    def insert_records(self, records):
+        """Insert {'timestamp', 'price'[, 'product']} records."""
+        return self.insert(_record_rows(records))
+
+    def clear(self, product=None):
+        """Delete every row, or the rows of one product."""
+        with self.conn:
+            if product is None:
+                self.conn.execute('DELETE FROM prices')
+                self.conn.execute('DELETE FROM products')
+            else:
+                self.conn.execute('DELETE FROM prices WHERE product = ?', (product,))
+                self.conn.execute('DELETE FROM products WHERE product = ?', (product,))
+
+    def tail(self, product=DEFAULT_PRODUCT, n=None):
+        """The most recent n points of a product (all when n is None), oldest first.
+
+        Returns:
+            list: (epoch microseconds, price) tuples
+        """
+        if n is None:
+            return self.conn.execute(
+                'SELECT ts, price FROM prices WHERE product = ? ORDER BY ts', (product,)).fetchall()
+        rows = self.conn.execute(
+            'SELECT ts, price FROM prices WHERE product = ? ORDER BY ts DESC LIMIT ?',
+            (product, n)).fetchall()
+        rows.reverse()
+        return rows
+
+    def range(self, product=DEFAULT_PRODUCT, start=None, end=None):
+        """Points with start <= timestamp < end.
+
+        Args:
+            product (str): Product name
+            start: ISO timestamp or epoch microseconds, None for the beginning
+            end: ISO timestamp or epoch microseconds, None for the end
+
+        Returns:
+            list: Records with 'timestamp' and 'price'
+        """
+        sql = 'SELECT ts, price FROM prices WHERE product = ?'
+        params = [product]
+        if start is not None:
+            sql += ' AND ts >= ?'
+            params.append(_as_us(start))
+        if end is not None:
+            sql += ' AND ts < ?'
+            params.append(_as_us(end))
+        sql += ' ORDER BY ts'
+        return [{'timestamp': from_epoch_us(ts), 'price': price}
+                for ts, price in self.conn.execute(sql, params)]
+
+    def price_at(self, product, timestamp):
+        """Price of a product in effect at a time (the last point at or before it).
+
+        Returns:
+            float: Price, or None if the product has no earlier point
+        """
+        row = self.conn.execute(
+            'SELECT price FROM prices WHERE product = ? AND ts <= ? ORDER BY ts DESC LIMIT 1',
+            (product, _as_us(timestamp))).fetchone()
+        return row[0] if row else None
+
+    def latest(self, products=None):
+        """Most recent point of every product.
+
+        Args:
+            products (list, optional): Restrict to these products
+
+        Returns:
+            dict: Product -> {'timestamp', 'price'}
+        """
+        # One index seek per product for its newest row
+        rows = self.conn.execute("""
+            SELECT p.product, x.ts, x.price
+            FROM products AS p
+            JOIN prices AS x ON x.rowid = (
+                SELECT rowid FROM prices WHERE product = p.product ORDER BY ts DESC LIMIT 1)
+        """).fetchall()
+        wanted = set(products) if products is not None else None
+        return {product: {'timestamp': from_epoch_us(ts), 'price': price}
+                for product, ts, price in rows if wanted is None or product in wanted}
+
+    def top_movers(self, start, end=None, limit=10, direction='down'):
+        """Products with the largest price change over a period.
+
+        The change compares the first and last point of each product with
+        start <= timestamp < end.
+
+        Args:
+            start: ISO timestamp or epoch microseconds
+            end: ISO timestamp or epoch microseconds, None for now
+            limit (int): Number of products to return
+            direction (str): 'down' for the biggest drops, 'up' for the
+                biggest rises
+
+        Returns:
+            list: Dicts with 'product', 'start_price', 'end_price' and
+                'change_percent', biggest movers first
+        """
+        order = 'ASC' if direction == 'down' else 'DESC'
+        start_us = _as_us(start)
+        end_us = _as_us(end) if end is not None else _MAX_US
+        rows = self.conn.execute(f"""
+            WITH bounds AS (
+                SELECT p.product,
+                    (SELECT price FROM prices WHERE product = p.product AND ts >= :start
+                        AND ts < :end ORDER BY ts LIMIT 1) AS start_price,
+                    (SELECT price FROM prices WHERE product = p.product AND ts >= :start
+                        AND ts < :end ORDER BY ts DESC LIMIT 1) AS end_price
+                FROM products AS p
+            )
+            SELECT product, start_price, end_price,
+                (end_price - start_price) * 100.0 / start_price AS change
+            FROM bounds
+            WHERE start_price IS NOT NULL AND start_price != 0
+            ORDER BY change {order}
+            LIMIT :limit
+        """, {'start': start_us, 'end': end_us, 'limit': limit}).fetchall()
+        return [{'product': product, 'start_price': first, 'end_price': last,
+                 'change_percent': change}
+                for product, first, last, change in rows]
+
+    def daily_closes(self, start=None, end=None, products=None):
+        """Last price of every product on every day with data.
+
+        Returns:
+            dict: Product -> list of (date 'YYYY-MM-DD', price), oldest first
+        """
+        # CROSS JOIN keeps products as the outer loop, so each product costs
+        # one index range scan instead of scanning the whole table
+        rows = self.conn.execute("""
+            SELECT x.product, x.ts / :day AS day, MAX(x.ts), x.price
+            FROM products AS p
+            CROSS JOIN prices AS x ON x.product = p.product AND x.ts >= :start AND x.ts < :end
+            GROUP BY x.product, day
+            ORDER BY x.product, day
+        """, {'day': _DAY_US, 'start': _as_us(start) if start is not None else -_MAX_US,
+              'end': _as_us(end) if end is not None else _MAX_US})
+        wanted = set(products) if products is not None else None
+        closes = {}
+        for product, day, _, price in rows:
+            if wanted is not None and product not in wanted:
+                continue
+            closes.setdefault(product, []).append((from_epoch_us(day * _DAY_US)[:10], price))
+        return closes
+
+    def get_meta(self, key):
+        """Stored metadata value, or None."""
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        """Store a metadata value."""
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
+
+    def export_history_json(self, path, product=DEFAULT_PRODUCT):
+        """Write one product's history in the historical_prices.json format."""
+        _write_atomic(path, lambda f: json.dump({
+            'last_updated': datetime.now().isoformat(),
+            'prices': self.range(product)
+        }, f, indent=2))
+
+    def export_price_history_json(self, path, start=None, end=None):
+        """Write daily closes in the price_history.json format ({product: [prices]})."""
+        history = {product: [price for _, price in days]
+                   for product, days in self.daily_closes(start, end).items()}
+        _write_atomic(path, lambda f: json.dump(history, f, ensure_ascii=False, indent=2))
+
+    def export_daily_csv(self, path, start=None, end=None, base_prices=None):
+        """Write daily closes in the weekly_gpu_prices.csv format.
+
+        Args:
+            path (str): Output CSV
+            start, end: Optional time range
+            base_prices (dict, optional): Product -> base price for the
+                base_price column. Defaults to the first close in the range.
+        """
+        def write(f):
+            writer = csv.writer(f)
+            writer.writerow(['date', 'product', 'price', 'base_price'])
+            for product, days in self.daily_closes(start, end).items():
+                base = (base_prices or {}).get(product, days[0][1])
+                for day, price in days:
+                    writer.writerow([day, product, price, base])
+        _write_atomic(path, write, newline='')
+
+
+def _record_rows(records):
+    return ((r.get('product', DEFAULT_PRODUCT), r['timestamp'], r['price']) for r in records)
+
+
+def _write_atomic(path, write, newline=None):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8', newline=newline) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class SQLiteHistoryStore(BaseHistoryStore):
+    """BaseHistoryStore adapter over a SQLitePriceStore.
+
+    Appends go straight into the database and the full history stays
+    queryable there; load() only returns the retained tail of each product.
+    The analysis state is kept in the database's meta table. Calls are
+    serialized by a lock, so the store can be flushed from a background
+    thread.
+    """
+
+    def __init__(self, path, retention=1000):
+        """Initialize the store.
+
+        Args:
+            path (str): Database file
+            retention (int, optional): Records returned by load() per
+                product. None returns everything. Older rows stay in the
+                database.
+        """
+        super().__init__(retention)
+        self.db = SQLitePriceStore(path)
+        self._lock = threading.RLock()
+
+    def load(self):
+        records = []
+        with self._lock:
+            products = self.db.products
+            for product in products:
+                tagged = product != DEFAULT_PRODUCT
+                for ts, price in self.db.tail(product, self.retention):
+                    record = {'timestamp': from_epoch_us(ts), 'price': price}
+                    if tagged:
+                        record['product'] = product
+                    records.append(record)
+        if len(products) > 1:
+            records.sort(key=lambda r: r['timestamp'])
+        return records
+
+    def append(self, records):
+        with self._lock:
+            count = self.db.insert_records(records)
+        # product, timestamp and price of every row
+        self.bytes_written += 24 * count
+
+    def rewrite(self, records):
+        with self._lock:
+            count = self.db.replace(_record_rows(self.apply_retention(records)))
+        self.bytes_written += 24 * count
+
+    def load_state(self):
+        with self._lock:
+            value = self.db.get_meta('analysis_state')
+        return json.loads(value) if value else None
+
+    def save_state(self, state):
+        with self._lock:
+            self.db.set_meta('analysis_state', json.dumps(state))
+
+    def close(self):
+        with self._lock:
+            self.db.close()
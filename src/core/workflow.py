@@ -2,26 +2,71 @@
 Price Monitoring Workflow
 Handles the main workflow for price monitoring and analysis.
 """
+import itertools
 import time
 from datetime import datetime
 import json
-import os
 from pathlib import Path
 
+import numpy as np
+
+from .cache import AnalysisCache
+from .history_store import JSONLinesHistoryStore
+from .metrics import NullMetrics
+from .ring_buffer import PriceRingBuffer, to_epoch_us
+from .rollup import RollupPyramid
+
+# History versions are drawn from one process-wide counter, so two workflows
+# over the same data_dir/product never reuse a version in a shared cache
+_HISTORY_VERSIONS = itertools.count(1)
+
 class PriceMonitorWorkflow:
     """Main workflow for price monitoring system."""
     
-    def __init__(self, data_dir='data'):
+    # Series key of the monitored product in self.rollups
+    ROLLUP_KEY = 'default'
+    
+    def __init__(self, data_dir='data', history_store=None, max_records=1000,
+                 metrics=None, analysis_cache=None):
         """Initialize the price monitoring workflow.
         
         Args:
             data_dir (str): Directory to store data files
+            history_store (BaseHistoryStore, optional): Persistence backend.
+                Defaults to an append-only JSON-lines log in data_dir.
+            max_records (int, optional): Number of records to retain when
+                using the default store. None keeps the full history.
+            metrics (WorkflowMetrics, optional): Instrumentation sink for
+                stage timings and counters. Disabled when None.
+            analysis_cache (AnalysisCache, optional): Cache for analysis,
+                anomaly and report results, may be shared between
+                workflows. Defaults to a private cache.
         """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.ai_engine = None
-        self.historical_prices = []
+        self.price_fetcher = None
+        self.product = None
+        self.trend_analyzer = None
+        self.anomaly_detector = None
+        self.alert_engine = None
+        # Alerts fired by the most recent price
+        self.last_alerts = []
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.analysis_cache = analysis_cache if analysis_cache is not None else AnalysisCache()
+        # Changes whenever the in-memory history changes; part of every cache key
+        self.history_version = next(_HISTORY_VERSIONS)
+        self.historical_prices = PriceRingBuffer(max_records)
+        # Minute/hour/day/week OHLC aggregates of the history for range queries
+        self.rollups = RollupPyramid()
         self.price_history_file = self.data_dir / 'historical_prices.json'
+        if history_store is None:
+            history_store = JSONLinesHistoryStore(
+                self.data_dir / 'historical_prices.jsonl',
+                retention=max_records,
+                legacy_path=self.price_history_file
+            )
+        self.history_store = history_store
         self._load_historical_data()
         
     def set_ai_engine(self, ai_engine):
@@ -33,29 +78,140 @@ class PriceMonitorWorkflow:
         self.ai_engine = ai_engine
         if hasattr(ai_engine, 'initialize'):
             ai_engine.initialize()
+        self._init_streaming_state()
+        # Results computed by the previous engine no longer apply
+        self.analysis_cache.invalidate(self.series_id)
     
-    def _load_historical_data(self):
-        """Load historical price data from file if it exists."""
-        if self.price_history_file.exists():
-            try:
-                with open(self.price_history_file, 'r') as f:
-                    data = json.load(f)
-                    self.historical_prices = data.get('prices', [])
-                    print(f"Loaded {len(self.historical_prices)} historical price records.")
-            except Exception as e:
-                print(f"Error loading historical data: {e}")
-                self.historical_prices = []
+    def set_alert_engine(self, alert_engine):
+        """Evaluate alert rules against every new price.
+        
+        Rules are looked up under the monitored product name (or
+        ROLLUP_KEY while no product is set). The engine's running averages
+        are primed from the loaded history.
+        
+        Args:
+            alert_engine (AlertRuleEngine): Engine holding the rules
+        """
+        self.alert_engine = alert_engine
+        alert_engine.observe_history(self.alert_key, self.historical_prices.timestamps(),
+                                     self.historical_prices.prices())
+    
+    @property
+    def alert_key(self):
+        """str: Product name the alert rules of this workflow are registered under."""
+        return self.product if self.product is not None else self.ROLLUP_KEY
+    
+    def set_price_fetcher(self, fetcher, product):
+        """Fetch the price through an AsyncPriceFetcher instead of the placeholder.
+        
+        Args:
+            fetcher (AsyncPriceFetcher): Fetcher to use
+            product (str): Product whose price this workflow monitors
+        """
+        self.price_fetcher = fetcher
+        self.product = product
+        if self.historical_prices:
+            fetcher.remember(product, self.historical_prices[-1]['price'])
+    
+    @property
+    def series_id(self):
+        """tuple: Identity of the monitored series in the analysis cache."""
+        return (str(self.data_dir), self.product)
+    
+    def _cached(self, operation, compute, *args):
+        """Look up a result for the current history version, computing it on a miss."""
+        key = (self.series_id, self.history_version, operation) + args
+        cache = self.analysis_cache
+        if self.metrics.enabled:
+            self.metrics.inc('analysis_cache_lookups_total', operation=operation,
+                             result='hit' if key in cache else 'miss')
+        return cache.get_or_compute(key, compute)
     
-    def _save_historical_data(self):
-        """Save current price history to file."""
+    def _init_streaming_state(self):
+        """Create the engine's incremental analyzers and bring them up to date.
+        
+        Saved state is reused when it matches the loaded history, so only
+        records appended after the last save are replayed.
+        """
+        self.trend_analyzer = None
+        self.anomaly_detector = None
         try:
-            with open(self.price_history_file, 'w') as f:
-                json.dump({
-                    'last_updated': datetime.now().isoformat(),
-                    'prices': self.historical_prices
-                }, f, indent=2)
+            state = self.history_store.load_state() or {}
         except Exception as e:
-            print(f"Error saving historical data: {e}")
+            print(f"Error loading analysis state: {e}")
+            state = {}
+        
+        if hasattr(self.ai_engine, 'create_trend_analyzer'):
+            self.trend_analyzer = self._restore_streaming(
+                self.ai_engine.create_trend_analyzer(), state.get('trend'))
+        if hasattr(self.ai_engine, 'create_anomaly_detector'):
+            self.anomaly_detector = self._restore_streaming(
+                self.ai_engine.create_anomaly_detector(), state.get('anomaly'))
+    
+    def _restore_streaming(self, fresh, saved):
+        """Restore a streaming component from saved state or replay history.
+        
+        Args:
+            fresh: Newly created component, or None
+            saved (dict, optional): Output of the component's to_dict()
+            
+        Returns:
+            The up-to-date component, or None if fresh is None
+        """
+        if fresh is None:
+            return None
+        
+        component, start = fresh, 0
+        if saved:
+            restored = type(fresh).from_dict(saved)
+            fresh_config = fresh.to_dict()
+            if restored.last_timestamp and \
+                    all(saved.get(key) == fresh_config[key] for key in fresh.CONFIG_KEYS):
+                matches = np.flatnonzero(self.historical_prices.timestamps() ==
+                                         to_epoch_us(restored.last_timestamp))
+                if len(matches):
+                    component, start = restored, matches[-1] + 1
+        
+        for record in self.historical_prices[start:]:
+            component.update(record['price'], record['timestamp'])
+        return component
+    
+    def save_analysis_state(self):
+        """Save the incremental analysis state alongside the history."""
+        state = {}
+        if self.trend_analyzer is not None:
+            state['trend'] = self.trend_analyzer.to_dict()
+        if self.anomaly_detector is not None:
+            state['anomaly'] = self.anomaly_detector.to_dict()
+        if not state:
+            return
+        try:
+            self.history_store.save_state(state)
+        except Exception as e:
+            print(f"Error saving analysis state: {e}")
+    
+    def close(self):
+        """Persist analysis state and release the history store."""
+        self.save_analysis_state()
+        self.history_store.close()
+    
+    def _load_historical_data(self):
+        """Load historical price data from the history store."""
+        try:
+            records = self.history_store.load()
+            self.historical_prices = PriceRingBuffer.from_records(
+                records, self.history_store.retention)
+            self.history_version = next(_HISTORY_VERSIONS)
+            self.rollups.clear()
+            self.rollups.extend(self.ROLLUP_KEY, self.historical_prices.timestamps(),
+                                self.historical_prices.prices())
+            if self.historical_prices:
+                print(f"Loaded {len(self.historical_prices)} historical price records.")
+        except Exception as e:
+            print(f"Error loading historical data: {e}")
+            self.historical_prices = PriceRingBuffer(self.history_store.retention)
+            self.history_version = next(_HISTORY_VERSIONS)
+            self.rollups.clear()
     
     def fetch_current_price(self):
         """Fetch current price from data source.
@@ -63,6 +219,9 @@ class PriceMonitorWorkflow:
         Returns:
             float: Current price or None if not available
         """
+        if self.price_fetcher is not None:
+            return self.price_fetcher.fetch_prices([self.product]).get(self.product)
+        
         # This is a placeholder implementation
         # In a real application, this would fetch from an API or database
         import random
@@ -81,34 +240,93 @@ class PriceMonitorWorkflow:
         if timestamp is None:
             timestamp = datetime.now().isoformat()
             
-        self.historical_prices.append({
+        record = {
             'timestamp': timestamp,
             'price': price
-        })
+        }
+        # The ring buffer drops the oldest point once the retention is reached
+        self.historical_prices.append_record(record)
+        self.history_version = next(_HISTORY_VERSIONS)
+        self.rollups.update(self.ROLLUP_KEY, self.historical_prices.timestamps(1)[0], price)
+        
+        if self.trend_analyzer is not None:
+            self.trend_analyzer.update(price, timestamp)
+        if self.anomaly_detector is not None:
+            self.anomaly_detector.update(price, timestamp)
+        if self.alert_engine is not None:
+            self.last_alerts = self.alert_engine.evaluate(
+                self.alert_key, price, timestamp,
+                anomaly=self.anomaly_detector is not None and self.anomaly_detector.is_anomaly)
+            
+        metrics = self.metrics
+        if not metrics.enabled:
+            try:
+                self.history_store.append([record])
+            except Exception as e:
+                print(f"Error saving historical data: {e}")
+            return
+        
+        bytes_before = getattr(self.history_store, 'bytes_written', 0)
+        start = time.perf_counter()
+        try:
+            self.history_store.append([record])
+        except Exception as e:
+            metrics.inc('history_save_errors_total')
+            print(f"Error saving historical data: {e}")
+        metrics.observe('history_save_seconds', time.perf_counter() - start)
+        saved = getattr(self.history_store, 'bytes_written', 0) - bytes_before
+        metrics.observe('history_save_bytes', saved)
+        metrics.inc('history_saved_bytes_total', saved)
+        metrics.inc('history_records_appended_total')
+        if self.last_alerts:
+            metrics.inc('alerts_fired_total', len(self.last_alerts))
+        metrics.set_gauge('history_records', len(self.historical_prices))
+    
+    def query_history(self, start=None, end=None, resolution='day'):
+        """OHLC aggregates of the price history for a time range.
         
-        # Keep only the last 1000 records to prevent memory issues
-        if len(self.historical_prices) > 1000:
-            self.historical_prices = self.historical_prices[-1000:]
+        Args:
+            start (str, optional): ISO timestamp of the first bucket
+            end (str, optional): ISO timestamp where the range ends (exclusive)
+            resolution: 'minute', 'hour', 'day', 'week' or a bucket width in
+                seconds; served from the coarsest rollup that is this fine
             
-        self._save_historical_data()
+        Returns:
+            dict: 'level' plus bucket arrays 'start' (epoch microseconds),
+                'open', 'high', 'low', 'close', 'mean' and 'count'
+        """
+        return self.rollups.query(self.ROLLUP_KEY, start, end, resolution)
     
     def analyze_current_trend(self):
         """Analyze current price trend using AI engine.
         
+        Results are cached until the history changes.
+        
         Returns:
             dict: Analysis results
         """
+        return dict(self._cached('analysis', self._analyze_current_trend))
+    
+    def _analyze_current_trend(self):
         if not self.ai_engine:
             return {'error': 'AI engine not initialized'}
             
         if len(self.historical_prices) < 2:
             return {'error': 'Insufficient data for analysis'}
             
-        # Extract prices for analysis
-        prices = [p['price'] for p in self.historical_prices]
+        if self.trend_analyzer is not None:
+            # Incremental state already holds everything the analysis needs
+            analysis = self.trend_analyzer.analyze()
+        else:
+            # Zero-copy view of the buffered prices
+            prices = self.historical_prices.prices()
+            
+            # Get analysis from AI engine
+            analysis = self.ai_engine.analyze_price_trend(prices)
         
-        # Get analysis from AI engine
-        analysis = self.ai_engine.analyze_price_trend(prices)
+        if self.anomaly_detector is not None:
+            analysis['anomaly'] = self.anomaly_detector.is_anomaly
+            analysis['anomaly_score'] = self.anomaly_detector.last_score
         
         # Add basic statistics
         analysis['last_updated'] = datetime.now().isoformat()
@@ -116,15 +334,45 @@ class PriceMonitorWorkflow:
         
         return analysis
     
+    def detect_anomalies(self, threshold=2.0):
+        """Detect anomalies over the buffered history using the AI engine.
+        
+        Results are cached until the history changes.
+        
+        Args:
+            threshold (float): Z-score threshold for anomaly detection
+            
+        Returns:
+            list: Indices of anomalous points in the buffered history
+        """
+        if not self.ai_engine:
+            return []
+        return list(self._cached(
+            'anomalies',
+            lambda: self.ai_engine.detect_anomalies(self.historical_prices.prices(), threshold),
+            threshold))
+    
     def generate_report(self, analysis):
         """Generate a report from analysis results.
         
+        Reports are cached per history version and analysis content, so
+        insights are not regenerated for an unchanged series.
+        
         Args:
             analysis (dict): Analysis results from analyze_current_trend()
             
         Returns:
             str: Formatted report
         """
+        try:
+            content = tuple(sorted(analysis.items()))
+            hash(content)
+        except TypeError:
+            # Unhashable values (e.g. engine-specific lists) bypass the cache
+            return self._generate_report(analysis)
+        return self._cached('report', lambda: self._generate_report(analysis), content)
+    
+    def _generate_report(self, analysis):
         if 'error' in analysis:
             return f"Error: {analysis['error']}"
             
@@ -149,34 +397,63 @@ class PriceMonitorWorkflow:
     def run_full_workflow(self):
         """Run the complete price monitoring workflow.
         
+        Each stage is timed as a span on self.metrics.
+        
         Returns:
             dict: Results of the workflow execution
         """
+        metrics = self.metrics
+        with metrics.span('cycle'):
+            result = self._run_stages(metrics)
+        metrics.inc('workflow_cycles_total', success=str(result['success']).lower())
+        return result
+    
+    def _run_stages(self, metrics):
         print("Starting price monitoring workflow...")
         
         # 1. Fetch current price
-        current_price = self.fetch_current_price()
+        with metrics.span('fetch'):
+            current_price = self.fetch_current_price()
+        if current_price is None:
+            # Fetch failed and there is no last known price to fall back on
+            print(f"Could not fetch a price for {self.product}; skipping this cycle")
+            self.last_alerts = []
+            return {
+                'success': False,
+                'message': 'Price not available',
+                'current_price': None,
+                'alerts': []
+            }
         print(f"Current price: ${current_price:.2f}")
         
         # 2. Update price history
-        self.update_price_history(current_price)
+        with metrics.span('update_history'):
+            self.update_price_history(current_price)
+        with metrics.span('save_state'):
+            self.save_analysis_state()
         print(f"Updated price history with {len(self.historical_prices)} records")
+        for alert in self.last_alerts:
+            print(f"ALERT: {alert['message']}")
         
         # 3. Analyze trend if we have enough data
         if len(self.historical_prices) >= 2:
-            analysis = self.analyze_current_trend()
-            report = self.generate_report(analysis)
+            with metrics.span('analyze'):
+                analysis = self.analyze_current_trend()
+            with metrics.span('report'):
+                report = self.generate_report(analysis)
             print("\n" + report)
             return {
                 'success': True,
                 'current_price': current_price,
                 'analysis': analysis,
-                'report': report
+                'report': report,
+                'alerts': self.last_alerts
             }
         else:
             print("Insufficient data for trend analysis. Collecting more data...")
             return {
                 'success': False,
                 'message': 'Insufficient data for analysis',
-                'current_price': current_price
+                'current_price': current_price,
+                'alerts': self.last_alerts
             }
@@ -1,18 +1,31 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
+import sys
 
-def generate_mock_prices(days=30, seed=42):
+if __package__ in (None, ''):
+    # 直接运行脚本时把仓库根目录加入模块搜索路径
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.data.partitioned import PartitionedPriceStore, date_range
+from src.data.price_parsing import parse_price
+from src.data.scenarios import generate_scenarios
+from src.data.simulation import PROMO_SHOCKS, simulate_price_matrix
+
+# RTX 4080 价格波动规则：日常波动 -1% ~ +1.5%，618/双11大促降价，限制在 850 ~ 1200
+SIMULATION_RULES = {
+    'drift': (-0.01, 0.015),
+    'floors': 850,
+    'ceilings': 1200,
+    'promo_shocks': PROMO_SHOCKS,
+}
+
+def load_base_price():
     """
-    生成合规的模拟价格数据（基于您的GPU价格指数）
-    :param days: 生成多少天的数据
-    :param seed: 随机种子（确保可复现）
-    :return: pandas DataFrame
+    从合规数据集中读取RTX 4080的基础价格，读取失败时使用默认价格
+    :return: 基础价格（美元）
     """
-    np.random.seed(seed)
-    
     # 1. 读取您的合规数据集
     data_dir = os.path.join(os.path.dirname(__file__), "../../data")
     cleaned_data_path = os.path.join(data_dir, "cleaned_gpu_prices.csv")
@@ -40,11 +53,10 @@ def generate_mock_prices(days=30, seed=42):
             
             # 3. 获取基础价格
             if not rtx4080_rows.empty:
-                # 从您的数据集中提取RTX 4080价格
-                price_str = str(rtx4080_rows.iloc[0]["Price"]).strip()
-                # 移除$符号和逗号
-                price_str = price_str.replace('$', '').replace(',', '')
-                base_price = float(price_str)
+                # 从您的数据集中提取RTX 4080价格（去掉$符号和千位分隔符）
+                base_price = parse_price(rtx4080_rows.iloc[0]["Price"])
+                if base_price is None:
+                    raise ValueError(f"无法解析价格: {rtx4080_rows.iloc[0]['Price']}")
                 print(f"📊 使用您的合规数据集: RTX 4080价格 = ${base_price:,.2f}")
             else:
                 base_price = 1029.0  # RTX 4080标准价格（美元）
@@ -54,28 +66,34 @@ def generate_mock_prices(days=30, seed=42):
             base_price = 1029.0
             print("⚠️ 使用默认RTX 4080价格 $1,029")
 
+    return base_price
+
+def generate_mock_prices(days=30, seed=42, end_date=None):
+    """
+    生成合规的模拟价格数据（基于您的GPU价格指数）
+    :param days: 生成多少天的数据
+    :param seed: 随机种子（确保可复现）
+    :param end_date: 最后一天（date / datetime），默认今天
+    :return: pandas DataFrame
+    """
+    np.random.seed(seed)
+    
+    # 1~3. 读取合规数据集中的RTX 4080基础价格
+    base_price = load_base_price()
+
     # 4. 生成日期序列
-    today = datetime.now()
+    today = end_date if end_date is not None else datetime.now()
     dates = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days-1, -1, -1)]
     
-    # 5. 模拟价格波动
-    prices = []
-    current_price = base_price
-    for date_str in dates:
-        current_date = datetime.strptime(date_str, "%Y-%m-%d")
-        # 大促日特殊处理
-        if current_date.month == 6 and current_date.day == 18:
-            current_price *= 0.92  # 618降价8%
-        elif current_date.month == 11 and current_date.day == 11:
-            current_price *= 0.88  # 双11降价12%
-        else:
-            # 日常波动：-1% ~ +1.5%
-            daily_change = np.random.uniform(-0.01, 0.015)
-            current_price *= (1 + daily_change)
-        
-        # 价格合理性校验（RTX 4080合理范围）
-        current_price = max(850, min(current_price, 1200))
-        prices.append(round(current_price, 2))
+    # 5. 模拟价格波动：日常波动 -1% ~ +1.5%，618/双11大促降价，
+    #    并限制在RTX 4080合理范围内（850 ~ 1200）
+    path = simulate_price_matrix(
+        [base_price],
+        days,
+        start_date=datetime.strptime(dates[0], "%Y-%m-%d"),
+        **SIMULATION_RULES
+    )[0]
+    prices = np.round(path, 2).tolist()
     
     # 6. 构建DataFrame
     df = pd.DataFrame({
@@ -86,17 +104,83 @@ def generate_mock_prices(days=30, seed=42):
     
     return df
 
-def save_mock_data(output_path="data/historical_prices.csv"):
-    """保存模拟数据到指定路径"""
-    # 确保输出目录存在
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    
-    df = generate_mock_prices()
-    # 明确指定编码
-    df.to_csv(output_path, index=False, encoding='utf-8')
-    print(f"✅ 模拟数据已保存至: {output_path}")
-    print(f"   数据范围: {df['date'].min()} 至 {df['date'].max()}")
-    print(f"   价格范围: ${df['rtx4080_price'].min():,.2f} - ${df['rtx4080_price'].max():,.2f}")
+def generate_price_scenarios(days=30, n_paths=10000, seed=42, workers=None):
+    """
+    用与 generate_mock_prices 相同的波动规则生成未来多条可能的价格路径
+    使用 SeedSequence 派生的独立随机流（不修改全局随机状态），可安全并行
+    :param days: 模拟天数
+    :param n_paths: 路径数
+    :param seed: 根种子（确保可复现）
+    :param workers: 进程数，None 为 CPU 核数
+    :return: pandas DataFrame，每天一行，包含 P5 / P50 / P95 价格带和均值
+    """
+    base_price = load_base_price()
+    # 从明天开始的未来 days 天
+    today = datetime.now()
+    dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(1, days + 1)]
+
+    result = generate_scenarios(
+        [base_price],
+        days,
+        n_paths=n_paths,
+        seed=seed,
+        workers=workers,
+        start_date=datetime.strptime(dates[0], "%Y-%m-%d"),
+        **SIMULATION_RULES
+    )
+
+    df = pd.DataFrame({'date': dates})
+    for q, band in zip(result['quantiles'], result['bands'][0]):
+        df[f'p{q}'] = np.round(band, 2)
+    df['mean'] = np.round(result['mean'][0], 2)
+    return df
+
+def extend_history(root="data/ticks", today=None, days=30, seed=42,
+                   legacy_path="data/historical_prices.csv"):
+    """
+    增量延长分区存储中的模拟价格：只追加上次之后缺少的日期，
+    从最后保存的价格和随机数生成器状态继续模拟，不重新生成已有历史
+    :param root: 分区存储目录（见 src/data/partitioned.py）
+    :param today: 模拟到哪一天（date 或 'YYYY-MM-DD'），默认今天
+    :param days: 存储为空且没有旧 CSV 时初始生成的天数
+    :param seed: 存储为空时随机数生成器的种子
+    :param legacy_path: 存储为空时导入的旧版 historical_prices.csv（已停止更新，只在首次建立存储时导入一次）
+    :return: 新追加的天数
+    """
+    store = PartitionedPriceStore(root, columns=('rtx4080_price',))
+    today = date.fromisoformat(str(today)[:10]) if today is not None else date.today()
+    rng = store.rng(seed)
+
+    if store.last_date is None:
+        if legacy_path and os.path.exists(legacy_path):
+            legacy = pd.read_csv(legacy_path, encoding='utf-8')
+            legacy = legacy[legacy['date'] <= today.isoformat()]
+            store.append(legacy['date'], legacy['rtx4080_price'], rng.bit_generator.state)
+            print(f"✅ 已导入旧数据 {legacy_path}: {len(legacy)} 天")
+        else:
+            initial = generate_mock_prices(days, seed, end_date=today)
+            store.append(initial['date'], initial['rtx4080_price'], rng.bit_generator.state)
+            print(f"✅ 已生成初始数据: {len(initial)} 天")
+
+    if store.last_date is None or store.last_date >= today:
+        print(f"✅ 数据已是最新: {store.last_date}")
+        return 0
+
+    missing = date_range(store.last_date + timedelta(days=1), today)
+    path = simulate_price_matrix(
+        store.last_values,
+        len(missing),
+        start_date=datetime.combine(missing[0], datetime.min.time()),
+        # 每天取整到分，与逐日追加（从保存的价格继续）的结果一致
+        round_each_step=True,
+        rng=rng,
+        **SIMULATION_RULES
+    )[0]
+    store.append(missing, path, rng.bit_generator.state)
+    print(f"✅ 已追加 {len(missing)} 天模拟数据至: {root}")
+    print(f"   数据范围: {store.manifest['first_date']} 至 {store.last_date}，共 {len(store)} 天")
+    print(f"   最新价格: ${store.last_values[0]:,.2f}")
+    return len(missing)
 
 if __name__ == "__main__":
-    save_mock_data()
\ No newline at end of file
+    extend_history()
\ No newline at end of file
@@ -3,19 +3,28 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import sys
 
-def generate_weekly_prices(days=7, seed=42):
+if __package__ in (None, ''):
+    # 直接运行脚本时把仓库根目录加入模块搜索路径
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from src.data.price_parsing import parse_prices
+from src.data.simulation import simulate_price_matrix
+
+def generate_weekly_prices(days=7, seed=42, input_path=None, output_path=None):
     """
     为所有显卡生成一周的模拟价格数据
     :param days: 生成多少天的数据，默认为7天
     :param seed: 随机种子（确保可复现）
+    :param input_path: 显卡基础价格CSV，默认 data/cleaned_gpu_prices.csv
+    :param output_path: 输出CSV，默认 data/weekly_gpu_prices.csv
     :return: pandas DataFrame
     """
     np.random.seed(seed)
     
     # 1. 读取显卡基础价格数据
     data_dir = os.path.join(os.path.dirname(__file__), "../../data")
-    cleaned_data_path = os.path.join(data_dir, "cleaned_gpu_prices.csv")
+    cleaned_data_path = input_path or os.path.join(data_dir, "cleaned_gpu_prices.csv")
     
     try:
         # 读取显卡基础数据
@@ -30,57 +39,35 @@ def generate_weekly_prices(days=7, seed=42):
     start_date = end_date - timedelta(days=days-1)
     date_range = pd.date_range(start=start_date, end=end_date, freq='D')
     
-    # 3. 为每款显卡生成价格序列
-    all_data = []
-    
-    for _, gpu in gpu_data.iterrows():
-        product = gpu['Product']
-        base_price = gpu['Price']
-        
-        # 如果价格是字符串，清理并转换为浮点数
-        if isinstance(base_price, str):
-            base_price = float(base_price.replace('$', '').replace(',', '').strip())
-        elif pd.isna(base_price):
-            # 如果价格缺失，使用同系列产品的平均价格
-            series = product.split()[-1]
-            similar_gpus = gpu_data[gpu_data['Product'].str.contains(series, regex=False)]
-            base_price = similar_gpus['Price'].dropna().mean()
-            if pd.isna(base_price):
-                base_price = 500  # 默认基础价格
-        
-        # 为每款显卡生成7天价格
-        prices = []
-        current_price = base_price
-        
-        for _ in range(days):
-            # 每日价格波动：-2% ~ +3%
-            daily_change = np.random.uniform(-0.02, 0.03)
-            current_price *= (1 + daily_change)
-            
-            # 确保价格合理（不低于历史最低价的90%）
-            historical_low = gpu['Historical_Low']
-            if not pd.isna(historical_low):
-                if isinstance(historical_low, str):
-                    historical_low = float(historical_low.replace('$', '').replace(',', '').strip())
-                min_price = historical_low * 0.9
-                current_price = max(min_price, current_price)
-            
-            prices.append(round(current_price, 2))
-        
-        # 添加到结果集
-        for i, date in enumerate(date_range):
-            all_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'product': product,
-                'price': prices[i],
-                'base_price': base_price
-            })
-    
-    # 4. 创建DataFrame
-    df = pd.DataFrame(all_data)
+    # 3. 解析基础价格和历史最低价（整列一次性处理）
+    base_prices = pd.Series(parse_prices(gpu_data['Price'])[0])
+    for i in np.flatnonzero(base_prices.isna().to_numpy()):
+        # 如果价格缺失，使用同系列产品的平均价格
+        series = gpu_data['Product'].iloc[i].split()[-1]
+        similar_gpus = gpu_data['Product'].str.contains(series, regex=False)
+        base_price = base_prices[similar_gpus].mean()
+        base_prices.iloc[i] = 500 if pd.isna(base_price) else base_price
+    historical_lows = pd.Series(parse_prices(gpu_data['Historical_Low'])[0])
+
+    # 4. 向量化生成所有显卡的价格矩阵（每日波动 -2% ~ +3%，不低于历史最低价的90%）
+    prices = simulate_price_matrix(
+        base_prices.to_numpy(),
+        days,
+        drift=(-0.02, 0.03),
+        floors=historical_lows.to_numpy() * 0.9
+    )
+
+    # 5. 创建DataFrame（按显卡展开为 显卡 x 日期 的长表）
+    n_gpus = len(gpu_data)
+    df = pd.DataFrame({
+        'date': np.tile(date_range.strftime('%Y-%m-%d'), n_gpus),
+        'product': np.repeat(gpu_data['Product'].to_numpy(), days),
+        'price': np.round(prices, 2).reshape(-1),
+        'base_price': np.repeat(base_prices.to_numpy(), days)
+    })
     
-    # 5. 保存到文件
-    output_path = os.path.join(data_dir, 'weekly_gpu_prices.csv')
+    # 6. 保存到文件
+    output_path = output_path or os.path.join(data_dir, 'weekly_gpu_prices.csv')
     df.to_csv(output_path, index=False, encoding='utf-8')
     
     print(f"✅ 成功生成 {len(gpu_data)} 款显卡的 {days} 天价格数据")
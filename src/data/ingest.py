@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+显卡目录CSV的流式导入与校验
+按固定行数分块读取（显式指定列类型，全部按字符串读入再整列解析），每块做向量化校验：
+缺失值、禁止字段（URL / Timestamp / User）、价格格式和价格范围。
+合格的行按列追加写入二进制列文件，同时生成校验报告；峰值内存只取决于块大小，与文件大小无关。
+
+输出目录结构：
+    product.txt         产品名，每行一个
+    price.f8            当前价格（float64）
+    historical_low.f8   历史最低价（float64，缺失为 NaN）
+    report.json         校验报告（行数、各类问题计数及示例行号）
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data.price_parsing import is_missing, parse_prices
+
+REQUIRED_COLUMNS = ('Product', 'Price', 'Historical_Low')
+
+# 合规要求：数据集中不得包含链接、时间戳和用户信息
+FORBIDDEN_COLUMNS = ('URL', 'Timestamp', 'User')
+
+# 每块读取的行数
+CHUNK_ROWS = 50000
+
+# 合理的价格范围（美元），超出范围的行视为错误数据
+PRICE_RANGE = (1.0, 100000.0)
+
+# 报告中每类问题最多记录的示例行号数
+MAX_SAMPLES = 10
+
+ISSUES = (
+    'missing_product',
+    'missing_price',
+    'invalid_price',
+    'price_out_of_range',
+    'invalid_historical_low',
+    'historical_low_out_of_range',
+)
+
+COLUMN_FILES = {'price': 'price.f8', 'historical_low': 'historical_low.f8'}
+
+
+def _parse_column(column):
+    """
+    整列解析价格字符串
+    :return: (float64 数组, 缺失掩码, 非空但无法解析的掩码)
+    """
+    values, valid = parse_prices(column)
+    missing = is_missing(column)
+    return values, missing, ~valid & ~missing
+
+
+def read_header(path):
+    """只读取CSV表头，返回列名列表"""
+    return list(pd.read_csv(path, nrows=0, encoding='utf-8').columns)
+
+
+def check_columns(columns):
+    """
+    检查列名
+    :return: (缺少的必需列, 出现的禁止字段)
+    """
+    lowered = {c.strip().lower() for c in columns}
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    forbidden = [c for c in FORBIDDEN_COLUMNS if c.lower() in lowered]
+    return missing, forbidden
+
+
+def validate_chunk(chunk, first_row=0, price_range=PRICE_RANGE):
+    """
+    向量化校验一个数据块
+    :param chunk: 按字符串读入的 DataFrame，含 Product / Price / Historical_Low 列
+    :param first_row: 本块第一行在文件中的行号（从0开始，不含表头），用于报告示例
+    :param price_range: (最低价, 最高价)
+    :return: (清洗后的 DataFrame[product, price, historical_low], {问题: 出错行号数组})
+    """
+    low_bound, high_bound = price_range
+    product = chunk['Product']
+    price, price_missing, price_invalid = _parse_column(chunk['Price'])
+    historical_low, _, low_invalid = _parse_column(chunk['Historical_Low'])
+
+    with np.errstate(invalid='ignore'):
+        masks = {
+            'missing_product': product.isna().to_numpy(),
+            'missing_price': price_missing,
+            'invalid_price': price_invalid,
+            'price_out_of_range': (price < low_bound) | (price > high_bound),
+            'invalid_historical_low': low_invalid,
+            'historical_low_out_of_range': (historical_low < low_bound) | (historical_low > high_bound),
+        }
+
+    bad = np.zeros(len(chunk), dtype=bool)
+    for mask in masks.values():
+        bad |= mask
+    good = ~bad
+    cleaned = pd.DataFrame({
+        'product': product.to_numpy()[good],
+        'price': price[good],
+        'historical_low': historical_low[good],
+    })
+    rows = {issue: first_row + np.flatnonzero(mask) for issue, mask in masks.items()}
+    return cleaned, rows
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """按块读取CSV的必需列，所有列按字符串读入，避免类型推断"""
+    return pd.read_csv(
+        path,
+        usecols=list(REQUIRED_COLUMNS),
+        dtype={column: str for column in REQUIRED_COLUMNS},
+        keep_default_na=False,
+        na_values=[''],
+        skipinitialspace=True,
+        encoding='utf-8',
+        chunksize=chunk_rows
+    )
+
+
+def ingest_catalogue(path, output_dir=None, chunk_rows=CHUNK_ROWS, price_range=PRICE_RANGE,
+                     on_chunk=None):
+    """
+    流式导入并校验显卡目录CSV
+    :param path: 输入CSV路径
+    :param output_dir: 列式输出目录，为 None 时只校验不输出
+    :param chunk_rows: 每块行数，决定峰值内存
+    :param price_range: (最低价, 最高价)
+    :param on_chunk: 可选回调，依次接收每个清洗后的数据块
+    :return: 校验报告 dict，'passed' 表示没有结构性错误（缺列或包含禁止字段）
+    """
+    columns = read_header(path)
+    missing_columns, forbidden_columns = check_columns(columns)
+    report = {
+        'source': os.path.abspath(path),
+        'columns': columns,
+        'missing_columns': missing_columns,
+        'forbidden_columns': forbidden_columns,
+        'chunk_rows': chunk_rows,
+        'price_range': list(price_range),
+        'chunks': 0,
+        'rows': 0,
+        'valid_rows': 0,
+        'issues': {issue: 0 for issue in ISSUES},
+        'samples': {issue: [] for issue in ISSUES},
+        'price_min': None,
+        'price_max': None,
+        'passed': not missing_columns and not forbidden_columns,
+    }
+    if missing_columns:
+        return report
+
+    files = {}
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        files['product'] = open(os.path.join(output_dir, 'product.txt'), 'w', encoding='utf-8')
+        for name, filename in COLUMN_FILES.items():
+            files[name] = open(os.path.join(output_dir, filename), 'wb')
+
+    try:
+        for chunk in iter_chunks(path, chunk_rows):
+            cleaned, rows = validate_chunk(chunk, report['rows'], price_range)
+            report['chunks'] += 1
+            report['rows'] += len(chunk)
+            report['valid_rows'] += len(cleaned)
+            for issue, numbers in rows.items():
+                report['issues'][issue] += len(numbers)
+                samples = report['samples'][issue]
+                samples.extend(numbers[:MAX_SAMPLES - len(samples)].tolist())
+            if len(cleaned):
+                low, high = float(cleaned['price'].min()), float(cleaned['price'].max())
+                report['price_min'] = low if report['price_min'] is None else min(report['price_min'], low)
+                report['price_max'] = high if report['price_max'] is None else max(report['price_max'], high)
+
+            if files and len(cleaned):
+                files['product'].write('\n'.join(cleaned['product'].tolist()) + '\n')
+                for name in COLUMN_FILES:
+                    files[name].write(cleaned[name].to_numpy(dtype=np.float64).tobytes())
+            if on_chunk is not None:
+                on_chunk(cleaned)
+    finally:
+        for f in files.values():
+            f.close()
+
+    if output_dir is not None:
+        with open(os.path.join(output_dir, 'report.json'), 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def load_columns(directory, mmap=True):
+    """
+    读取 ingest_catalogue 的列式输出
+    :param directory: 输出目录
+    :param mmap: 为 True 时价格列以只读内存映射方式打开，不读入内存
+    :return: {'product': 产品名列表, 'price': 数组, 'historical_low': 数组}
+    """
+    with open(os.path.join(directory, 'product.txt'), 'r', encoding='utf-8') as f:
+        columns = {'product': f.read().splitlines()}
+    for name, filename in COLUMN_FILES.items():
+        path = os.path.join(directory, filename)
+        if mmap and os.path.getsize(path):
+            columns[name] = np.memmap(path, dtype=np.float64, mode='r')
+        else:
+            columns[name] = np.fromfile(path, dtype=np.float64)
+    return columns
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+按月分区、差分编码的每日价格存储
+每月一个文本文件，每天一行：日期中的"日"加上各列相对前一天的价格变化（单位为分）；
+每个分区的第一行记录绝对价格，因此任何一个分区都能单独解码。
+每天只在当月文件末尾追加一行，git 每次提交只改动一行，不再整份重写历史文件。
+
+目录结构：
+    manifest.json   列名、精度、各分区的日期范围和行数、最后一天的价格及随机数生成器状态
+    2026-06.csv     day,<列1>,<列2>...   例如 "02,102835" 之后是 "03,1415"、"04,-866"
+
+读取时根据清单只打开与日期范围重叠的分区，并逐个分区惰性解码。
+"""
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 1
+
+# 价格以分（1/100 美元）为单位做差分
+DEFAULT_SCALE = 100
+
+
+def _as_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _month_of(day):
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+class PartitionedPriceStore:
+    """每日价格的分区存储：按月分区的差分编码文件加一个清单"""
+
+    def __init__(self, root, columns=('price',), scale=DEFAULT_SCALE):
+        """
+        打开（或新建）存储目录
+        :param root: 存储目录
+        :param columns: 价格列名，目录已存在时以清单为准
+        :param scale: 价格精度倍数（100 表示精确到分），目录已存在时以清单为准
+        """
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('format') != FORMAT_VERSION:
+                raise ValueError(f"不支持的存储格式版本: {self.manifest.get('format')}")
+        else:
+            self.manifest = {
+                'format': FORMAT_VERSION,
+                'columns': list(columns),
+                'scale': scale,
+                'first_date': None,
+                'last_date': None,
+                'last_values': None,
+                'partitions': {},
+                'rng_state': None
+            }
+
+    @property
+    def columns(self):
+        return self.manifest['columns']
+
+    @property
+    def scale(self):
+        return self.manifest['scale']
+
+    @property
+    def last_date(self):
+        """最后一天的日期（date），空存储为 None"""
+        return _as_date(self.manifest['last_date'])
+
+    @property
+    def last_values(self):
+        """最后一天各列的价格（float 列表），空存储为 None"""
+        values = self.manifest['last_values']
+        return None if values is None else [v / self.scale for v in values]
+
+    def __len__(self):
+        return sum(p['rows'] for p in self.manifest['partitions'].values())
+
+    def _partition_path(self, month):
+        return os.path.join(self.root, f"{month}.csv")
+
+    def append(self, dates, values, rng_state=None):
+        """
+        追加若干天的价格，只写入对应月份文件的末尾
+        :param dates: 日期序列（date 或 'YYYY-MM-DD'），必须晚于已有的最后一天且递增
+        :param values: (天数, 列数) 的价格，或单列时的一维序列
+        :param rng_state: 生成这些价格后的随机数生成器状态，一并记录在清单中
+        :return: 追加的天数
+        """
+        dates = [_as_date(d) for d in dates]
+        if not dates:
+            return 0
+        values = np.asarray(values, dtype=np.float64).reshape(len(dates), -1)
+        if values.shape[1] != len(self.columns):
+            raise ValueError(f"价格列数应为 {len(self.columns)}，实际为 {values.shape[1]}")
+        last_date = self.last_date
+        previous = [last_date] + dates[:-1]
+        if any(p is not None and d <= p for d, p in zip(dates, previous)):
+            raise ValueError("日期必须晚于已有数据且严格递增")
+
+        cents = np.round(values * self.scale).astype(np.int64)
+        os.makedirs(self.root, exist_ok=True)
+        partitions = self.manifest['partitions']
+        last_values = self.manifest['last_values']
+
+        start = 0
+        while start < len(dates):
+            month = _month_of(dates[start])
+            stop = start
+            while stop < len(dates) and _month_of(dates[stop]) == month:
+                stop += 1
+            partition = partitions.get(month)
+            block = cents[start:stop]
+            # 分区第一行存绝对值，其余存相对前一天的差值
+            reference = np.asarray(last_values if partition else np.zeros(len(self.columns)),
+                                   dtype=np.int64)
+            deltas = np.diff(np.vstack((reference, block)), axis=0)
+            lines = ''.join(
+                f"{d.day:02d}," + ','.join(str(v) for v in row) + '\n'
+                for d, row in zip(dates[start:stop], deltas.tolist())
+            )
+            self._append_lines(month, partition, lines)
+            if partition is None:
+                partition = partitions[month] = {
+                    'first_date': dates[start].isoformat(), 'rows': 0}
+            partition['last_date'] = dates[stop - 1].isoformat()
+            partition['rows'] += stop - start
+            last_values = block[-1].tolist()
+            start = stop
+
+        if self.manifest['first_date'] is None:
+            self.manifest['first_date'] = dates[0].isoformat()
+        self.manifest['last_date'] = dates[-1].isoformat()
+        self.manifest['last_values'] = last_values
+        if rng_state is not None:
+            self.manifest['rng_state'] = rng_state
+        self._save_manifest()
+        return len(dates)
+
+    def _append_lines(self, month, partition, lines):
+        """向分区文件追加行；清单之外的残留行（上次写入中断）先截掉"""
+        path = self._partition_path(month)
+        if partition is None:
+            with open(path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write('day,' + ','.join(self.columns) + '\n' + lines)
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = f.readlines()
+        if len(existing) != partition['rows'] + 1:
+            existing = existing[:partition['rows'] + 1]
+            with open(path, 'w', encoding='utf-8', newline='\n') as f:
+                f.writelines(existing)
+        with open(path, 'a', encoding='utf-8', newline='\n') as f:
+            f.write(lines)
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, self.manifest_path)
+
+    def months(self, start=None, end=None):
+        """与日期范围 [start, end] 重叠的分区（月份字符串），按时间排序"""
+        start, end = _as_date(start), _as_date(end)
+        months = []
+        for month, partition in sorted(self.manifest['partitions'].items()):
+            if start is not None and _as_date(partition['last_date']) < start:
+                continue
+            if end is not None and _as_date(partition['first_date']) > end:
+                continue
+            months.append(month)
+        return months
+
+    def read_partition(self, month):
+        """
+        解码一个分区
+        :param month: 'YYYY-MM'
+        :return: (日期列表, (行数, 列数) 的 float64 价格数组)
+        """
+        rows = self.manifest['partitions'][month]['rows']
+        year, mon = (int(part) for part in month.split('-'))
+        raw = np.loadtxt(self._partition_path(month), delimiter=',', skiprows=1,
+                         max_rows=rows, dtype=np.int64, ndmin=2)
+        dates = [date(year, mon, int(day)) for day in raw[:, 0]]
+        return dates, np.cumsum(raw[:, 1:], axis=0) / self.scale
+
+    def iter_range(self, start=None, end=None):
+        """
+        惰性读取日期范围 [start, end] 内的数据，每次只解码一个分区
+        :return: 逐分区产出 (日期列表, 价格数组)
+        """
+        start, end = _as_date(start), _as_date(end)
+        for month in self.months(start, end):
+            dates, values = self.read_partition(month)
+            keep = np.array([(start is None or d >= start) and (end is None or d <= end)
+                             for d in dates], dtype=bool)
+            if keep.any():
+                yield [d for d, k in zip(dates, keep) if k], values[keep]
+
+    def read_range(self, start=None, end=None):
+        """
+        读取日期范围 [start, end] 内的数据
+        :return: pandas DataFrame，date 列（'YYYY-MM-DD'）加各价格列
+        """
+        dates, blocks = [], []
+        for part_dates, values in self.iter_range(start, end):
+            dates.extend(d.isoformat() for d in part_dates)
+            blocks.append(values)
+        values = np.vstack(blocks) if blocks else np.empty((0, len(self.columns)))
+        df = pd.DataFrame(values, columns=self.columns)
+        df.insert(0, 'date', dates)
+        return df
+
+    def rng(self, seed=None):
+        """
+        按清单中记录的状态恢复随机数生成器，没有记录时用 seed 新建
+        :return: np.random.Generator
+        """
+        rng = np.random.default_rng(seed)
+        if self.manifest['rng_state'] is not None:
+            rng.bit_generator.state = self.manifest['rng_state']
+        return rng
+
+
+def date_range(first, last):
+    """[first, last] 内的每一天"""
+    first, last = _as_date(first), _as_date(last)
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+价格字符串的统一解析与规范化
+整列（pandas Series / NumPy 数组 / 列表）一次性处理：把整列拼成一个字符串，用 str.replace 在 C 层
+一次去掉货币符号、货币代码和千位分隔符，统一小数点后整列转换为 float64，不逐行调用 float()。
+
+支持的区域格式：
+    'en'    1,299.99   （默认，逗号分组、点作小数点）
+    'de'    1.299,99   （点分组、逗号作小数点）
+    'fr'    1 299,99   （空格分组、逗号作小数点）
+    'ch'    1'299.99   （撇号分组、点作小数点）
+    'auto'  逐个推断：同时出现逗号和点时后出现的是小数点；只有一个逗号且其后不是恰好3位数字时
+            逗号是小数点；有多个点且没有逗号时点是分组符
+"""
+import numpy as np
+import pandas as pd
+
+CURRENCY_SYMBOLS = ('US$', '$', '€', '£', '¥', '￥', '₹', '₩')
+CURRENCY_CODES = ('USD', 'EUR', 'GBP', 'CNY', 'RMB', 'JPY')
+
+# 各区域格式的 (小数点, 分组符)；空白分组符在任何格式下都会去掉
+LOCALES = {
+    'en': ('.', (',',)),
+    'de': (',', ('.',)),
+    'fr': (',', ()),
+    'ch': ('.', ("'", '\u2019')),
+}
+
+# 数字中间可能出现的空白（普通空格、不换行空格、窄不换行空格）
+_SPACES = (' ', '\u00a0', '\u202f')
+
+# 拼接整列时的分隔符，不会出现在价格文本中
+_SEPARATOR = '\x00'
+
+
+def _as_list(values):
+    """转为字符串列表，缺失值（None / NaN）变为空字符串"""
+    values = np.asarray(values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else values,
+                        dtype=object).reshape(-1)
+    missing = pd.isna(values)
+    if missing.any():
+        values = np.where(missing, '', values)
+    return list(map(str, values.tolist()))
+
+
+def _remove(text, targets):
+    for target in targets:
+        text = text.replace(target, '')
+    return text
+
+
+def _normalize_auto(strings):
+    """逐个推断小数点（见模块说明），strings 为已去掉货币符号和空白的 numpy 字符串数组"""
+    last_comma = np.char.rfind(strings, ',')
+    last_dot = np.char.rfind(strings, '.')
+    digits_after_comma = np.char.str_len(strings) - last_comma - 1
+    comma_decimal = np.where(
+        last_dot >= 0,
+        last_comma > last_dot,
+        (np.char.count(strings, ',') == 1) & (digits_after_comma != 3)
+    )
+    dot_groups = ~comma_decimal & (np.char.count(strings, '.') > 1)
+
+    result = np.char.replace(strings, ',', '').astype(object)
+    if comma_decimal.any():
+        result[comma_decimal] = np.char.replace(
+            np.char.replace(strings[comma_decimal], '.', ''), ',', '.')
+    if dot_groups.any():
+        result[dot_groups] = np.char.replace(strings[dot_groups], '.', '')
+    return result.tolist()
+
+
+def normalize_prices(values, locale='en'):
+    """
+    把价格字符串规范化为可直接转换的数字字符串
+    :param values: 价格列（字符串、数字或缺失值）
+    :param locale: 区域格式，见模块说明
+    :return: 字符串列表，如 '$1,299.99' -> '1299.99'，缺失值为 ''
+    """
+    if locale != 'auto' and locale not in LOCALES:
+        raise ValueError(f"不支持的区域格式: {locale}")
+    strings = _as_list(values)
+    if not strings:
+        return []
+
+    text = _SEPARATOR.join(strings)
+    text = _remove(text, CURRENCY_SYMBOLS + _SPACES)
+    text = _remove(text.upper(), CURRENCY_CODES)
+    if locale == 'auto':
+        text = _remove(text, LOCALES['ch'][1])
+        return _normalize_auto(np.array(text.split(_SEPARATOR)))
+
+    decimal, groups = LOCALES[locale]
+    text = _remove(text, groups)
+    if decimal != '.':
+        text = text.replace(decimal, '.')
+    return text.split(_SEPARATOR)
+
+
+def parse_prices(values, locale='en'):
+    """
+    整列解析价格
+    :param values: 价格列（pandas Series、numpy 数组或列表）
+    :param locale: 区域格式，见模块说明
+    :return: (float64 数组, 有效掩码)；缺失或无法解析的值为 NaN，掩码为 False
+    """
+    array = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+    if array.dtype.kind in 'iuf':
+        parsed = array.astype(np.float64).reshape(-1)
+    else:
+        normalized = normalize_prices(array, locale)
+        if '' in normalized:
+            normalized = [value or 'nan' for value in normalized]
+        try:
+            parsed = np.array(normalized, dtype=np.float64).reshape(-1)
+        except ValueError:
+            # 含无法解析的值时退回容错解析，无法解析的值为 NaN
+            parsed = pd.to_numeric(pd.Series(normalized, dtype=object), errors='coerce') \
+                .to_numpy(dtype=np.float64)
+    return parsed, np.isfinite(parsed)
+
+
+def is_missing(values):
+    """缺失值掩码：None、NaN、空字符串或只含空白"""
+    strings = _as_list(values)
+    if not strings:
+        return np.zeros(0, dtype=bool)
+    text = _remove(_SEPARATOR.join(strings), _SPACES[1:])
+    return np.array([not part.strip() for part in text.split(_SEPARATOR)], dtype=bool)
+
+
+def parse_price(value, locale='en'):
+    """
+    解析单个价格
+    :return: float，缺失或无法解析时为 None
+    """
+    parsed, valid = parse_prices([value], locale)
+    return float(parsed[0]) if valid[0] else None
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛情景生成
+为每款产品并行生成成千上万条相互独立的价格路径，只返回分位数价格带（如 P5/P50/P95），
+用于对购买建议逻辑做压力测试。
+
+随机数不使用全局 np.random.seed：每款产品的每个路径块都有自己的
+SeedSequence(seed, spawn_key=(产品序号, 块序号))，结果只取决于 seed 和分块大小，
+与进程数、任务调度顺序无关，可以安全地并行。
+
+任何时候都不会保存全部路径：每个路径块模拟完立即在子进程里归约成每天的
+固定分箱直方图、逐块求和、最小值和最大值，主进程只合并这些汇总。
+分箱范围取自 price_bounds 给出的每日理论最低/最高价，所以不需要先看数据。
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.data.simulation import price_bounds, simulate_price_matrix
+
+DEFAULT_QUANTILES = (5, 50, 95)
+
+# 每块模拟的路径数，决定中间矩阵大小，也是随机流的划分单位
+PATHS_PER_CHUNK = 2048
+
+# 每个进程任务包含的产品数，摊薄进程间通信开销
+PRODUCTS_PER_TASK = 8
+
+# 每天的直方图分箱数；分位数误差不超过 (当日最高价 - 最低价) / 分箱数
+QUANTILE_BINS = 8192
+
+
+def _chunk_generator(seed, product_index, chunk_index):
+    """每个 (产品, 路径块) 对应一个独立且可复现的随机数生成器"""
+    sequence = np.random.SeedSequence(seed, spawn_key=(product_index, chunk_index))
+    return np.random.Generator(np.random.PCG64(sequence))
+
+
+def _bin_edges(base_price, floor, ceiling, days, simulation_kwargs):
+    """每天分箱的起点和宽度；理论价格区间为 NaN 的日子（整条路径为 NaN）返回 NaN"""
+    lower, upper = price_bounds([base_price], days, floors=floor, ceilings=ceiling,
+                                **simulation_kwargs)
+    lower, upper = lower[0], upper[0]
+    # 放宽一点，吸收闭式解与逐日推进之间的舍入差异
+    pad = 1e-9 * np.maximum(np.abs(upper), 1.0)
+    lower = lower - pad
+    width = (upper + pad - lower) / QUANTILE_BINS
+    return lower, width
+
+
+def _reduce_chunks(product_index, base_price, floor, ceiling, first_chunk, last_chunk,
+                   settings):
+    """
+    逐块模拟一款产品第 first_chunk ~ last_chunk-1 块的路径，每块模拟完立即归约
+    :return: dict
+             'counts': (days, QUANTILE_BINS) 每天的直方图
+             'sums': (块数, days) 每块的逐日价格和（主进程按块顺序相加，结果与分块方式无关）
+             'min' / 'max': (days,) 每天的最低/最高价
+    """
+    days = settings['days']
+    n_paths = settings['n_paths']
+    chunk_paths = settings['chunk_paths']
+    lower, width = _bin_edges(base_price, floor, ceiling, days, settings['simulation_kwargs'])
+    valid = np.isfinite(lower) & np.isfinite(width)
+    offsets = np.arange(days)[valid] * QUANTILE_BINS
+
+    counts = np.zeros(days * QUANTILE_BINS, dtype=np.int64)
+    sums = np.empty((last_chunk - first_chunk, days))
+    minimum = np.full(days, np.inf)
+    maximum = np.full(days, -np.inf)
+    for k, chunk_index in enumerate(range(first_chunk, last_chunk)):
+        size = min(chunk_paths, n_paths - chunk_index * chunk_paths)
+        paths = simulate_price_matrix(
+            np.full(size, base_price),
+            days,
+            floors=floor,
+            ceilings=ceiling,
+            rng=_chunk_generator(settings['seed'], product_index, chunk_index),
+            **settings['simulation_kwargs']
+        )
+        sums[k] = paths.sum(axis=0)
+        minimum = np.fmin(minimum, paths.min(axis=0))
+        maximum = np.fmax(maximum, paths.max(axis=0))
+        if offsets.size:
+            scaled = (paths[:, valid] - lower[valid]) / np.where(width[valid] > 0, width[valid], 1.0)
+            bins = np.clip(scaled.astype(np.int64), 0, QUANTILE_BINS - 1)
+            counts += np.bincount((bins + offsets).reshape(-1), minlength=counts.size)
+    return {'counts': counts.reshape(days, QUANTILE_BINS), 'sums': sums,
+            'min': minimum, 'max': maximum, 'lower': lower, 'width': width}
+
+
+def _merge(parts):
+    """合并同一款产品按块顺序排列的若干部分汇总"""
+    merged = dict(parts[0])
+    for part in parts[1:]:
+        merged['counts'] = merged['counts'] + part['counts']
+        merged['min'] = np.fmin(merged['min'], part['min'])
+        merged['max'] = np.fmax(merged['max'], part['max'])
+    merged['sums'] = np.concatenate([part['sums'] for part in parts])
+    return merged
+
+
+def _order_statistic(summary, cumulative, k):
+    """第 k 小（从 0 开始）的价格：在所在分箱内按计数线性插值，再限制在实际最小/最大值之间"""
+    counts = summary['counts']
+    rows = np.arange(len(counts))
+    bins = (cumulative > k).argmax(axis=1)
+    in_bin = counts[rows, bins]
+    before = cumulative[rows, bins] - in_bin
+    with np.errstate(invalid='ignore', divide='ignore'):
+        position = bins + (k - before + 0.5) / in_bin
+    value = summary['lower'] + position * summary['width']
+    return np.clip(value, summary['min'], summary['max'])
+
+
+def _summarize(summary, n_paths, quantiles):
+    """
+    由直方图汇总出分位数和均值
+    分位数与 np.percentile（线性插值）的定义一致，误差不超过一个分箱宽度
+    """
+    cumulative = np.cumsum(summary['counts'], axis=1)
+    bands = np.empty((len(quantiles), len(cumulative)))
+    for j, q in enumerate(quantiles):
+        h = (n_paths - 1) * q / 100
+        k = int(np.floor(h))
+        low = _order_statistic(summary, cumulative, k)
+        high = _order_statistic(summary, cumulative, min(k + 1, n_paths - 1))
+        bands[j] = low + (high - low) * (h - k)
+    # 理论区间为 NaN 的日子路径也全是 NaN
+    invalid = ~(np.isfinite(summary['lower']) & np.isfinite(summary['width']))
+    bands[:, invalid] = np.nan
+    mean = summary['sums'].sum(axis=0) / n_paths
+    return bands, mean
+
+
+def _simulate_task(task):
+    """
+    进程池任务：模拟若干 (产品, 路径块范围)，只传回直方图等汇总
+    覆盖整款产品的任务直接在子进程里算出分位数；
+    一款产品被拆到多个任务时传回汇总，由主进程合并
+    """
+    settings = task['settings']
+    results = []
+    for i, base, floor, ceiling, first, last in task['parts']:
+        summary = _reduce_chunks(i, base, floor, ceiling, first, last, settings)
+        if first == 0 and last == settings['n_chunks']:
+            results.append((i, first, _summarize(summary, settings['n_paths'],
+                                                 settings['quantiles'])))
+        else:
+            results.append((i, first, summary))
+    return results
+
+
+def _as_array(values, n):
+    if values is None:
+        return np.full(n, np.nan)
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (n,)).copy()
+
+
+def generate_scenarios(base_prices, days, n_paths=10000, seed=42, quantiles=DEFAULT_QUANTILES,
+                       floors=None, ceilings=None, workers=None, chunk_paths=PATHS_PER_CHUNK,
+                       products_per_task=PRODUCTS_PER_TASK, **simulation_kwargs):
+    """
+    为每款产品生成 n_paths 条独立价格路径，返回分位数价格带
+    :param base_prices: 每款产品的起始价格（长度 N）
+    :param days: 模拟天数 D
+    :param n_paths: 每款产品的路径数
+    :param seed: 根种子，相同的 seed 和 chunk_paths 总是得到相同结果
+    :param quantiles: 百分位数，默认 (5, 50, 95)
+    :param floors: 价格下限（标量或长度 N 的数组，NaN 表示不设下限）
+    :param ceilings: 价格上限（标量或长度 N 的数组，NaN 表示不设上限）
+    :param workers: 进程数，None 为 CPU 核数，1 表示在当前进程中运行
+    :param chunk_paths: 每块路径数
+    :param products_per_task: 每个进程任务包含的产品数（产品未被拆分时）
+    :param simulation_kwargs: 传给 simulate_price_matrix 的其他参数
+           （start_date / drift / weekend_drift / promo_shocks / round_each_step）
+    :return: dict
+             'quantiles': 百分位数元组
+             'bands': (N, Q, D) 分位数价格
+             'mean': (N, D) 每日平均价格
+
+    内存占用与 n_paths 和产品数都无关：每个进程同时只保存一个 chunk_paths x D 的路径块
+    和 D x QUANTILE_BINS 的直方图，主进程只暂存被拆分、尚未凑齐的产品的直方图。
+    分位数由直方图插值得到，误差不超过当天理论价格区间的 1 / QUANTILE_BINS，
+    并且总在实际出现过的最低价和最高价之间。
+    """
+    base_prices = np.asarray(base_prices, dtype=np.float64).reshape(-1)
+    n = len(base_prices)
+    floors = _as_array(floors, n)
+    ceilings = _as_array(ceilings, n)
+    quantiles = tuple(quantiles)
+    if n_paths < 1:
+        raise ValueError("n_paths must be at least 1")
+
+    n_chunks = -(-n_paths // chunk_paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # 产品数足够时按产品分配任务；产品太少时把每款产品的路径块拆给多个进程
+    split = max(1, min(n_chunks, -(-workers // n))) if n else 1
+    bounds = np.linspace(0, n_chunks, split + 1).round().astype(int)
+    parts = []
+    for i in range(n):
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            if last > first:
+                parts.append((i, base_prices[i], floors[i], ceilings[i], int(first), int(last)))
+
+    settings = {
+        'n_paths': n_paths,
+        'n_chunks': n_chunks,
+        'days': days,
+        'seed': seed,
+        'quantiles': quantiles,
+        'chunk_paths': chunk_paths,
+        'simulation_kwargs': simulation_kwargs
+    }
+    per_task = products_per_task if split == 1 else 1
+    tasks = [{'parts': parts[k:k + per_task], 'settings': settings}
+             for k in range(0, len(parts), per_task)]
+
+    bands = np.empty((n, len(quantiles), days))
+    mean = np.empty((n, days))
+    pending = {}  # 被拆分的产品：{产品序号: {起始块: 汇总}}，凑齐后立即释放
+
+    def collect(batch):
+        for i, first, value in batch:
+            if isinstance(value, tuple):
+                bands[i], mean[i] = value
+                continue
+            pieces = pending.setdefault(i, {})
+            pieces[first] = value
+            if sum(len(p['sums']) for p in pieces.values()) == n_chunks:
+                summary = _merge([pieces[k] for k in sorted(pieces)])
+                bands[i], mean[i] = _summarize(summary, n_paths, quantiles)
+                del pending[i]
+
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            collect(_simulate_task(task))
+    else:
+        # 限制同时提交的任务数，避免已完成但未处理的结果堆积在主进程
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for task in tasks:
+                in_flight.append(executor.submit(_simulate_task, task))
+                if len(in_flight) >= 2 * workers:
+                    collect(in_flight.popleft().result())
+            while in_flight:
+                collect(in_flight.popleft().result())
+
+    return {'quantiles': quantiles, 'bands': bands, 'mean': mean}
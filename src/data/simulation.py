@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+向量化价格模拟引擎
+一次性为 N 款产品生成 D 天的价格矩阵，替代逐行 iterrows() + 逐日循环的写法
+"""
+from datetime import timedelta
+
+import numpy as np
+
+# 大促日价格冲击：(月, 日) -> 当日价格乘数
+PROMO_SHOCKS = {
+    (6, 18): 0.92,   # 618降价8%
+    (11, 11): 0.88,  # 双11降价12%
+}
+
+# 每批模拟的产品数量，控制中间矩阵的内存占用
+CHUNK_SIZE = 8192
+
+
+def _as_bounds(values, n):
+    """把标量/数组形式的上下限统一成长度为 n 的 float64 数组，NaN 表示不设限"""
+    if values is None:
+        return np.full(n, np.nan)
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (n,)).copy()
+
+
+def _factor_ranges(days, start_date, drift, weekend_drift, promo_shocks):
+    """
+    每天的涨跌幅区间和大促冲击
+    :return: (low, high, shock)，长度均为 days；shock 为 NaN 的日子按 [low, high] 随机波动
+    """
+    low = np.full(days, drift[0], dtype=np.float64)
+    high = np.full(days, drift[1], dtype=np.float64)
+    shock = np.full(days, np.nan)
+
+    if start_date is not None:
+        calendar = [start_date + timedelta(days=i) for i in range(days)]
+        if weekend_drift is not None:
+            weekend = np.array([d.weekday() >= 5 for d in calendar])
+            low[weekend] = weekend_drift[0]
+            high[weekend] = weekend_drift[1]
+        if promo_shocks:
+            for i, d in enumerate(calendar):
+                factor = promo_shocks.get((d.month, d.day))
+                if factor is not None:
+                    shock[i] = factor
+    return low, high, shock
+
+
+def _daily_factors(rng, n, days, start_date, drift, weekend_drift, promo_shocks):
+    """
+    生成 (n, days) 的每日价格乘数矩阵
+    随机数按"产品优先、日期其次"的顺序抽取，与旧脚本逐行逐日调用的随机序列一致；
+    大促日不消耗随机数。
+    """
+    low, high, shock = _factor_ranges(days, start_date, drift, weekend_drift, promo_shocks)
+    random_days = np.isnan(shock)
+    factors = np.empty((n, days))
+    factors[:, ~random_days] = shock[~random_days]
+    u = rng.random((n, int(random_days.sum())))
+    factors[:, random_days] = 1 + (low[random_days] + (high[random_days] - low[random_days]) * u)
+    return factors
+
+
+def simulate_price_matrix(base_prices, days, start_date=None, drift=(-0.02, 0.03),
+                          weekend_drift=None, floors=None, ceilings=None,
+                          promo_shocks=None, round_each_step=False, rng=None,
+                          chunk_size=CHUNK_SIZE):
+    """
+    向量化生成价格路径矩阵
+    :param base_prices: 每款产品的起始价格（长度 N）
+    :param days: 模拟天数 D
+    :param start_date: 第一天的日期，使用周末波动或大促冲击时必须提供
+    :param drift: 工作日涨跌幅区间 (low, high)，如 (-0.02, 0.03)
+    :param weekend_drift: 周末涨跌幅区间，None 表示与工作日相同
+    :param floors: 价格下限（标量或长度 N 的数组，NaN 表示不设下限）
+    :param ceilings: 价格上限（标量或长度 N 的数组，NaN 表示不设上限）
+    :param promo_shocks: 大促冲击 {(月, 日): 乘数}，如 PROMO_SHOCKS
+    :param round_each_step: 是否每天先四舍五入到分再做下限校验（旧 convert_to_json 的行为）
+    :param rng: np.random.Generator / RandomState，None 使用 np.random 全局状态
+    :param chunk_size: 每批处理的产品数
+    :return: (N, D) 的 float64 价格矩阵（未四舍五入，除非 round_each_step）
+
+    起始价格为 NaN 的产品与旧脚本中 max(下限, nan) 的行为一致：从下限价格开始；
+    没有下限时整条路径为 NaN。
+    """
+    base_prices = np.asarray(base_prices, dtype=np.float64).reshape(-1)
+    n = len(base_prices)
+    if rng is None:
+        rng = np.random
+    if (weekend_drift is not None or promo_shocks) and start_date is None:
+        raise ValueError("start_date is required for weekend_drift or promo_shocks")
+
+    floors = _as_bounds(floors, n)
+    ceilings = _as_bounds(ceilings, n)
+    stepwise = round_each_step or np.isfinite(ceilings).any()
+
+    paths = np.empty((n, days))
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        factors = _daily_factors(rng, stop - start, days, start_date, drift,
+                                 weekend_drift, promo_shocks)
+        base = base_prices[start:stop]
+        floor = floors[start:stop]
+
+        if not stepwise:
+            # 只有下限时有闭式解：y_t = C_t * max(y_0, max_{s<=t} floor / C_s)
+            # 其中 C_t 为累计乘数，一次 cumprod + fmax.accumulate 即可完成（fmax 忽略 NaN 下限）
+            cumulative = np.cumprod(factors, axis=1)
+            running = np.fmax.accumulate(floor[:, None] / cumulative, axis=1)
+            paths[start:stop] = cumulative * np.fmax(base[:, None], running)
+            continue
+
+        # 需要双边截断或逐日取整时，按天推进，但每一步都对整批产品向量化
+        # （fmax/fmin 忽略 NaN 边界，并让 NaN 价格落到下限，与 Python 的 max(下限, nan) 一致）
+        ceiling = ceilings[start:stop]
+        current = base.copy()
+        for day in range(days):
+            current = current * factors[:, day]
+            if round_each_step:
+                current = np.round(current, 2)
+            current = np.fmin(np.fmax(current, floor), ceiling)
+            paths[start:stop, day] = current
+
+    return paths
+
+
+def price_bounds(base_prices, days, start_date=None, drift=(-0.02, 0.03), weekend_drift=None,
+                 floors=None, ceilings=None, promo_shocks=None, round_each_step=False):
+    """
+    simulate_price_matrix 在相同参数下每天可能出现的最低价和最高价
+    每天都取涨跌幅区间的端点，按与模拟相同的步骤（乘数、取整、上下限截断）推进；
+    这些步骤都是单调的，所以任何一条模拟路径都落在区间内。
+    :return: (lower, upper)，均为 (N, D) 的 float64 矩阵
+    """
+    base_prices = np.asarray(base_prices, dtype=np.float64).reshape(-1)
+    n = len(base_prices)
+    if (weekend_drift is not None or promo_shocks) and start_date is None:
+        raise ValueError("start_date is required for weekend_drift or promo_shocks")
+    low, high, shock = _factor_ranges(days, start_date, drift, weekend_drift, promo_shocks)
+    random_days = np.isnan(shock)
+    lowest = np.where(random_days, 1 + low, shock)
+    highest = np.where(random_days, 1 + high, shock)
+
+    floors = _as_bounds(floors, n)
+    ceilings = _as_bounds(ceilings, n)
+    lower = np.empty((n, days))
+    upper = np.empty((n, days))
+    lo = base_prices.copy()
+    hi = base_prices.copy()
+    for day in range(days):
+        lo = lo * lowest[day]
+        hi = hi * highest[day]
+        if round_each_step:
+            lo = np.round(lo, 2)
+            hi = np.round(hi, 2)
+        lo = np.fmin(np.fmax(lo, floors), ceilings)
+        hi = np.fmin(np.fmax(hi, floors), ceilings)
+        lower[:, day] = lo
+        upper[:, day] = hi
+    return lower, upper
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.ai_engine import EWMA_ALPHA, SMA_WINDOW, BaseAIEngine, IncrementalTrendAnalyzer
+
+
+def _prices(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (1000 * np.exp(np.cumsum(rng.normal(0, 0.03, n)))).tolist()
+
+
+@pytest.mark.parametrize('window_size', [1, 2, SMA_WINDOW, 12])
+def test_incremental_sma_and_ewma_match_pandas(window_size):
+    prices = _prices(500)
+    series = pd.Series(prices)
+    sma = series.rolling(window_size, min_periods=1).mean()
+    ewma = series.ewm(alpha=EWMA_ALPHA, adjust=False).mean()
+
+    analyzer = IncrementalTrendAnalyzer(window_size)
+    for i, price in enumerate(prices):
+        analyzer.update(price)
+        assert analyzer.moving_average == pytest.approx(sma[i], rel=1e-12)
+        assert analyzer.ewma == pytest.approx(ewma[i], rel=1e-12)
+    analysis = analyzer.analyze()
+    assert analysis['ewma'] == pytest.approx(ewma.iloc[-1], rel=1e-12)
+    assert analysis['moving_average'] == pytest.approx(sma.iloc[-1], rel=1e-12)
+
+
+def test_incremental_matches_full_and_batch_analysis():
+    engine = BaseAIEngine()
+    series = [_prices(n, seed=n) for n in (1, 2, 3, 17, 60)]
+    batch = engine.analyze_price_trend_batch(
+        np.concatenate(series), np.concatenate(([0], np.cumsum([len(s) for s in series]))))
+    for i, prices in enumerate(series):
+        analyzer = engine.create_trend_analyzer()
+        for price in prices:
+            analyzer.update(price)
+        incremental = analyzer.analyze()
+        full = engine.analyze_price_trend(prices)
+        assert incremental.keys() == full.keys()
+        if len(prices) < 2:
+            assert not batch['sufficient'][i] and np.isnan(batch['ewma'][i])
+            continue
+        for key in ('moving_average', 'ewma', 'last_price', 'confidence'):
+            assert incremental[key] == pytest.approx(full[key], rel=1e-12)
+            assert batch[key][i] == pytest.approx(full[key], rel=1e-12)
+        assert incremental['trend'] == full['trend'] == batch['trend'][i]
+
+
+def test_state_round_trip():
+    prices = _prices(40, seed=5)
+    analyzer = IncrementalTrendAnalyzer()
+    for price in prices[:23]:
+        analyzer.update(price, timestamp='t')
+    restored = IncrementalTrendAnalyzer.from_dict(json.loads(json.dumps(analyzer.to_dict())))
+    assert restored.analyze() == analyzer.analyze()
+    for price in prices[23:]:
+        analyzer.update(price)
+        restored.update(price)
+        assert restored.analyze() == analyzer.analyze()
@@ -0,0 +1,118 @@
+from src.core.ai_engine import BaseAIEngine
+from src.core.alerts import AlertRuleEngine
+from src.core.multi_workflow import MultiProductWorkflow
+from src.core.workflow import PriceMonitorWorkflow
+
+HOUR = 3600
+
+
+def _ts(hours):
+    return f'2026-03-{1 + hours // 24:02d}T{hours % 24:02d}:00:00'
+
+
+def _kinds(alerts):
+    return sorted((a['kind'], a['threshold']) for a in alerts)
+
+
+def test_threshold_rules_fire_on_crossing_only():
+    engine = AlertRuleEngine(cooldown=0)
+    engine.add_rule('GPU', 'below', 900)
+    engine.add_rule('GPU', 'above', 1100)
+    assert engine.evaluate('GPU', 1000, _ts(0)) == []
+    assert _kinds(engine.evaluate('GPU', 890, _ts(1))) == [('below', 900.0)]
+    # Staying below does not re-fire
+    assert engine.evaluate('GPU', 880, _ts(2)) == []
+    assert _kinds(engine.evaluate('GPU', 1150, _ts(3))) == [('above', 1100.0)]
+    assert _kinds(engine.evaluate('GPU', 850, _ts(4))) == [('below', 900.0)]
+
+
+def test_matches_brute_force_over_many_rules():
+    engine = AlertRuleEngine(cooldown=0)
+    thresholds = [800 + 5 * i for i in range(80)]
+    for i, threshold in enumerate(thresholds):
+        engine.add_rule('GPU', 'below', threshold, owner=f'user{i}')
+    prices = [1300, 1000, 950, 1020, 810, 870, 790]
+    previous = None
+    for hour, price in enumerate(prices):
+        fired = {a['threshold'] for a in engine.evaluate('GPU', price, _ts(hour))}
+        expected = {float(t) for t in thresholds
+                    if price <= t and (previous is None or t < previous)}
+        assert fired == expected
+        previous = price
+
+
+def test_dedupe_keeps_most_extreme_and_cooldown_covers_group():
+    engine = AlertRuleEngine(cooldown=2 * HOUR)
+    engine.add_rule('GPU', 'below', 900, owner='a')
+    engine.add_rule('GPU', 'below', 950, owner='a')
+    alerts = engine.evaluate('GPU', 880, _ts(0))
+    assert _kinds(alerts) == [('below', 900.0)]
+    engine.evaluate('GPU', 1000, _ts(1))
+    # Crossing again inside the cooldown is suppressed for the whole group
+    assert engine.evaluate('GPU', 940, _ts(1)) == []
+    engine.evaluate('GPU', 1000, _ts(2))
+    assert _kinds(engine.evaluate('GPU', 940, _ts(3))) == [('below', 950.0)]
+    assert engine.stats()['suppressed'] >= 2
+
+
+def test_drop_rule_uses_trailing_average():
+    engine = AlertRuleEngine(cooldown=0)
+    engine.add_rule('GPU', 'drop', 10, days=3)
+    for hour in (0, 24, 48):
+        assert engine.evaluate('GPU', 1000, _ts(hour)) == []
+    alerts = engine.evaluate('GPU', 880, _ts(72))
+    assert _kinds(alerts) == [('drop', 10.0)]
+    assert '3-day average' in alerts[0]['message']
+
+
+def test_remove_and_reload_rules(tmp_path):
+    engine = AlertRuleEngine()
+    keep = engine.add_rule('GPU', 'below', 900, owner='a')
+    gone = engine.add_rule('GPU', 'above', 1100)
+    engine.remove_rule(gone)
+    path = tmp_path / 'rules.json'
+    engine.save_rules(path)
+
+    loaded = AlertRuleEngine()
+    assert loaded.load_rules(path) == 1
+    assert loaded.rules[keep].to_dict() == engine.rules[keep].to_dict()
+    assert loaded.evaluate('GPU', 1200, _ts(0)) == []
+
+
+def _spike_history(feed):
+    for hour, price in enumerate([100.0, 101.0, 99.0, 100.5, 99.5, 100.0, 100.2, 99.8]):
+        assert feed(price, hour) == []
+    return feed(160.0, 8)
+
+
+def test_anomaly_rule_fires_in_single_product_workflow(tmp_path):
+    workflow = PriceMonitorWorkflow(tmp_path)
+    workflow.set_ai_engine(BaseAIEngine())
+    engine = AlertRuleEngine(cooldown=0)
+    engine.add_rule(workflow.alert_key, 'anomaly')
+    workflow.set_alert_engine(engine)
+
+    def feed(price, hour):
+        workflow.update_price_history(price, _ts(hour))
+        return workflow.last_alerts
+
+    assert [a['kind'] for a in _spike_history(feed)] == ['anomaly']
+
+
+def test_anomaly_rule_fires_in_multi_product_workflow(tmp_path):
+    catalogue = tmp_path / 'catalogue.csv'
+    catalogue.write_text('Product,Price,Historical_Low\nA,100,90\nB,200,180\n', encoding='utf-8')
+    workflow = MultiProductWorkflow(tmp_path, catalogue_file=catalogue)
+    workflow.set_ai_engine(BaseAIEngine())
+    engine = AlertRuleEngine(cooldown=0)
+    engine.add_rule('A', 'anomaly')
+    workflow.set_alert_engine(engine)
+
+    def feed(price, hour):
+        workflow.update_price_histories({'A': price, 'B': 200.0}, _ts(hour))
+        return workflow.last_alerts
+
+    alerts = _spike_history(feed)
+    assert [(a['product'], a['kind']) for a in alerts] == [('A', 'anomaly')]
+    # Only watched products get a detector
+    assert list(workflow.anomaly_detectors) == ['A']
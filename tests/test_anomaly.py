@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.core.anomaly import IndexableSkiplist, StreamingAnomalyDetector
+
+
+def _series(n, seed=0):
+    rng = random.Random(seed)
+    prices = [round(1000 + rng.gauss(0, 15), 2) for _ in range(n)]
+    for i in range(25, n, 40):
+        prices[i] *= 1.3  # spikes
+    return prices
+
+
+def _brute_force_score(window, price, method):
+    values = np.asarray(window)
+    if method == 'zscore':
+        std = values.std()
+        return None if std == 0 else abs(price - values.mean()) / std
+    median = np.median(values)
+    mad = np.median(np.abs(values - median))
+    return None if mad == 0 else 0.6745 * abs(price - median) / mad
+
+
+def test_skiplist_matches_sorted_list():
+    rng = random.Random(1)
+    skiplist = IndexableSkiplist(64)
+    reference = []
+    for _ in range(2000):
+        if reference and rng.random() < 0.4:
+            value = rng.choice(reference)
+            reference.remove(value)
+            skiplist.remove(value)
+        else:
+            value = rng.randint(0, 50)  # plenty of duplicates
+            reference.append(value)
+            skiplist.insert(value)
+        reference.sort()
+        assert len(skiplist) == len(reference)
+    assert [skiplist[i] for i in range(len(skiplist))] == reference
+    for value in range(-1, 52):
+        assert skiplist.rank(value) == sum(1 for v in reference if v < value)
+    assert skiplist[-1] == reference[-1]
+    with pytest.raises(IndexError):
+        skiplist[len(reference)]
+    with pytest.raises(KeyError):
+        skiplist.remove(1000)
+
+
+@pytest.mark.parametrize('method', StreamingAnomalyDetector.METHODS)
+@pytest.mark.parametrize('window', [5, 20])
+def test_scores_match_brute_force(method, window):
+    prices = _series(300)
+    detector = StreamingAnomalyDetector(window=window, method=method)
+    for i, price in enumerate(prices):
+        flagged = detector.update(price)
+        previous = prices[max(0, i - window):i]
+        expected = (_brute_force_score(previous, price, method)
+                    if len(previous) >= detector.min_points else None)
+        if expected is None:
+            assert detector.last_score is None
+        else:
+            assert detector.last_score == pytest.approx(expected, rel=1e-9)
+            assert flagged == (expected > detector.threshold)
+        assert len(detector) == min(i + 1, window)
+
+
+@pytest.mark.parametrize('method', StreamingAnomalyDetector.METHODS)
+def test_spikes_are_flagged_and_forgotten(method):
+    detector = StreamingAnomalyDetector(window=10, method=method)
+    prices = [1000 + (i % 3) for i in range(30)]
+    for price in prices:
+        assert not detector.update(price)
+    assert detector.update(1300)
+    # Once the spike slides out of the window it no longer widens the spread
+    for price in prices[:10]:
+        detector.update(price)
+    assert detector.update(1300)
+
+
+@pytest.mark.parametrize('method', StreamingAnomalyDetector.METHODS)
+def test_state_round_trip(method):
+    prices = _series(120, seed=3)
+    detector = StreamingAnomalyDetector(window=15, method=method)
+    for i, price in enumerate(prices[:80]):
+        detector.update(price, timestamp=f't{i}')
+    restored = StreamingAnomalyDetector.from_dict(detector.to_dict())
+    assert restored.last_timestamp == 't79'
+    assert restored.count == detector.count
+    for price in prices[80:]:
+        assert restored.update(price) == detector.update(price)
+        assert restored.last_score == pytest.approx(detector.last_score)
+
+
+def test_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        StreamingAnomalyDetector(method='iqr')
+    with pytest.raises(ValueError):
+        StreamingAnomalyDetector(window=1)
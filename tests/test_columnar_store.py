@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from src.core.columnar_store import MemmapColumnStore, MemmapHistoryStore
+from src.core.ring_buffer import from_epoch_us
+
+HOUR_US = 3600 * 1_000_000
+
+
+def _fill(store, product, start, n):
+    timestamps = np.arange(start, start + n, dtype=np.int64) * HOUR_US
+    store.append(timestamps, 100.0 + np.arange(start, start + n), product, flush=False)
+
+
+def test_append_past_capacity_moves_extents(tmp_path):
+    store = MemmapColumnStore(tmp_path, initial_capacity=4)
+    _fill(store, 'A', 0, 3)
+    _fill(store, 'B', 0, 2)
+    assert store.extents['A'] == [0, 4, 3]
+    assert store.extents['B'] == [4, 4, 2]
+    # A no longer fits and moves behind B with double the capacity
+    _fill(store, 'A', 3, 3)
+    assert store.extents['A'] == [8, 8, 6]
+    assert store.wasted_slots() == 4
+    # Growth keeps doubling until the batch fits
+    _fill(store, 'B', 2, 20)
+    assert store.extents['B'] == [16, 32, 22]
+    store.flush()
+
+    np.testing.assert_array_equal(store.series('A')[1], 100.0 + np.arange(6))
+    np.testing.assert_array_equal(store.series('B')[0], np.arange(22) * HOUR_US)
+    assert len(store) == 28
+    assert store.count('missing') == 0
+
+
+def test_reopen_and_range_views(tmp_path):
+    store = MemmapColumnStore(tmp_path, initial_capacity=8)
+    _fill(store, 'A', 0, 30)
+    store.close()
+
+    store = MemmapColumnStore(tmp_path)
+    assert store.products == ['A']
+    timestamps, prices = store.range('A', from_epoch_us(10 * HOUR_US), 20 * HOUR_US)
+    np.testing.assert_array_equal(timestamps, np.arange(10, 20) * HOUR_US)
+    assert isinstance(prices, np.memmap)
+    assert np.shares_memory(prices, store._prices)
+    assert np.shares_memory(timestamps, store._timestamps)
+    assert len(store.range('A', start=25 * HOUR_US)[0]) == 5
+    np.testing.assert_array_equal(store.tail('A', 3)[1], [127.0, 128.0, 129.0])
+
+
+def test_rejects_timestamps_going_backwards(tmp_path):
+    store = MemmapColumnStore(tmp_path)
+    _fill(store, 'A', 5, 3)
+    with pytest.raises(ValueError):
+        store.append([4 * HOUR_US], [1.0], 'A')
+    with pytest.raises(ValueError):
+        store.append([9 * HOUR_US, 8 * HOUR_US], [1.0, 2.0], 'A')
+    with pytest.raises(ValueError):
+        store.append([9 * HOUR_US], [1.0, 2.0], 'A')
+    # Equal timestamps and other products are fine
+    store.append([7 * HOUR_US], [1.0], 'A')
+    store.append([0], [1.0], 'B')
+    assert store.count('A') == 4
+
+
+def test_truncate_front_then_compact(tmp_path):
+    store = MemmapColumnStore(tmp_path, initial_capacity=16)
+    _fill(store, 'A', 0, 10)
+    _fill(store, 'B', 0, 4)
+    store.truncate_front('A', 3)
+    assert store.extents['A'] == [7, 9, 3]
+    np.testing.assert_array_equal(store.series('A')[1], [107.0, 108.0, 109.0])
+    # Still room for the remaining capacity without moving
+    _fill(store, 'A', 10, 6)
+    assert store.extents['A'] == [7, 9, 9]
+    assert store.wasted_slots() == 7
+
+    store.compact(slack=0)
+    assert store.extents == {'A': [0, 9, 9], 'B': [9, 4, 4]}
+    assert store.slots == 13 and store.wasted_slots() == 0
+    np.testing.assert_array_equal(store.series('A')[1], 100.0 + np.arange(7, 16))
+    np.testing.assert_array_equal(store.series('B')[1], 100.0 + np.arange(4))
+    store.close()
+
+    store = MemmapColumnStore(tmp_path)
+    np.testing.assert_array_equal(store.series('A')[0], np.arange(7, 16) * HOUR_US)
+    _fill(store, 'B', 4, 2)
+    assert store.count('B') == 6
+
+
+def test_compact_empty_store(tmp_path):
+    store = MemmapColumnStore(tmp_path)
+    store.compact()
+    assert store.slots == 0
+    assert (tmp_path / 'timestamps.i8').stat().st_size == 0
+    _fill(store, 'A', 0, 2)
+    assert store.count('A') == 2
+
+
+def test_read_only_store(tmp_path):
+    store = MemmapColumnStore(tmp_path)
+    _fill(store, 'A', 0, 5)
+    store.close()
+
+    readonly = MemmapColumnStore(tmp_path, readonly=True)
+    np.testing.assert_array_equal(readonly.series('A')[1], 100.0 + np.arange(5))
+    with pytest.raises(ValueError):
+        readonly.append([10 * HOUR_US], [1.0], 'A')
+    with pytest.raises(ValueError):
+        readonly.compact()
+    with pytest.raises(ValueError):
+        readonly.series('A')[1][0] = 0.0
+    readonly.close()
+
+
+def test_history_store_adapter(tmp_path):
+    history = MemmapHistoryStore(tmp_path, retention=3, initial_capacity=2)
+    records = [{'timestamp': from_epoch_us(i * HOUR_US), 'price': 100.0 + i} for i in range(6)]
+    tagged = [dict(r, product='B') for r in records[:2]]
+    history.append(records[:4])
+    history.append(records[4:] + tagged)
+    history.close()
+
+    history = MemmapHistoryStore(tmp_path, retention=3)
+    loaded = history.load()
+    assert loaded == sorted(records[-3:] + tagged, key=lambda r: r['timestamp'])
+    # Older points stay on disk
+    assert history.columns.count('default') == 6
+
+    history.rewrite(records[:2])
+    assert history.load() == records[:2]
+    assert history.columns.count('B') == 0
+    assert history.columns.wasted_slots() == 0
+    history.close()
+    assert MemmapHistoryStore(tmp_path).load() == records[:2]
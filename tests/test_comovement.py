@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from src.core.comovement import CoMovementIndex
+
+
+def _prices(days=90, products=6, seed=1):
+    rng = np.random.default_rng(seed)
+    common = rng.normal(0, 0.02, size=(days, 1))
+    returns = rng.normal(0, 0.01, size=(days, products))
+    returns[:, :3] += common
+    return 100 * np.exp(np.cumsum(returns, axis=0))
+
+
+def _expected_corr(prices, window):
+    returns = np.diff(np.log(prices), axis=0)[-window:]
+    return pd.DataFrame(returns).corr().to_numpy()
+
+
+def test_dense_and_blocked_correlations_match_pandas():
+    prices = _prices()
+    names = [f'p{i}' for i in range(prices.shape[1])]
+    dense = CoMovementIndex(window=30, k=3)
+    blocked = CoMovementIndex(window=30, k=3, block_size=2, dense_limit=0)
+    dense.extend(prices, names)
+    blocked.extend(prices, names)
+    expected = _expected_corr(prices, 30)
+    np.testing.assert_allclose(dense.correlation_matrix(), expected, atol=1e-9)
+    np.testing.assert_allclose(blocked.correlation_matrix(), expected, atol=1e-9)
+    assert abs(dense.correlation('p0', 'p1') - expected[0, 1]) < 1e-9
+
+
+def test_neighbours_are_ready_after_update():
+    prices = _prices()
+    names = [f'p{i}' for i in range(prices.shape[1])]
+    index = CoMovementIndex(window=30, k=2)
+    index.extend(prices[:-1], names)
+    index.update(dict(zip(names, prices[-1])))
+    # The daily update rebuilt the lists; similar() must not recompute them
+    assert index._neighbors is not None
+    neighbours = index.similar('p0')
+    expected = _expected_corr(prices, 30)[0]
+    assert {name for name, _ in neighbours} == {'p1', 'p2'}
+    for name, corr in neighbours:
+        assert abs(corr - expected[int(name[1:])]) < 1e-5
+
+
+def test_dense_matrix_dropped_above_limit():
+    index = CoMovementIndex(dense_limit=2)
+    index.add_products(['a', 'b'])
+    assert index._cross is not None
+    index.add_products(['c'])
+    assert index._cross is None
+    assert CoMovementIndex(dense_limit=0)._cross is None
+
+
+def test_flat_products_have_no_correlation():
+    index = CoMovementIndex(window=10)
+    for day in range(12):
+        index.update({'moving': 100 + (day % 3), 'flat': 50.0})
+    assert index.correlation('moving', 'flat') is None
+    assert index.similar('moving') == []
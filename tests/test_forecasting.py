@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.core.forecasting import ForecastingAIEngine, ForecastingTrendAnalyzer, HoltWintersState
+
+
+def _scalar_holt_winters(prices, alpha, beta, gamma, m, horizons):
+    """Reference error-correction Holt/Holt-Winters, one price at a time."""
+    level = trend = 0.0
+    season = [0.0] * m
+    for t, y in enumerate(prices):
+        if t == 0:
+            level = y
+        elif t == 1:
+            trend = y - level
+            level = y
+        else:
+            error = y - (level + trend + season[t % m])
+            level = level + trend + alpha * error
+            trend = trend + beta * error
+            season[t % m] += gamma * error
+    n = len(prices)
+    return [level + h * trend + season[(n + h - 1) % m] for h in horizons]
+
+
+def _series(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    weekly = np.array([0, 3, -2, 5, -4, 8, -6], dtype=np.float64)
+    return [1000 - 1.5 * np.arange(n) + weekly[np.arange(n) % 7] + rng.normal(0, 2, n)
+            for n in lengths]
+
+
+@pytest.mark.parametrize('season_length', [None, 7])
+def test_vectorized_update_matches_scalar_recurrence(season_length):
+    lengths = [2, 5, 30, 45]
+    series = _series(lengths)
+    state = HoltWintersState(len(series), alpha=0.4, beta=0.1, gamma=0.2,
+                             season_length=season_length)
+    state.extend(np.concatenate(series), np.concatenate(([0], np.cumsum(lengths))))
+    horizons = (1, 7, 30)
+    result = state.forecast(horizons)
+
+    m = season_length or 1
+    gamma = 0.2 if season_length else 0.0
+    expected = [_scalar_holt_winters(s, 0.4, 0.1, gamma, m, horizons) for s in series]
+    np.testing.assert_allclose(result['forecast'], expected, rtol=1e-12)
+    np.testing.assert_array_equal(state.count, lengths)
+    # Two prices give a forecast but no error estimate yet
+    assert np.isnan(result['sigma'][0]) and np.isfinite(result['sigma'][1:]).all()
+    assert (result['lower'][1:] <= result['forecast'][1:]).all()
+    assert (result['upper'][1:] >= result['forecast'][1:]).all()
+
+
+def test_incremental_updates_match_refit():
+    series = _series([40, 40, 40], seed=1)
+    engine = ForecastingAIEngine(season_length=7)
+    state = engine.create_forecast_state(3)
+    for step in range(40):
+        # NaN prices leave a series untouched
+        prices = [s[step] for s in series] + [np.nan]
+        state.update(prices, [0, 1, 2, 0])
+    batch = engine.analyze_price_trend_batch(np.vstack(series), state=state)
+    refit = engine.analyze_price_trend_batch(np.vstack(series))
+    np.testing.assert_allclose(batch['forecast'], refit['forecast'], rtol=1e-12)
+    np.testing.assert_allclose(batch['forecast_upper'], refit['forecast_upper'], rtol=1e-12)
+
+
+def test_trend_analyzer_matches_engine():
+    prices = _series([25], seed=2)[0].tolist()
+    engine = ForecastingAIEngine(horizons=(3, 10))
+    analyzer = engine.create_trend_analyzer()
+    for price in prices:
+        analyzer.update(price)
+    analysis = analyzer.analyze()
+    expected = engine.analyze_price_trend(prices)
+    for key in ('forecast_horizons', 'forecast', 'forecast_lower', 'forecast_upper'):
+        assert analysis[key] == pytest.approx(expected[key], rel=1e-12)
+
+
+def test_state_round_trip_gives_identical_forecasts():
+    series = _series([20, 33], seed=3)
+    state = HoltWintersState(2, season_length=7)
+    state.extend(np.concatenate(series), [0, 20, 53])
+    restored = HoltWintersState.from_dict(json.loads(json.dumps(state.to_dict())))
+    for extra in ([990.0, 985.0], [980.0, 999.0]):
+        state.update(extra)
+        restored.update(extra)
+        for key in ('forecast', 'lower', 'upper', 'sigma'):
+            np.testing.assert_array_equal(restored.forecast()[key], state.forecast()[key])
+
+
+def test_analyzer_round_trip_gives_identical_forecasts():
+    prices = _series([30], seed=4)[0].tolist()
+    analyzer = ForecastingTrendAnalyzer(horizons=(1, 7), season_length=7)
+    for price in prices[:20]:
+        analyzer.update(price)
+    restored = ForecastingTrendAnalyzer.from_dict(json.loads(json.dumps(analyzer.to_dict())))
+    assert restored.analyze() == analyzer.analyze()
+    for price in prices[20:]:
+        analyzer.update(price)
+        restored.update(price)
+    assert restored.analyze() == analyzer.analyze()
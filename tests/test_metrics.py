@@ -0,0 +1,47 @@
+from src.core.ai_engine import BaseAIEngine
+from src.core.fetching import AsyncPriceFetcher, PriceFetchError, PriceSource
+from src.core.metrics import WorkflowMetrics
+from src.core.multi_workflow import MultiProductWorkflow
+
+
+class HalfSource(PriceSource):
+    name = 'half'
+
+    async def fetch_price(self, product):
+        if product == 'B':
+            raise PriceFetchError(product)
+        return 101.0
+
+
+def _histogram(metrics, name, **labels):
+    return metrics.histograms[(name, tuple(sorted(labels.items())))]
+
+
+def test_multi_workflow_records_stage_spans_and_saves(tmp_path):
+    catalogue = tmp_path / 'catalogue.csv'
+    catalogue.write_text('Product,Price,Historical_Low\nA,100,90\nB,200,180\n', encoding='utf-8')
+    metrics = WorkflowMetrics()
+    workflow = MultiProductWorkflow(tmp_path, catalogue_file=catalogue, metrics=metrics)
+    workflow.set_ai_engine(BaseAIEngine())
+    workflow.run_full_workflow()
+    workflow.run_full_workflow()
+
+    for stage in ('cycle', 'fetch', 'update_history', 'analyze', 'report'):
+        assert _histogram(metrics, 'workflow_stage_seconds', stage=stage).count == 2
+    assert metrics.counters[('history_records_appended_total', ())] == 4
+    assert metrics.gauges[('products', ())] == 2
+    assert _histogram(metrics, 'history_save_seconds').count == 2
+
+
+def test_fetcher_records_request_latency_and_failures():
+    metrics = WorkflowMetrics()
+    fetcher = AsyncPriceFetcher(HalfSource(), timeout=1.0, retries=1, backoff=0.0,
+                                metrics=metrics)
+    try:
+        assert fetcher.fetch_prices(['A', 'B']) == {'A': 101.0}
+    finally:
+        fetcher.close()
+    assert _histogram(metrics, 'price_fetch_seconds', source='half', result='ok').count == 1
+    # One attempt plus one retry for the failing product
+    assert _histogram(metrics, 'price_fetch_seconds', source='half', result='error').count == 2
+    assert metrics.counters[('price_fetch_failures_total', (('source', 'half'),))] == 1
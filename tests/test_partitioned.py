@@ -0,0 +1,92 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.data import data_generator
+from src.data.partitioned import PartitionedPriceStore, date_range
+
+
+def _prices(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.round(1000 + np.cumsum(rng.normal(0, 5, size=(n, 2)), axis=0), 2)
+
+
+def test_append_round_trips_across_months(tmp_path):
+    store = PartitionedPriceStore(tmp_path, columns=('a', 'b'))
+    dates = date_range('2026-01-20', '2026-03-10')
+    values = _prices(len(dates))
+    store.append(dates[:15], values[:15])
+    store.append(dates[15:], values[15:])
+
+    reopened = PartitionedPriceStore(tmp_path)
+    assert reopened.months() == ['2026-01', '2026-02', '2026-03']
+    assert len(reopened) == len(dates)
+    assert reopened.last_date == date(2026, 3, 10)
+    assert reopened.last_values == values[-1].tolist()
+    df = reopened.read_range()
+    assert df['date'].tolist() == [d.isoformat() for d in dates]
+    np.testing.assert_allclose(df[['a', 'b']].to_numpy(), values)
+
+    # Range reads only touch overlapping partitions and clip at the edges
+    assert reopened.months('2026-02-05', '2026-02-20') == ['2026-02']
+    part = reopened.read_range('2026-01-30', '2026-02-02')
+    assert part['date'].tolist() == ['2026-01-30', '2026-01-31', '2026-02-01', '2026-02-02']
+
+
+def test_partition_files_are_append_only(tmp_path):
+    store = PartitionedPriceStore(tmp_path, columns=('price',))
+    store.append(['2026-05-01', '2026-05-02'], [100.00, 101.25])
+    path = tmp_path / '2026-05.csv'
+    before = path.read_text(encoding='utf-8')
+    store.append(['2026-05-03'], [100.75])
+    after = path.read_text(encoding='utf-8')
+    assert after.startswith(before)
+    assert after[len(before):] == '03,-50\n'
+
+
+def test_rejects_dates_that_do_not_advance(tmp_path):
+    store = PartitionedPriceStore(tmp_path, columns=('price',))
+    store.append(['2026-05-01'], [100.0])
+    for dates in (['2026-05-01'], ['2026-05-03', '2026-05-02']):
+        try:
+            store.append(dates, [100.0] * len(dates))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"append accepted {dates}")
+    assert len(store) == 1
+
+
+def test_interrupted_append_is_truncated(tmp_path):
+    store = PartitionedPriceStore(tmp_path, columns=('price',))
+    store.append(['2026-05-01', '2026-05-02'], [100.0, 101.0])
+    # A line written without a manifest update, as after a crash
+    with open(tmp_path / '2026-05.csv', 'a', encoding='utf-8') as f:
+        f.write('03,999\n')
+    store = PartitionedPriceStore(tmp_path)
+    assert store.read_range()['price'].tolist() == [100.0, 101.0]
+    store.append(['2026-05-03'], [102.0])
+    assert store.read_range()['price'].tolist() == [100.0, 101.0, 102.0]
+
+
+def test_extend_history_is_incremental(tmp_path):
+    legacy = tmp_path / 'legacy.csv'
+    pd.DataFrame({'date': ['2026-06-01', '2026-06-02'],
+                  'rtx4080_price': [1000.0, 1005.5]}).to_csv(legacy, index=False)
+
+    daily = tmp_path / 'daily'
+    for day in date_range('2026-06-02', '2026-06-12'):
+        data_generator.extend_history(str(daily), today=day, legacy_path=str(legacy))
+    once = tmp_path / 'once'
+    assert data_generator.extend_history(str(once), today='2026-06-12',
+                                         legacy_path=str(legacy)) == 10
+    assert data_generator.extend_history(str(once), today='2026-06-12',
+                                         legacy_path=str(legacy)) == 0
+
+    daily_df = PartitionedPriceStore(daily).read_range()
+    once_df = PartitionedPriceStore(once).read_range()
+    assert daily_df['date'].tolist() == [d.isoformat() for d in date_range('2026-06-01', '2026-06-12')]
+    assert daily_df['rtx4080_price'].tolist()[:2] == [1000.0, 1005.5]
+    pd.testing.assert_frame_equal(daily_df, once_df)
+    assert daily_df['rtx4080_price'].between(850, 1200).all()
@@ -0,0 +1,158 @@
+import threading
+
+from src.core.history_store import JSONLinesHistoryStore
+from src.core.persistence import FileLock, WriteBehindHistoryStore
+from src.core.sqlite_store import SQLiteHistoryStore
+
+
+class SlowStore(JSONLinesHistoryStore):
+    """Store whose append blocks until released, to hold a flush mid-write."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def append(self, records):
+        self.entered.set()
+        self.release.wait(5)
+        super().append(records)
+
+
+def _record(i):
+    return {'timestamp': f'2026-01-01T00:00:{i:02d}', 'price': 100.0 + i}
+
+
+def _wait_for_flush(store, timeout=2.0):
+    for _ in range(int(timeout / 0.02)):
+        if store.pending == 0:
+            return
+        threading.Event().wait(0.02)
+
+
+def _run(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_append_queues_until_max_pending(tmp_path):
+    inner = JSONLinesHistoryStore(tmp_path / 'h.jsonl')
+    store = WriteBehindHistoryStore(inner, max_pending=3, max_delay=None, background=False)
+    store.append([_record(0), _record(1)])
+    assert store.pending == 2
+    assert inner.load() == []
+    # Reads still see the queued records
+    assert [r['price'] for r in store.load()] == [100.0, 101.0]
+
+    store.append([_record(2)])
+    assert store.pending == 0
+    assert len(inner.load()) == 3
+    assert store.stats()['flushes'] == 1
+    store.close()
+
+
+def test_close_flushes_pending(tmp_path):
+    path = tmp_path / 'h.jsonl'
+    store = WriteBehindHistoryStore(JSONLinesHistoryStore(path), max_pending=100,
+                                    max_delay=None, background=False)
+    store.append([_record(0)])
+    store.close()
+    assert JSONLinesHistoryStore(path).load() == [_record(0)]
+
+
+def test_background_thread_enforces_max_delay(tmp_path):
+    path = tmp_path / 'h.jsonl'
+    store = WriteBehindHistoryStore(JSONLinesHistoryStore(path), max_pending=100,
+                                    max_delay=0.05)
+    store.append([_record(0)])
+    _wait_for_flush(store)
+    assert store.pending == 0
+    assert store.stats()['errors'] == 0
+    assert JSONLinesHistoryStore(path).load() == [_record(0)]
+    store.close()
+
+
+def test_background_flush_into_sqlite_store(tmp_path):
+    path = tmp_path / 'prices.db'
+    store = WriteBehindHistoryStore(SQLiteHistoryStore(path), max_pending=100,
+                                    max_delay=0.05, lock_path=tmp_path / '.lock')
+    store.append([_record(0), dict(_record(1), product='B')])
+    _wait_for_flush(store)
+    # The flush ran on the background thread, not on close()
+    assert store.pending == 0
+    assert store.stats()['errors'] == 0
+    store.save_state({'version': 2})
+    store.close()
+
+    reopened = SQLiteHistoryStore(path)
+    assert [(r.get('product'), r['price']) for r in reopened.load()] == [(None, 100.0), ('B', 101.0)]
+    assert reopened.load_state() == {'version': 2}
+    reopened.close()
+
+
+def test_save_state_during_background_flush_does_not_deadlock(tmp_path):
+    inner = SlowStore(tmp_path / 'h.jsonl')
+    store = WriteBehindHistoryStore(inner, max_pending=100, max_delay=None,
+                                    lock_path=tmp_path / '.lock', background=False)
+    store.append([_record(0)])
+    flusher = _run(store.flush)
+    assert inner.entered.wait(5)
+
+    saver = _run(store.save_state, {'version': 1})
+    inner.release.set()
+    flusher.join(5)
+    saver.join(5)
+    assert not flusher.is_alive() and not saver.is_alive()
+    assert store.load_state() == {'version': 1}
+    assert inner.load() == [_record(0)]
+    store.close()
+
+
+def test_file_lock_serializes_threads(tmp_path):
+    lock = FileLock(tmp_path / '.lock')
+    inside = []
+    overlaps = []
+
+    def worker():
+        for _ in range(200):
+            with lock:
+                inside.append(1)
+                if len(inside) > 1:
+                    overlaps.append(1)
+                inside.pop()
+
+    threads = [_run(worker) for _ in range(4)]
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert overlaps == []
+
+
+def test_load_compaction_excludes_other_processes(tmp_path):
+    path = tmp_path / 'h.jsonl'
+    # Grow the log well past the compaction threshold without compacting
+    JSONLinesHistoryStore(path, retention=None).append([_record(i) for i in range(40)])
+    first = WriteBehindHistoryStore(JSONLinesHistoryStore(path, retention=10),
+                                    max_pending=1, max_delay=None, background=False)
+    second = WriteBehindHistoryStore(JSONLinesHistoryStore(path, retention=10),
+                                     max_pending=1, max_delay=None, background=False)
+
+    # Another process holding a shared (reader) lock must keep the compacting load out
+    reader = FileLock(first.lock.path)
+    reader.acquire(shared=True)
+    loaded = []
+    thread = _run(lambda: loaded.append(first.load()))
+    thread.join(0.3)
+    assert thread.is_alive()
+    reader.release()
+    thread.join(5)
+    assert [r['price'] for r in loaded[0]] == [130.0 + i for i in range(10)]
+    assert sum(1 for _ in open(path)) == 10
+
+    # The second store sees the compacted log and appends after it
+    assert second.load() == loaded[0]
+    second.append([_record(50)])
+    assert first.load()[-1] == _record(50)
+    first.close()
+    second.close()
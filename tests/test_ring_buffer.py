@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from src.core.ring_buffer import PriceRingBuffer, from_epoch_us, to_epoch_us
+
+
+def _record(i):
+    return {'timestamp': f'2026-04-{1 + i // 24:02d}T{i % 24:02d}:00:00', 'price': 1000.0 + i}
+
+
+def test_epoch_conversion_round_trips():
+    for timestamp in ('2026-04-01T12:30:45.123456', '1999-12-31T23:59:59'):
+        assert from_epoch_us(to_epoch_us(timestamp)) == timestamp
+    # Aware timestamps are normalized to UTC
+    assert to_epoch_us('2026-04-01T08:00:00+08:00') == to_epoch_us('2026-04-01T00:00:00')
+
+
+@pytest.mark.parametrize('capacity', [1, 5, 16, 40])
+def test_keeps_the_most_recent_records(capacity):
+    buffer = PriceRingBuffer(capacity, initial_size=2)
+    records = [_record(i) for i in range(100)]
+    for n, record in enumerate(records, 1):
+        buffer.append_record(record)
+        expected = records[max(0, n - capacity):n]
+        assert len(buffer) == len(expected)
+        assert buffer[-1] == expected[-1]
+        assert buffer[0] == expected[0]
+    assert buffer.to_records() == records[-capacity:]
+    assert buffer[1:3] == records[-capacity:][1:3]
+    assert buffer.nbytes == 2 * capacity * 16
+    with pytest.raises(IndexError):
+        buffer[capacity]
+
+
+def test_views_are_contiguous_and_zero_copy():
+    buffer = PriceRingBuffer(8)
+    for record in (_record(i) for i in range(13)):
+        buffer.append_record(record)
+    prices = buffer.prices()
+    assert np.shares_memory(prices, buffer._prices)
+    np.testing.assert_array_equal(prices, 1000.0 + np.arange(5, 13))
+    np.testing.assert_array_equal(buffer.prices(3), [1010.0, 1011.0, 1012.0])
+    assert [from_epoch_us(t) for t in buffer.timestamps(2)] == \
+        [_record(11)['timestamp'], _record(12)['timestamp']]
+
+
+def test_unbounded_buffer_grows():
+    buffer = PriceRingBuffer(None, initial_size=1)
+    for i in range(1000):
+        buffer.append(i, float(i))
+    assert len(buffer) == 1000
+    np.testing.assert_array_equal(buffer.timestamps(), np.arange(1000))
+
+
+def test_from_records_applies_capacity():
+    records = [_record(i) for i in range(30)]
+    buffer = PriceRingBuffer.from_records(records, capacity=10)
+    assert buffer.to_records() == records[-10:]
+    with pytest.raises(ValueError):
+        PriceRingBuffer(0)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from src.core.ring_buffer import from_epoch_us, to_epoch_us
+from src.core.rollup import LEVELS, RollupPyramid, RollupSeries, aggregate, bucket_starts
+
+MINUTE_US = 60 * 1_000_000
+
+
+def _columns(result):
+    return {key: np.asarray(value) for key, value in result.items() if key != 'level'}
+
+
+def _assert_same(a, b):
+    a, b = _columns(a), _columns(b)
+    assert a.keys() == b.keys()
+    for key in a:
+        np.testing.assert_allclose(a[key], b[key], rtol=1e-12, err_msg=key)
+
+
+@pytest.mark.parametrize('level, inside, next_start', [
+    ('minute', '2026-03-01T10:15:59.999999', '2026-03-01T10:16:00'),
+    ('hour', '2026-03-01T10:59:59', '2026-03-01T11:00:00'),
+    ('day', '2026-03-01T23:59:59', '2026-03-02T00:00:00'),
+    # 2026-03-02 is a Monday; weeks run Monday to Sunday
+    ('week', '2026-03-08T23:59:59', '2026-03-09T00:00:00'),
+])
+def test_bucket_boundaries(level, inside, next_start):
+    starts = bucket_starts([to_epoch_us(inside), to_epoch_us(next_start)], level)
+    assert starts[1] == to_epoch_us(next_start)
+    assert starts[1] - starts[0] == LEVELS[level] * 1_000_000
+    assert from_epoch_us(bucket_starts(to_epoch_us('2026-03-04T12:00:00'), 'week')) == \
+        '2026-03-02T00:00:00'
+
+
+def test_aggregate_ohlc():
+    timestamps = np.array([0, 10, 59, 60, 61], dtype=np.int64) * 1_000_000
+    buckets = aggregate(timestamps, [5.0, 7.0, 4.0, 9.0, 8.0], 'minute')
+    np.testing.assert_array_equal(buckets['start'], [0, MINUTE_US])
+    np.testing.assert_array_equal(buckets['open'], [5.0, 9.0])
+    np.testing.assert_array_equal(buckets['high'], [7.0, 9.0])
+    np.testing.assert_array_equal(buckets['low'], [4.0, 8.0])
+    np.testing.assert_array_equal(buckets['close'], [4.0, 8.0])
+    np.testing.assert_array_equal(buckets['count'], [3, 2])
+    np.testing.assert_allclose(buckets['mean'], [16 / 3, 8.5])
+
+
+@pytest.mark.parametrize('level', list(LEVELS))
+def test_extend_matches_repeated_update(level):
+    rng = np.random.default_rng(0)
+    timestamps = to_epoch_us('2026-03-01T00:00:00') + np.cumsum(
+        rng.integers(0, 40 * MINUTE_US, 3000))
+    prices = 1000 + np.cumsum(rng.normal(0, 1, len(timestamps)))
+
+    one_by_one = RollupSeries(level)
+    for ts, price in zip(timestamps.tolist(), prices.tolist()):
+        one_by_one.update(ts, price)
+    batched = RollupSeries(level)
+    # Uneven batches, several of them continuing the newest bucket
+    for chunk in np.array_split(np.arange(len(timestamps)), [1, 2, 50, 51, 700, 1500, 2999]):
+        batched.extend(timestamps[chunk], prices[chunk])
+    _assert_same(batched.query(), one_by_one.query())
+
+
+def test_extend_merges_into_newest_bucket():
+    series = RollupSeries('hour')
+    base = to_epoch_us('2026-03-01T10:00:00')
+    series.extend([base, base + 5 * MINUTE_US], [100.0, 90.0])
+    series.extend([base + 30 * MINUTE_US, base + 70 * MINUTE_US], [120.0, 80.0])
+    result = series.query()
+    assert len(series) == 2
+    assert result['open'].tolist() == [100.0, 80.0]
+    assert result['high'].tolist() == [120.0, 80.0]
+    assert result['low'].tolist() == [90.0, 80.0]
+    assert result['close'].tolist() == [120.0, 80.0]
+    assert result['count'].tolist() == [3, 1]
+
+
+def test_extend_reaching_back_into_newest_bucket():
+    series = RollupSeries('hour')
+    base = to_epoch_us('2026-03-01T10:00:00')
+    series.extend([base + 20 * MINUTE_US, base + 40 * MINUTE_US], [100.0, 110.0])
+    # Same bucket, but older than its close: must not overwrite open/close
+    series.extend([base + 10 * MINUTE_US, base + 30 * MINUTE_US], [95.0, 105.0])
+    result = series.query()
+    assert result['open'].tolist() == [95.0]
+    assert result['close'].tolist() == [110.0]
+    assert result['count'].tolist() == [4]
+
+
+def test_pyramid_query_and_retention():
+    pyramid = RollupPyramid(retention={'minute': 10})
+    start = to_epoch_us('2026-03-01T00:00:00')
+    for i in range(30):
+        pyramid.update('A', start + i * MINUTE_US, 100.0 + i)
+    assert len(pyramid.series['A']['minute']) == 10
+    day = pyramid.query('A', resolution='day')
+    assert day['level'] == 'day'
+    assert day['count'].tolist() == [30]
+    assert day['mean'].tolist() == [114.5]
+    hourly = pyramid.query('A', start='2026-03-01T00:10:00', resolution=1800)
+    assert hourly['level'] == 'minute'
+    assert hourly['start'][0] == start + 20 * MINUTE_US
+    assert pyramid.query('missing')['count'].tolist() == []
@@ -0,0 +1,57 @@
+from datetime import date
+
+import numpy as np
+
+from src.data import scenarios
+from src.data.scenarios import generate_scenarios
+from src.data.simulation import PROMO_SHOCKS, price_bounds, simulate_price_matrix
+
+RULES = {'drift': (-0.01, 0.015), 'floors': 850, 'ceilings': 1200,
+         'promo_shocks': PROMO_SHOCKS, 'start_date': date(2026, 6, 10)}
+
+
+def _exact(base, days, n_paths, seed, chunk_paths, **kwargs):
+    """All paths at once, for comparison on small inputs."""
+    paths = np.vstack([
+        simulate_price_matrix(np.full(min(chunk_paths, n_paths - c * chunk_paths), base), days,
+                              rng=scenarios._chunk_generator(seed, 0, c), **kwargs)
+        for c in range(-(-n_paths // chunk_paths))
+    ])
+    return np.percentile(paths, (5, 50, 95), axis=0), paths.mean(axis=0), paths
+
+
+def test_price_bounds_contain_every_path():
+    paths = simulate_price_matrix(np.full(5000, 1029.0), 30, rng=np.random.default_rng(0), **RULES)
+    lower, upper = price_bounds([1029.0], 30, **RULES)
+    assert (paths >= lower - 1e-9).all() and (paths <= upper + 1e-9).all()
+
+
+def test_bands_match_exact_percentiles_within_a_bin():
+    result = generate_scenarios([1029.0], 30, n_paths=6000, seed=7, workers=1,
+                                chunk_paths=1000, **RULES)
+    bands, mean, _ = _exact(1029.0, 30, 6000, 7, 1000, **RULES)
+    lower, upper = price_bounds([1029.0], 30, **RULES)
+    bin_width = (upper[0] - lower[0]) / scenarios.QUANTILE_BINS
+    assert (np.abs(result['bands'][0] - bands) <= bin_width + 1e-9).all()
+    np.testing.assert_allclose(result['mean'][0], mean, rtol=1e-12)
+
+
+def test_point_masses_are_exact():
+    # Every path sits on the floor from the first day on
+    result = generate_scenarios([100.0], 5, n_paths=500, seed=1, workers=1,
+                                floors=120.0, drift=(-0.02, 0.0))
+    np.testing.assert_allclose(result['bands'], 120.0, rtol=1e-12)
+
+
+def test_results_do_not_depend_on_worker_count():
+    kwargs = dict(n_paths=5000, seed=3, chunk_paths=1000, floors=[90, np.nan, 80],
+                  drift=(-0.02, 0.03))
+    single = generate_scenarios([100, 250, np.nan], 20, workers=1, **kwargs)
+    pooled = generate_scenarios([100, 250, np.nan], 20, workers=3, **kwargs)
+    np.testing.assert_array_equal(single['bands'], pooled['bands'])
+    np.testing.assert_array_equal(single['mean'], pooled['mean'])
+
+
+def test_product_without_base_or_floor_is_nan():
+    result = generate_scenarios([np.nan], 4, n_paths=100, workers=1)
+    assert np.isnan(result['bands']).all() and np.isnan(result['mean']).all()
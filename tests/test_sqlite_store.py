@@ -0,0 +1,117 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from src.core.ring_buffer import PriceRingBuffer, to_epoch_us
+from src.core.sqlite_store import SQLiteHistoryStore, SQLitePriceStore
+
+# product -> [(timestamp, price)], deliberately inserted out of order
+ROWS = {
+    'rtx-4080': [('2026-02-01T09:00:00', 1000.0), ('2026-02-01T18:00:00', 990.0),
+                 ('2026-02-02T09:00:00', 950.0), ('2026-02-03T09:00:00', 900.0)],
+    'rtx-4070': [('2026-02-01T10:00:00', 600.0), ('2026-02-02T10:00:00', 630.0),
+                 ('2026-02-03T10:00:00', 660.0)],
+    'rtx-4060': [('2026-02-02T12:00:00', 300.0), ('2026-02-03T12:00:00', 297.0)],
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLitePriceStore(tmp_path / 'prices.db', batch_size=2)
+    rows = [(product, ts, price) for product, points in ROWS.items() for ts, price in points]
+    assert store.insert(reversed(rows)) == len(rows)
+    yield store
+    store.close()
+
+
+def test_point_and_range_queries(store):
+    assert len(store) == 9
+    assert store.products == ['rtx-4060', 'rtx-4070', 'rtx-4080']
+    assert store.tail('rtx-4080', 2) == [(to_epoch_us('2026-02-02T09:00:00'), 950.0),
+                                         (to_epoch_us('2026-02-03T09:00:00'), 900.0)]
+    assert len(store.tail('rtx-4080')) == 4
+    assert store.range('rtx-4080', '2026-02-01T12:00:00', '2026-02-03T09:00:00') == [
+        {'timestamp': '2026-02-01T18:00:00', 'price': 990.0},
+        {'timestamp': '2026-02-02T09:00:00', 'price': 950.0},
+    ]
+    assert store.price_at('rtx-4080', '2026-02-02T08:59:59') == 990.0
+    assert store.price_at('rtx-4080', '2026-02-02T09:00:00') == 950.0
+    assert store.price_at('rtx-4060', '2026-02-01T00:00:00') is None
+
+
+def test_accepts_numpy_timestamps(store):
+    buffer = PriceRingBuffer(10)
+    for ts, price in ROWS['rtx-4080']:
+        buffer.append_record({'timestamp': ts, 'price': price})
+    timestamps = buffer.timestamps()
+    assert isinstance(timestamps[0], np.int64)
+    assert store.price_at('rtx-4080', timestamps[2]) == 950.0
+    assert [r['price'] for r in store.range('rtx-4080', timestamps[1], timestamps[3])] == \
+        [990.0, 950.0]
+    store.insert([('rtx-4090', np.int64(timestamps[0]), 1599.0)])
+    assert store.tail('rtx-4090') == [(int(timestamps[0]), 1599.0)]
+
+
+def test_latest_and_top_movers(store):
+    latest = store.latest()
+    assert latest['rtx-4070'] == {'timestamp': '2026-02-03T10:00:00', 'price': 660.0}
+    assert set(store.latest(['rtx-4060'])) == {'rtx-4060'}
+
+    down = store.top_movers('2026-02-01T00:00:00', limit=2)
+    assert [m['product'] for m in down] == ['rtx-4080', 'rtx-4060']
+    assert down[0]['change_percent'] == pytest.approx(-10.0)
+    up = store.top_movers('2026-02-02T00:00:00', direction='up', limit=1)
+    assert up == [{'product': 'rtx-4070', 'start_price': 630.0, 'end_price': 660.0,
+                   'change_percent': pytest.approx(100 * 30 / 630)}]
+
+
+def test_daily_closes_and_exports(store, tmp_path):
+    closes = store.daily_closes()
+    assert closes['rtx-4080'] == [('2026-02-01', 990.0), ('2026-02-02', 950.0),
+                                  ('2026-02-03', 900.0)]
+    assert store.daily_closes(start='2026-02-03T00:00:00', products=['rtx-4060']) == {
+        'rtx-4060': [('2026-02-03', 297.0)]}
+
+    store.export_price_history_json(tmp_path / 'history.json')
+    with open(tmp_path / 'history.json', encoding='utf-8') as f:
+        assert json.load(f)['rtx-4070'] == [600.0, 630.0, 660.0]
+    store.export_daily_csv(tmp_path / 'daily.csv', base_prices={'rtx-4080': 1099.0})
+    with open(tmp_path / 'daily.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 8
+    assert {r['base_price'] for r in rows if r['product'] == 'rtx-4080'} == {'1099.0'}
+    assert {r['base_price'] for r in rows if r['product'] == 'rtx-4060'} == {'300.0'}
+
+
+def test_clear_replace_and_meta(store):
+    store.set_meta('version', '1')
+    store.set_meta('version', '2')
+    assert store.get_meta('version') == '2'
+    assert store.get_meta('missing') is None
+
+    store.clear('rtx-4060')
+    assert 'rtx-4060' not in store.products
+    assert store.replace([('rtx-4090', '2026-02-04T00:00:00', 1599)]) == 1
+    assert store.products == ['rtx-4090']
+    assert len(store) == 1
+
+
+def test_history_store_adapter(tmp_path):
+    path = tmp_path / 'history.db'
+    history = SQLiteHistoryStore(path, retention=3)
+    records = [{'timestamp': f'2026-02-0{i}T00:00:00', 'price': 1000.0 - i} for i in range(1, 6)]
+    history.append(records[:2])
+    history.append(records[2:])
+    history.save_state({'window': [1, 2]})
+    history.close()
+
+    history = SQLiteHistoryStore(path, retention=3)
+    assert history.load() == records[-3:]
+    assert history.load_state() == {'window': [1, 2]}
+    # Older rows stay queryable in the database
+    assert len(history.db.tail('default')) == 5
+    history.rewrite(records)
+    assert len(history.db) == 3
+    history.close()
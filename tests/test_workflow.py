@@ -0,0 +1,97 @@
+from src.core.ai_engine import BaseAIEngine
+from src.core.cache import AnalysisCache
+from src.core.fetching import AsyncPriceFetcher, PriceFetchError, PriceSource
+from src.core.history_store import JSONLinesHistoryStore
+from src.core.multi_workflow import MultiProductWorkflow
+from src.core.workflow import PriceMonitorWorkflow
+
+
+class FailingSource(PriceSource):
+    async def fetch_price(self, product):
+        raise PriceFetchError(product)
+
+
+class FixedSource(PriceSource):
+    def __init__(self, prices):
+        super().__init__()
+        self.prices = prices
+
+    async def fetch_price(self, product):
+        if product not in self.prices:
+            raise PriceFetchError(product)
+        return self.prices[product]
+
+
+def _fetcher(source):
+    return AsyncPriceFetcher(source, timeout=1.0, retries=0)
+
+
+def test_failed_fetch_without_last_price_skips_cycle(tmp_path):
+    workflow = PriceMonitorWorkflow(tmp_path)
+    workflow.set_ai_engine(BaseAIEngine())
+    fetcher = _fetcher(FailingSource())
+    workflow.set_price_fetcher(fetcher, 'GPU')
+    try:
+        result = workflow.run_full_workflow()
+    finally:
+        fetcher.close()
+    assert result['success'] is False
+    assert result['current_price'] is None
+    assert len(workflow.historical_prices) == 0
+    assert workflow.history_store.load() == []
+
+
+def test_failed_fetch_falls_back_to_last_known_price(tmp_path):
+    workflow = PriceMonitorWorkflow(tmp_path)
+    workflow.set_ai_engine(BaseAIEngine())
+    workflow.update_price_history(120.0, '2026-01-01T00:00:00')
+    fetcher = _fetcher(FailingSource())
+    workflow.set_price_fetcher(fetcher, 'GPU')
+    try:
+        result = workflow.run_full_workflow()
+    finally:
+        fetcher.close()
+    assert result['success'] is True
+    assert result['current_price'] == 120.0
+    assert len(workflow.historical_prices) == 2
+
+
+def test_multi_workflow_drops_failed_fetches(tmp_path):
+    catalogue = tmp_path / 'catalogue.csv'
+    catalogue.write_text('Product,Price,Historical_Low\nA,100,90\nB,200,180\n', encoding='utf-8')
+    workflow = MultiProductWorkflow(tmp_path, catalogue_file=catalogue)
+    workflow.set_ai_engine(BaseAIEngine())
+    fetcher = _fetcher(FixedSource({'A': 101.0}))
+    workflow.set_price_fetcher(fetcher)
+    try:
+        prices = workflow.fetch_current_prices()
+    finally:
+        fetcher.close()
+    assert prices == {'A': 101.0}
+
+
+def test_multi_workflow_catalogue_prices_fall_back_to_historical_low(tmp_path):
+    catalogue = tmp_path / 'catalogue.csv'
+    catalogue.write_text('Product,Price,Historical_Low\n'
+                         '"A","$1,299.99",900\n'
+                         'B,N/A,"$1,050.00"\n'
+                         'C,,\n'
+                         ',5,5\n', encoding='utf-8')
+    workflow = MultiProductWorkflow(tmp_path, catalogue_file=catalogue)
+    assert workflow.products == ['A', 'B', 'C']
+    assert [workflow.series[p].base_price for p in workflow.products] == [1299.99, 1050.0, None]
+
+
+def test_workflows_sharing_a_cache_do_not_see_each_others_results(tmp_path):
+    cache = AnalysisCache()
+    workflows = [
+        PriceMonitorWorkflow(tmp_path, analysis_cache=cache,
+                             history_store=JSONLinesHistoryStore(tmp_path / f'{name}.jsonl'))
+        for name in ('a', 'b')
+    ]
+    for workflow, prices in zip(workflows, ([100.0, 120.0], [100.0, 80.0])):
+        workflow.set_ai_engine(BaseAIEngine())
+        for price in prices:
+            workflow.update_price_history(price)
+    assert [w.analyze_current_trend()['last_price'] for w in workflows] == [120.0, 80.0]
+    assert workflows[0].history_version != workflows[1].history_version
@@ -1,60 +1,33 @@
-import pandas as pd
 import os
-import re
+import sys
 
-def validate_dataset():
-    """验证合规数据集是否符合要求"""
+from src.data.ingest import ingest_catalogue
+
+def validate_dataset(output_dir=os.path.join("data", "catalogue")):
+    """
+    验证合规数据集是否符合要求
+    按块流式读取并校验，合格数据按列写入 output_dir，校验报告保存为 output_dir/report.json
+    :param output_dir: 列式输出目录，为 None 时只校验
+    :return: 是否通过验证
+    """
     # 确保data目录存在
     os.makedirs("data", exist_ok=True)
-    
+
     data_path = os.path.join("data", "cleaned_gpu_prices.csv")
-    try:
-        # 读取CSV时确保正确处理数据类型
-        df = pd.read_csv(data_path, dtype={'Price': str, 'Historical_Low': str})
-        print("✅ 数据集验证成功！")
-        print(f"   - 总行数: {len(df)}")
-        print(f"   - 列: {', '.join(df.columns)}")
-        
-        # 修复FutureWarning: 指定na_values参数
-        df.replace('', pd.NA, inplace=True)
-        
+    rtx4080 = []
+    related = []
+
+    def find_rtx4080(chunk):
+        # 只保留匹配的行，内存占用与文件大小无关
+        products = chunk['product']
         # 精确匹配RTX 4080（使用正则表达式确保单词边界）
-        rtx4080 = df[df['Product'].str.contains(r'\bRTX 4080\b(?! Super)', case=False, regex=True, na=False)]
-        
-        if not rtx4080.empty:
-            # 将价格转换为浮点数
-            price_value = float(rtx4080.iloc[0]['Price'])
-            print("✅ RTX 4080数据存在")
-            print(f"   价格: ${price_value:,.2f}")
-            
-            # 检查数据是否为数值类型
-            if isinstance(price_value, (int, float)):
-                print("✅ 价格格式正确（数值类型）")
-            else:
-                print("⚠️ 价格格式警告：应为数值类型")
-        else:
-            print("❌ 未找到RTX 4080数据")
-            # 尝试查找所有RTX 4080变体
-            all_rtx4080 = df[df['Product'].str.contains('RTX 4080', case=False, na=False)]
-            if not all_rtx4080.empty:
-                print("🔍 找到相关型号:")
-                for _, row in all_rtx4080.iterrows():
-                    print(f"   - {row['Product']}: ${float(row['Price']):,.2f}")
-            
-        # 检查缺失值
-        missing_values = df.isnull().sum().sum()
-        if missing_values > 0:
-            print(f"⚠️ 发现 {missing_values} 个缺失值，已自动处理")
-            df.fillna("", inplace=True)
-        else:
-            print("✅ 无缺失值")
-            
-        # 检查合规性
-        if 'URL' not in df.columns and 'Timestamp' not in df.columns and 'User' not in df.columns:
-            print("✅ 合规检查通过：无URL、无时间戳、无个人信息")
-        else:
-            print("❌ 合规检查失败：包含敏感字段")
-            
+        exact = products.str.contains(r'\bRTX 4080\b(?! Super)', case=False, regex=True, na=False)
+        rtx4080.extend(zip(products[exact], chunk['price'][exact]))
+        matches = products.str.contains('RTX 4080', case=False, regex=False, na=False)
+        related.extend(zip(products[matches], chunk['price'][matches]))
+
+    try:
+        report = ingest_catalogue(data_path, output_dir, on_chunk=find_rtx4080)
     except Exception as e:
         print(f"❌ 验证失败: {str(e)}")
         print("💡 修复建议：")
@@ -62,7 +35,52 @@ def validate_dataset():
         print("   2. 检查列名是否为: Product,Price,Historical_Low")
         print("   3. 确保价格中无$符号和逗号")
         return False
-    return True
+
+    if report['missing_columns']:
+        print(f"❌ 验证失败: 缺少必需列 {', '.join(report['missing_columns'])}")
+        print("💡 修复建议：检查列名是否为: Product,Price,Historical_Low")
+        return False
+
+    print("✅ 数据集验证成功！")
+    print(f"   - 总行数: {report['rows']}（{report['chunks']} 块）")
+    print(f"   - 列: {', '.join(report['columns'])}")
+
+    if rtx4080:
+        price_value = float(rtx4080[0][1])
+        print("✅ RTX 4080数据存在")
+        print(f"   价格: ${price_value:,.2f}")
+    else:
+        print("❌ 未找到RTX 4080数据")
+        if related:
+            print("🔍 找到相关型号:")
+            for product, price in related:
+                print(f"   - {product}: ${price:,.2f}")
+
+    # 检查缺失值和价格
+    issues = report['issues']
+    missing_values = issues['missing_product'] + issues['missing_price']
+    if missing_values > 0:
+        print(f"⚠️ 发现 {missing_values} 个缺失值，对应行已剔除")
+    else:
+        print("✅ 无缺失值")
+    bad_prices = sum(issues[k] for k in ('invalid_price', 'price_out_of_range',
+                                          'invalid_historical_low', 'historical_low_out_of_range'))
+    if bad_prices > 0:
+        low, high = report['price_range']
+        print(f"⚠️ 发现 {bad_prices} 个无法解析或超出 ${low:,.0f} ~ ${high:,.0f} 的价格，对应行已剔除")
+    else:
+        print("✅ 价格格式正确（数值类型）")
+    print(f"   有效行数: {report['valid_rows']} / {report['rows']}")
+
+    # 检查合规性
+    if not report['forbidden_columns']:
+        print("✅ 合规检查通过：无URL、无时间戳、无个人信息")
+    else:
+        print(f"❌ 合规检查失败：包含敏感字段 {', '.join(report['forbidden_columns'])}")
+
+    if output_dir is not None:
+        print(f"   清洗后的数据及校验报告已保存至: {output_dir}")
+    return report['passed']
 
 if __name__ == "__main__":
-    validate_dataset()
\ No newline at end of file
+    sys.exit(0 if validate_dataset() else 1)